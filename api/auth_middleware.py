@@ -1,72 +1,243 @@
 from fastapi import HTTPException, Depends, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from pathlib import Path
 from typing import Optional
-import firebase_admin
-from firebase_admin import auth, credentials
+import asyncio
+import hashlib
 import os
 import json
+import logging
+import sys
+import threading
+import time
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.inference.cache import LRUTTLCache
+
+logger = logging.getLogger(__name__)
 
 def _is_production() -> bool:
     return os.getenv("ENVIRONMENT", "development").lower() == "production"
 
 _firebase_initialized = False
+_firebase_attempted = False
+_firebase_lock = threading.Lock()
+firebase_init_seconds: Optional[float] = None
 
-# Initialize Firebase Admin SDK
-try:
-    try:
-        firebase_admin.get_app()
-        _firebase_initialized = True
-    except ValueError:
-        firebase_creds_json = os.getenv("FIREBASE_CREDENTIALS")
-        if firebase_creds_json:
-            cred_dict = json.loads(firebase_creds_json)
-            cred = credentials.Certificate(cred_dict)
-            firebase_admin.initialize_app(cred)
-            _firebase_initialized = True
-        else:
-            configured_path = os.getenv("FIREBASE_CREDENTIALS_PATH")
-            candidate_paths = [
-                configured_path,
-                "firebase-credentials.json",
-                "firebasecredentials.json",
-            ]
-            for cred_path in [p for p in candidate_paths if p]:
-                if os.path.exists(cred_path):
-                    cred = credentials.Certificate(cred_path)
+
+def init_firebase() -> bool:
+    """
+    Initialize the Firebase Admin SDK once. Deferred from import time so a cold
+    start does not pay for the SDK import and credential parsing before it can
+    serve; the app calls this in the background at startup and again (as a no-op)
+    before verifying a token.
+
+    Returns:
+        Whether Firebase authentication is available
+    """
+    global _firebase_initialized, _firebase_attempted, firebase_init_seconds
+    if _firebase_attempted:
+        return _firebase_initialized
+    with _firebase_lock:
+        if _firebase_attempted:
+            return _firebase_initialized
+        start = time.perf_counter()
+        try:
+            import firebase_admin
+            from firebase_admin import credentials
+            try:
+                firebase_admin.get_app()
+                _firebase_initialized = True
+            except ValueError:
+                firebase_creds_json = os.getenv("FIREBASE_CREDENTIALS")
+                if firebase_creds_json:
+                    cred_dict = json.loads(firebase_creds_json)
+                    cred = credentials.Certificate(cred_dict)
                     firebase_admin.initialize_app(cred)
                     _firebase_initialized = True
-                    break
-            else:
-                if _is_production():
-                    raise ValueError(
-                        "Firebase credentials are required in production. "
-                        "Set FIREBASE_CREDENTIALS or FIREBASE_CREDENTIALS_PATH."
-                    )
                 else:
-                    print("Warning: Firebase credentials not found. Authentication will be disabled.")
-                    print("Set FIREBASE_CREDENTIALS or FIREBASE_CREDENTIALS_PATH environment variables.")
-except Exception as e:
-    if _is_production():
-        raise
-    else:
-        print(f"Warning: Firebase Admin initialization failed: {e}")
-        print("Authentication will be disabled.")
+                    configured_path = os.getenv("FIREBASE_CREDENTIALS_PATH")
+                    candidate_paths = [
+                        configured_path,
+                        "firebase-credentials.json",
+                        "firebasecredentials.json",
+                    ]
+                    for cred_path in [p for p in candidate_paths if p]:
+                        if os.path.exists(cred_path):
+                            cred = credentials.Certificate(cred_path)
+                            firebase_admin.initialize_app(cred)
+                            _firebase_initialized = True
+                            break
+                    else:
+                        if _is_production():
+                            raise ValueError(
+                                "Firebase credentials are required in production. "
+                                "Set FIREBASE_CREDENTIALS or FIREBASE_CREDENTIALS_PATH."
+                            )
+                        else:
+                            print("Warning: Firebase credentials not found. Authentication will be disabled.")
+                            print("Set FIREBASE_CREDENTIALS or FIREBASE_CREDENTIALS_PATH environment variables.")
+        except Exception as e:
+            if _is_production():
+                raise
+            else:
+                print(f"Warning: Firebase Admin initialization failed: {e}")
+                print("Authentication will be disabled.")
+        finally:
+            _firebase_attempted = True
+            firebase_init_seconds = time.perf_counter() - start
+    return _firebase_initialized
+
+
+async def ensure_firebase() -> bool:
+    """init_firebase without blocking the event loop on the first call"""
+    if _firebase_attempted:
+        return _firebase_initialized
+    return await asyncio.to_thread(init_firebase)
 
 security = HTTPBearer()
 
+# -----------------------------------------------------
+# Verified Token Cache
+# -----------------------------------------------------
+
+# Decoded claims of verified ID tokens, keyed by a digest of the token and kept
+# until the token's exp. AUTH_CHECK_REVOKED forces a revocation check (a call to
+# Firebase) on every request, which bypasses the cache.
+AUTH_CHECK_REVOKED = os.getenv("AUTH_CHECK_REVOKED", "false").lower() == "true"
+CERT_REFRESH_SECONDS = float(os.getenv("AUTH_CERT_REFRESH_SECONDS", "3600"))
+
+_token_cache = LRUTTLCache(
+    maxsize=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")),
+    ttl=None
+)
+_verify_metrics = {"verifications": 0, "failures": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+
+
+def _token_key(token: str) -> bytes:
+    # Never keep raw bearer tokens in memory longer than the request
+    return hashlib.sha256(token.encode()).digest()
+
+
+async def verify_token(token: str, check_revoked: Optional[bool] = None) -> dict:
+    """
+    Verify a Firebase ID token, serving repeat tokens from the cache.
+
+    Args:
+        token: Raw ID token
+        check_revoked: Check revocation with Firebase; defaults to AUTH_CHECK_REVOKED
+
+    Returns:
+        Decoded token claims
+    """
+    if check_revoked is None:
+        check_revoked = AUTH_CHECK_REVOKED
+    key = _token_key(token)
+    if not check_revoked:
+        claims = _token_cache.get(key)
+        if claims is not None:
+            return claims
+
+    from firebase_admin import auth
+
+    # Signature checks (and certificate fetches) stay off the event loop
+    start = time.perf_counter()
+    try:
+        claims = await run_in_threadpool(auth.verify_id_token, token, check_revoked=check_revoked)
+    except Exception:
+        _verify_metrics["failures"] += 1
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _verify_metrics["verifications"] += 1
+        _verify_metrics["total_seconds"] += elapsed
+        _verify_metrics["max_seconds"] = max(_verify_metrics["max_seconds"], elapsed)
+
+    ttl = claims.get("exp", 0) - time.time()
+    if ttl > 0:
+        _token_cache.set(key, claims, ttl=ttl)
+    return claims
+
+
+def token_cache_stats() -> dict:
+    """Token cache hit rate and verification latency for the health check"""
+    count = _verify_metrics["verifications"]
+    return {
+        "cache": _token_cache.stats(),
+        "check_revoked": AUTH_CHECK_REVOKED,
+        "verifications": count,
+        "failures": _verify_metrics["failures"],
+        "avg_verify_ms": round(_verify_metrics["total_seconds"] / count * 1e3, 3) if count else 0.0,
+        "max_verify_ms": round(_verify_metrics["max_seconds"] * 1e3, 3),
+    }
+
+
+# Cleared when the installed firebase-admin lacks the internals the prefetch uses
+_prefetch_supported = True
+
+
+def _sdk_certificate_fetch():
+    """
+    The Firebase SDK's own certificate request and the ID-token certificate URL.
+    These are SDK internals, checked against the firebase-admin range pinned in
+    requirements.txt; they are what verify_id_token reads through, so prefetching
+    with any other session would not warm its cache.
+    """
+    from firebase_admin import _token_gen, auth
+    return auth._get_client(None)._token_verifier.request, _token_gen.ID_TOKEN_CERT_URI
+
+
+def prefetch_signing_certificates() -> bool:
+    """
+    Fetch Google's ID-token signing certificates into the Firebase SDK's HTTP cache,
+    so no request pays for the download. Uses the SDK's own verifier session, whose
+    cache honours the certificates' max-age.
+    """
+    global _prefetch_supported
+    if not _prefetch_supported or not init_firebase():
+        return False
+    try:
+        request, cert_url = _sdk_certificate_fetch()
+    except (ImportError, AttributeError) as e:
+        import firebase_admin
+        _prefetch_supported = False
+        logger.error("Signing certificate prefetch disabled: firebase-admin %s does not provide the "
+                     "internals it uses (%s); see requirements.txt", firebase_admin.__version__, e)
+        return False
+    try:
+        response = request(cert_url)
+        return response.status == 200
+    except Exception as e:
+        logger.warning("Signing certificate prefetch failed: %s", e)
+        return False
+
+
+async def refresh_signing_certificates(interval: float = CERT_REFRESH_SECONDS) -> None:
+    """Background task: prefetch the signing certificates now and every interval seconds"""
+    while True:
+        await asyncio.to_thread(prefetch_signing_certificates)
+        if not _prefetch_supported:
+            return
+        await asyncio.sleep(interval)
+
+
 async def verify_firebase_token(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> dict:
     """Verify Firebase ID token and return decoded token."""
-    if not _firebase_initialized:
+    if not await ensure_firebase():
         raise HTTPException(
             status_code=503,
             detail="Firebase authentication is not configured"
         )
     
+    from firebase_admin import auth
+
     token = credentials.credentials
     try:
-        decoded_token = auth.verify_id_token(token)
+        decoded_token = await verify_token(token)
         return decoded_token
     except auth.InvalidIdTokenError:
         raise HTTPException(status_code=401, detail="Invalid authentication token")
@@ -89,10 +260,12 @@ async def get_optional_user(
     """Optional authentication - returns user if token is present, None otherwise."""
     if not authorization or not authorization.startswith("Bearer "):
         return None
+    if not await ensure_firebase():
+        return None
     
     try:
         token = authorization.split("Bearer ")[1]
-        decoded_token = auth.verify_id_token(token)
+        decoded_token = await verify_token(token)
         return {
             "uid": decoded_token.get("uid"),
             "email": decoded_token.get("email"),
@@ -3,32 +3,42 @@ FastAPI Backend for Credit Score Prediction
 Provides REST API endpoints for the ML credit scoring model
 """
 
+import time
+
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
 import sys
 import os
-import pandas as pd
-import io
-import uvicorn
-from typing import List
+import asyncio
+import hashlib
+import threading
+from typing import List, Optional
 from contextlib import asynccontextmanager
 from datetime import datetime
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.predict import CreditScorePredictor
-from src.features.build_features import engineer_features
-from api.auth_middleware import get_current_user
-from api.services_firestore import (
-    get_or_create_user,
-    get_user_profile,
-    create_or_update_user_profile,
-    save_prediction,
-    get_user_predictions,
-    get_user_score_history,
-    get_latest_prediction
+from src.inference.cache import LRUTTLCache
+from api import auth_middleware
+from api.auth_middleware import (
+    ensure_firebase,
+    get_current_user,
+    refresh_signing_certificates,
+    token_cache_stats
 )
+from api.model_loader import ModelManager
+from api.scoring import (
+    MAX_UPLOAD_BYTES,
+    ScoringExecutor,
+    UploadValidationError,
+    score_upload,
+    warm_up as warm_up_scoring
+)
+from api.storage import StorageBackend, create_storage
 from api.schemas import (
     UserProfileCreate,
     UserProfileUpdate,
@@ -36,28 +46,97 @@ from api.schemas import (
     PredictionResponse,
     PredictionListResponse,
     ScoreHistoryItem,
-    PredictionAssessment
+    ScoreSummaryResponse,
+    PredictionAssessment,
+    BatchPredictionResponse,
+    CustomerPrediction
 )
 
 # -----------------------------------------------------
 # FastAPI Application Configuration
 # -----------------------------------------------------
 
-predictor = None
+scoring_executor = ScoringExecutor()
+
+# Serving model; handlers read models.active once per request so a hot reload
+# never changes the model under a running request
+models = ModelManager(
+    scoring_executor,
+    default_paths={
+        "model_path": "models/model.pkl",
+        "scaler_path": "models/scaler.pkl",
+        "features_path": "models/features.csv",
+        "artifact_dir": os.getenv("MODEL_ARTIFACT_DIR", "models/artifacts"),
+    }
+)
+
+# Persistence backend, chosen with STORAGE_BACKEND (firestore or sqlite). Created on
+# first use so importing the app does not load the database client
+storage: Optional[StorageBackend] = None
+_storage_lock = threading.Lock()
+
+# Cold-start phases in milliseconds, reported at startup and by /health
+startup_timings = {"import_ms": None}
+
+
+def get_storage() -> StorageBackend:
+    global storage
+    if storage is None:
+        with _storage_lock:
+            if storage is None:
+                storage = create_storage()
+    return storage
+
+# Responses for recently scored uploads, keyed by (uid, upload hash, model version)
+recent_uploads = LRUTTLCache(
+    maxsize=int(os.getenv("UPLOAD_DEDUP_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("UPLOAD_DEDUP_TTL", "900"))
+)
+
+async def warm_up_dependencies():
+    """
+    Background start-up work deferred from import time: Firebase credentials, the
+    storage client and the upload parser. Requests arriving earlier initialize
+    what they need on demand.
+    """
+    try:
+        await ensure_firebase()
+        if auth_middleware.firebase_init_seconds is not None:
+            startup_timings["credentials_ms"] = round(auth_middleware.firebase_init_seconds * 1e3, 1)
+        start = time.perf_counter()
+        await asyncio.to_thread(get_storage)
+        startup_timings["storage_ms"] = round((time.perf_counter() - start) * 1e3, 1)
+        start = time.perf_counter()
+        await asyncio.to_thread(warm_up_scoring)
+        startup_timings["parser_ms"] = round((time.perf_counter() - start) * 1e3, 1)
+        print(f"Warm-up finished: {startup_timings}")
+    except Exception as e:
+        print(f"Error during warm-up: {str(e)}")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global predictor
+    start = time.perf_counter()
     try:
-        predictor = CreditScorePredictor(
-            model_path='models/model.pkl',
-            scaler_path='models/scaler.pkl',
-            features_path='models/features.csv'
-        )
-        print("Model loaded successfully")
+        models.start()
+        print(f"Model loaded successfully (version {models.version or 'unversioned'})")
     except Exception as e:
         print(f"Error loading model: {str(e)}")
+    startup_timings["model_load_ms"] = models.active.load_info["load_ms"] if models.active is not None else None
+    startup_timings["startup_ms"] = round((time.perf_counter() - start) * 1e3, 1)
+    print(f"Ready: import {startup_timings['import_ms']} ms, "
+          f"model load {startup_timings['model_load_ms']} ms, "
+          f"startup {startup_timings['startup_ms']} ms")
+    warm_up = asyncio.create_task(warm_up_dependencies())
+    cert_refresh = asyncio.create_task(refresh_signing_certificates())
+    model_watch = asyncio.create_task(models.watch())
     yield
+    warm_up.cancel()
+    cert_refresh.cancel()
+    model_watch.cancel()
+    scoring_executor.shutdown()
+    if storage is not None:
+        await storage.close()
 
 
 app = FastAPI(
@@ -100,9 +179,11 @@ async def root():
         "endpoints": {
             "/health": "Health check",
             "/api/predict": "Credit score prediction (POST)",
+            "/api/predict/batch": "Credit score prediction for every customer in a file (POST)",
             "/api/profile": "User profile management (GET, POST, PUT)",
             "/api/predictions": "Get prediction history (GET)",
-            "/api/scores/history": "Get historical credit scores (GET)"
+            "/api/scores/history": "Get historical credit scores (GET)",
+            "/api/scores/summary": "Get recent scores and monthly aggregates (GET)"
         }
     }
 
@@ -111,7 +192,12 @@ async def root():
 async def health_check():
     return {
         "status": "healthy",
-        "model_loaded": predictor is not None
+        "model_loaded": models.active is not None,
+        "model": models.stats(),
+        "scoring": scoring_executor.stats(),
+        "prediction_cache": models.active.cache_stats() if models.active is not None else None,
+        "auth": token_cache_stats(),
+        "startup": startup_timings
     }
 
 # -----------------------------------------------------
@@ -136,6 +222,60 @@ def convert_firestore_timestamp(ts):
             return None
     return None
 
+
+async def read_upload_source(file: UploadFile):
+    """
+    Enforce the upload size cap and return what the scoring pool should parse.
+    Thread workers stream the upload's spooled file directly; process workers
+    need the bytes since file handles cannot cross process boundaries.
+    """
+    size = file.size
+    if size is None:
+        file.file.seek(0, os.SEEK_END)
+        size = file.file.tell()
+    if size > MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large: limit is {MAX_UPLOAD_BYTES // (1024 * 1024)} MB"
+        )
+    if size == 0:
+        raise HTTPException(status_code=400, detail="Empty CSV file")
+
+    if scoring_executor.shares_memory:
+        file.file.seek(0)
+        return file.file
+    await file.seek(0)
+    return await file.read()
+
+
+def hash_upload(source) -> str:
+    """SHA-256 of the raw upload, read in blocks so large spools are not copied"""
+    if isinstance(source, (bytes, bytearray)):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    source.seek(0)
+    for block in iter(lambda: source.read(1 << 20), b""):
+        digest.update(block)
+    source.seek(0)
+    return digest.hexdigest()
+
+
+def prediction_response_from_document(doc: dict, uid: str) -> PredictionResponse:
+    """Build a PredictionResponse from a stored prediction document"""
+    return PredictionResponse(
+        id=doc['id'],
+        user_id=doc.get('user_id', uid),
+        credit_score=doc['credit_score'],
+        risk_probability=doc['risk_probability'],
+        risk_category=doc['risk_category'],
+        interpretation=doc.get('interpretation'),
+        feature_values=doc.get('feature_values'),
+        transaction_count=doc.get('transaction_count'),
+        file_name=doc.get('file_name'),
+        model_version=doc.get('model_version'),
+        created_at=convert_firestore_timestamp(doc.get('created_at'))
+    )
+
 # -----------------------------------------------------
 # Prediction Endpoint
 # -----------------------------------------------------
@@ -146,6 +286,7 @@ async def predict(
     current_user: dict = Depends(get_current_user)
 ):
     """Predict credit score from uploaded transaction CSV file"""
+    predictor = models.active
     if predictor is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
 
@@ -153,86 +294,136 @@ async def predict(
         raise HTTPException(status_code=400, detail="File must be a CSV file")
 
     try:
-        contents = await file.read()
-        df = pd.read_csv(io.StringIO(contents.decode("utf-8")))
-
-        required_columns = ["Date", "Time", "Transaction Type", "Phone Number", "Amount"]
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            raise HTTPException(status_code=400, detail=f"Missing columns: {missing_columns}")
-
-        processed_data = engineer_features(df)
-        customer_id = df["Phone Number"].iloc[0] if len(df) > 0 else None
-        if customer_id is None:
-            raise HTTPException(status_code=400, detail="No valid customer data found")
-
-        customer_row = processed_data[processed_data["Phone Number"] == customer_id].iloc[0]
-
-        feature_dict = {
-            "txn_count": customer_row["txn_count"],
-            "net_amount": customer_row["net_amount"],
-            "avg_amount": customer_row["avg_amount"],
-            "amount_std": customer_row["amount_std"],
-            "dwr": customer_row["dwr"],
-            "customer_duration_days": customer_row["customer_duration_days"],
-            "hour_mean": customer_row["hour_mean"],
-            "hour_std": customer_row["hour_std"]
-        }
-
-        assessment = predictor.predict_full_assessment(feature_dict)
-
-        # Firestore operations
+        source = await read_upload_source(file)
+
+        # Identical re-uploads (client retries, repeated statements) scored under the
+        # current model return the stored assessment without parsing or inference
+        upload_hash = await run_in_threadpool(hash_upload, source)
+        dedup_key = (current_user["uid"], upload_hash, predictor.model_version)
+        previous = recent_uploads.get(dedup_key)
+        if previous is not None:
+            return previous
         try:
-            get_or_create_user(current_user["uid"], current_user.get("email"))
-            prediction_id = save_prediction(
+            stored = await get_storage().find_prediction_by_upload(
+                current_user["uid"], upload_hash, predictor.model_version
+            )
+        except Exception as lookup_error:
+            print(f"Warning: upload deduplication lookup failed: {lookup_error}")
+            stored = None
+        if stored:
+            response = prediction_response_from_document(stored, current_user["uid"])
+            recent_uploads.set(dedup_key, response)
+            return response
+
+        # Parsing, feature engineering and inference run in the scoring pool
+        result = await scoring_executor.run(score_upload, source, False)
+
+        customer = result["customers"][0]
+        assessment = customer["assessment"]
+        feature_dict = customer["feature_values"]
+        transaction_count = result["transaction_count"]
+        # A hot reload may have swapped models while the job was queued
+        model_version = result["model_version"]
+        dedup_key = (current_user["uid"], upload_hash, model_version)
+
+        # One batched write stores the prediction and any needed user upsert; the
+        # response comes from the write result instead of reading the document back
+        try:
+            stored = await get_storage().save_prediction(
                 uid=current_user["uid"],
                 assessment=assessment,
                 feature_values=feature_dict,
-                transaction_count=len(df),
-                file_name=file.filename
+                transaction_count=transaction_count,
+                file_name=file.filename,
+                upload_hash=upload_hash,
+                model_version=model_version,
+                email=current_user.get("email")
             )
-            
-            # Get the saved prediction to return with id/user_id/created_at
-            latest_prediction = get_latest_prediction(current_user["uid"])
-            if latest_prediction:
-                # Convert Firestore Timestamp to datetime
-                created_at = convert_firestore_timestamp(latest_prediction.get('created_at'))
-                
-                return PredictionResponse(
-                    id=latest_prediction.get('id', prediction_id),
-                    user_id=latest_prediction.get('user_id', current_user["uid"]),
-                    credit_score=assessment['credit_score'],
-                    risk_probability=assessment['risk_probability'],
-                    risk_category=assessment['risk_category'],
-                    interpretation=assessment.get('interpretation'),
-                    feature_values=feature_dict,
-                    transaction_count=len(df),
-                    file_name=file.filename,
-                    created_at=created_at
-                )
-            else:
-                # Fallback if we can't retrieve the saved prediction
-                return PredictionResponse(
-                    id=prediction_id,
-                    user_id=current_user["uid"],
-                    credit_score=assessment['credit_score'],
-                    risk_probability=assessment['risk_probability'],
-                    risk_category=assessment['risk_category'],
-                    interpretation=assessment.get('interpretation'),
-                    feature_values=feature_dict,
-                    transaction_count=len(df),
-                    file_name=file.filename,
-                    created_at=datetime.now()
-                )
+            response = prediction_response_from_document(stored, current_user["uid"])
+            recent_uploads.set(dedup_key, response)
+            return response
         except Exception as db_error:
             print(f"Warning: failed to persist prediction: {db_error}")
             # Return assessment without id/user_id/created_at if save fails
             raise HTTPException(status_code=500, detail=f"Failed to save prediction: {str(db_error)}")
 
-    except pd.errors.EmptyDataError:
-        raise HTTPException(status_code=400, detail="Empty CSV file")
-    except pd.errors.ParserError:
-        raise HTTPException(status_code=400, detail="Invalid CSV format")
+    except HTTPException:
+        raise
+    except UploadValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+
+@app.post("/api/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """Predict credit scores for every customer in an uploaded transaction CSV file"""
+    if models.active is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+
+    if not file.filename.endswith(".csv"):
+        raise HTTPException(status_code=400, detail="File must be a CSV file")
+
+    try:
+        source = await read_upload_source(file)
+        # Stored on every row, so a retry after a partly failed save writes only
+        # the customers that are missing
+        upload_hash = await run_in_threadpool(hash_upload, source)
+        result = await scoring_executor.run(score_upload, source, True)
+
+        records = [
+            {
+                "customer_id": customer["customer_id"],
+                "assessment": customer["assessment"],
+                "feature_values": customer["feature_values"],
+                "transaction_count": int(customer["feature_values"]["txn_count"]),
+                "model_version": result["model_version"],
+            }
+            for customer in result["customers"]
+        ]
+
+        try:
+            prediction_ids = await get_storage().save_predictions(
+                uid=current_user["uid"],
+                records=records,
+                file_name=file.filename,
+                upload_hash=upload_hash,
+                email=current_user.get("email")
+            )
+        except Exception as db_error:
+            print(f"Warning: failed to persist batch predictions: {db_error}")
+            raise HTTPException(status_code=500, detail=f"Failed to save predictions: {str(db_error)}")
+
+        predictions = [
+            CustomerPrediction(
+                id=prediction_id,
+                customer_id=record["customer_id"],
+                credit_score=record["assessment"]["credit_score"],
+                risk_probability=record["assessment"]["risk_probability"],
+                risk_category=record["assessment"]["risk_category"],
+                interpretation=record["assessment"].get("interpretation"),
+                feature_values=record["feature_values"],
+                transaction_count=record["transaction_count"],
+                model_version=record["model_version"]
+            )
+            for prediction_id, record in zip(prediction_ids, records)
+        ]
+
+        return BatchPredictionResponse(
+            user_id=current_user["uid"],
+            file_name=file.filename,
+            transaction_count=result["transaction_count"],
+            count=len(predictions),
+            predictions=predictions
+        )
+
+    except HTTPException:
+        raise
+    except UploadValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
@@ -246,8 +437,12 @@ async def create_profile(
     current_user: dict = Depends(get_current_user)
 ):
     """Create or update user profile"""
-    get_or_create_user(current_user["uid"], current_user.get("email"))
-    profile = create_or_update_user_profile(current_user["uid"], profile_data.model_dump())
+    profile = await get_storage().create_or_update_user_profile(
+        current_user["uid"],
+        profile_data.model_dump(),
+        email=current_user.get("email"),
+        ensure_user=True
+    )
     
     # Convert Firestore Timestamps to datetime
     if 'created_at' in profile:
@@ -261,7 +456,7 @@ async def create_profile(
 @app.get("/api/profile", response_model=UserProfileResponse)
 async def get_profile(current_user: dict = Depends(get_current_user)):
     """Get user profile"""
-    profile = get_user_profile(current_user["uid"])
+    profile = await get_storage().get_user_profile(current_user["uid"])
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
     
@@ -282,7 +477,7 @@ async def update_profile(
     current_user: dict = Depends(get_current_user)
 ):
     """Update user profile"""
-    profile = create_or_update_user_profile(current_user["uid"], profile_data.model_dump())
+    profile = await get_storage().create_or_update_user_profile(current_user["uid"], profile_data.model_dump())
     
     # Convert Firestore Timestamps to datetime
     if 'created_at' in profile:
@@ -300,10 +495,18 @@ async def update_profile(
 async def get_predictions(
     current_user: dict = Depends(get_current_user),
     limit: int = Query(10, ge=1, le=100),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
 ):
     """Get user's prediction history"""
-    predictions = get_user_predictions(current_user["uid"], limit=limit, offset=offset)
+    # The page and the total are independent queries, so run them concurrently
+    try:
+        (predictions, next_cursor), total_count = await asyncio.gather(
+            get_storage().get_user_predictions(current_user["uid"], limit=limit, offset=offset, cursor=cursor),
+            get_storage().count_user_predictions(current_user["uid"])
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Convert Firestore Timestamps to datetime for each prediction
     converted_predictions = []
@@ -313,16 +516,13 @@ async def get_predictions(
             converted_pred['created_at'] = convert_firestore_timestamp(converted_pred['created_at'])
         converted_predictions.append(converted_pred)
     
-    # Get total count (we'd need to query separately for this, but for now use the returned count)
-    # Note: This returns count of items returned, not total. For accurate total, need separate query.
-    total_count = len(converted_predictions)
-    
     return {
         "predictions": converted_predictions,
         "total": total_count,
         "count": len(converted_predictions),
         "limit": limit,
-        "offset": offset
+        "offset": offset,
+        "next_cursor": next_cursor
     }
 
 
@@ -332,8 +532,17 @@ async def get_score_history(
     limit: int = Query(12, ge=1, le=100)
 ):
     """Get user's historical credit scores"""
-    history = get_user_score_history(current_user["uid"], limit=limit)
+    history = await get_storage().get_user_score_history(current_user["uid"], limit=limit)
     return history
 
+
+@app.get("/api/scores/summary", response_model=ScoreSummaryResponse)
+async def get_score_summary(current_user: dict = Depends(get_current_user)):
+    """Get user's recent credit scores and monthly score aggregates"""
+    return await get_storage().get_user_score_summary(current_user["uid"])
+
+startup_timings["import_ms"] = round((time.perf_counter() - _import_started) * 1e3, 1)
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
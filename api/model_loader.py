@@ -0,0 +1,156 @@
+"""
+Model Loader
+Owns the model that serves requests. Loads the active version from the model
+registry (or the legacy models/ files when there is no registry), and in the
+background watches the registry's CURRENT pointer: a newly activated version is
+loaded, validated and warmed off the event loop, then swapped in atomically while
+requests already running finish on the previous model.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.predict import CreditScorePredictor
+from src.inference.registry import CURRENT_POINTER, current_version, predictor_paths
+
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "models/registry")
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "30"))
+
+# Rows scored to validate and warm a candidate model before it serves traffic. More
+# than CACHE_MAX_BATCH_ROWS, so validation bypasses the prediction cache
+VALIDATION_ROWS = 128
+
+
+def validate_predictor(predictor: CreditScorePredictor) -> None:
+    """
+    Score synthetic rows around the training distribution and check the output.
+    This also faults in the model's pages and fills the inference code paths, so the
+    first real request after a swap does not pay for them.
+
+    Raises:
+        ValueError: If the model produces non-finite or out-of-range probabilities
+    """
+    mean = np.asarray(predictor._scaler_mean, dtype=np.float64)
+    scale = np.asarray(predictor._scaler_scale, dtype=np.float64)
+    rng = np.random.default_rng(0)
+    X = mean + rng.normal(0, 1, size=(VALIDATION_ROWS, len(mean))) * scale
+    results = predictor.predict_many(X)
+    risk = results['risk_probability']
+    if len(risk) != VALIDATION_ROWS or not np.all(np.isfinite(risk)) or np.any((risk < 0) | (risk > 1)):
+        raise ValueError("Model produced invalid risk probabilities during validation")
+
+
+class ModelManager:
+    """
+    Holds the serving model and hot-reloads new registry versions.
+
+    Handlers read `active` once per request; the reference is replaced in a single
+    assignment, so every request sees one complete model.
+    """
+
+    def __init__(self, executor, registry_dir: str = MODEL_REGISTRY_DIR,
+                 default_paths: Optional[dict] = None):
+        """
+        Initialize the manager.
+
+        Args:
+            executor: ScoringExecutor that runs scoring jobs on the active model
+            registry_dir: Registry root holding version directories and CURRENT
+            default_paths: CreditScorePredictor arguments used when the registry has
+                no active version
+        """
+        self.executor = executor
+        self.registry_dir = Path(registry_dir)
+        self.default_paths = default_paths or {}
+        self.active: Optional[CreditScorePredictor] = None
+        self.version: Optional[str] = None
+        self.loaded_at: Optional[datetime] = None
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        # (version, pointer mtime) of a failed load, so it is retried only when
+        # CURRENT is written again rather than on every poll
+        self._failed: Optional[tuple] = None
+        self._lock = asyncio.Lock()
+
+    def _load(self, version: Optional[str]) -> CreditScorePredictor:
+        paths = predictor_paths(self.registry_dir, version) if version else self.default_paths
+        predictor = CreditScorePredictor(**paths)
+        validate_predictor(predictor)
+        return predictor
+
+    def _activate(self, predictor: CreditScorePredictor, version: Optional[str]) -> None:
+        self.active = predictor
+        self.version = version
+        self.loaded_at = datetime.now(timezone.utc)
+
+    def start(self) -> CreditScorePredictor:
+        """Load the active version (blocking) and start the scoring executor on it."""
+        version = current_version(self.registry_dir)
+        predictor = self._load(version)
+        self.executor.start(predictor)
+        self._activate(predictor, version)
+        return predictor
+
+    async def reload_if_changed(self) -> bool:
+        """
+        Load, validate and swap in the registry's active version if it changed.
+
+        Returns:
+            True if a new model now serves requests
+        """
+        async with self._lock:
+            version = current_version(self.registry_dir)
+            if version is None or version == self.version:
+                return False
+            attempt = (version, self._pointer_mtime())
+            if attempt == self._failed:
+                return False
+            start = time.perf_counter()
+            try:
+                predictor = await asyncio.to_thread(self._load, version)
+                await asyncio.to_thread(self.executor.swap, predictor)
+            except Exception as e:
+                # Keep serving the current model
+                self.last_error = f"{version}: {str(e)}"
+                self._failed = attempt
+                print(f"Error loading model version {version}: {str(e)}")
+                return False
+            previous = self.version
+            self._activate(predictor, version)
+            self.reloads += 1
+            self.last_error = None
+            print(f"Model version {version} active (was {previous}), "
+                  f"swapped in {round((time.perf_counter() - start) * 1e3, 1)} ms")
+            return True
+
+    def _pointer_mtime(self) -> Optional[int]:
+        try:
+            return (self.registry_dir / CURRENT_POINTER).stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    async def watch(self, interval: float = MODEL_RELOAD_INTERVAL) -> None:
+        """Poll the registry pointer until cancelled; runs as a background task."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.reload_if_changed()
+
+    def stats(self) -> Optional[dict]:
+        if self.active is None:
+            return None
+        return self.active.load_info | {
+            "version": self.version,
+            "model_version": self.active.model_version,
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+            "reloads": self.reloads,
+            "last_reload_error": self.last_error,
+        }
@@ -55,6 +55,7 @@ class PredictionResponse(BaseModel):
     feature_values: Optional[dict] = None
     transaction_count: Optional[int] = None
     file_name: Optional[str] = None
+    model_version: Optional[str] = None
     created_at: Optional[datetime] = None
 
     class Config:
@@ -68,9 +69,43 @@ class ScoreHistoryItem(BaseModel):
     risk_probability: float
 
 
+class MonthlyScoreSummary(BaseModel):
+    month: str
+    count: int
+    average_score: float
+    min_score: int
+    max_score: int
+    average_risk_probability: float
+
+
+class ScoreSummaryResponse(BaseModel):
+    history: List[ScoreHistoryItem]
+    monthly: List[MonthlyScoreSummary]
+
+
 class PredictionListResponse(BaseModel):
     predictions: List[PredictionResponse]
     total: int
     limit: int
     offset: int
-    count: int
\ No newline at end of file
+    count: int
+    next_cursor: Optional[str] = None
+
+class CustomerPrediction(BaseModel):
+    id: str
+    customer_id: str
+    credit_score: int
+    risk_probability: float
+    risk_category: str
+    interpretation: Optional[str] = None
+    feature_values: Optional[dict] = None
+    transaction_count: Optional[int] = None
+    model_version: Optional[str] = None
+
+
+class BatchPredictionResponse(BaseModel):
+    user_id: str
+    file_name: Optional[str] = None
+    transaction_count: int
+    count: int
+    predictions: List[CustomerPrediction]
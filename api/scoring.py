@@ -0,0 +1,265 @@
+"""
+Scoring Executor
+Runs CSV parsing, feature engineering and model inference off the asyncio event loop,
+in either a thread pool or a process pool with the model preloaded in every worker.
+"""
+
+import asyncio
+import io
+import multiprocessing
+import os
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.predict import CreditScorePredictor
+
+# Upload limits: files above MAX_UPLOAD_BYTES are rejected before parsing, and
+# accepted files are parsed UPLOAD_CHUNK_ROWS rows at a time
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_CHUNK_ROWS = int(os.getenv("UPLOAD_CHUNK_ROWS", "50000"))
+
+# Predictor used by scoring functions in this process. Set by ScoringExecutor.start in
+# thread mode and by _init_worker inside each process-pool worker.
+_predictor: Optional[CreditScorePredictor] = None
+
+
+class UploadValidationError(ValueError):
+    """Raised when an uploaded statement cannot be scored because of its content."""
+
+
+def _init_worker(model_path: str, scaler_path: str, features_path: str,
+                 artifact_dir: Optional[str] = None) -> None:
+    """
+    Process-pool initializer: load the model once per worker process. With an
+    artifact directory the workers memory-map the same files and share their pages.
+    """
+    global _predictor
+    _predictor = CreditScorePredictor(
+        model_path=model_path,
+        scaler_path=scaler_path,
+        features_path=features_path,
+        artifact_dir=artifact_dir
+    )
+    warm_up()
+
+
+def format_customer_id(value) -> str:
+    """Render a customer key as a string, dropping the float suffix pandas adds to phone numbers"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def score_upload(source, all_customers: bool = False, chunk_rows: Optional[int] = None) -> dict:
+    """
+    Stream an uploaded transaction CSV in chunks, engineer features and score it.
+    Any statement layout known to src.features.ingest is accepted.
+
+    The file is parsed straight from bytes, one chunk at a time, and each chunk is folded
+    into per-customer partial aggregates, so memory depends on the chunk size and the
+    number of customers rather than on the file size.
+
+    Args:
+        source: Raw CSV bytes or a binary file object positioned at the start
+        all_customers: Score every customer in the file instead of only the first one
+        chunk_rows: Rows parsed per chunk (defaults to UPLOAD_CHUNK_ROWS)
+
+    Returns:
+        dict with the file's transaction_count and a list of customers, each holding
+        customer_id, feature_values and assessment, plus the model_version that
+        scored them
+    """
+    # Read once: a model swap during this job does not change the model it uses
+    predictor = _predictor
+    if predictor is None:
+        raise RuntimeError("Scoring worker has no model loaded")
+    import pandas as pd
+    from src.features.feature_state import CustomerFeatureState
+    from src.features.ingest import detect_schema, missing_columns, read_header, read_transactions
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    chunk_rows = chunk_rows or UPLOAD_CHUNK_ROWS
+
+    transaction_count = 0
+    first_customer = None
+    state = CustomerFeatureState()
+    try:
+        # Reject bad files from the header, before reading on
+        columns = read_header(source)
+        schema = detect_schema(columns)
+        if schema is None:
+            raise UploadValidationError(f"Missing columns: {missing_columns(columns)}")
+        for chunk in read_transactions(source, schema=schema, chunksize=chunk_rows):
+            if transaction_count == 0 and len(chunk) > 0:
+                first_customer = chunk["Phone Number"].iloc[0]
+            transaction_count += len(chunk)
+            state.update(chunk)
+    except UnicodeDecodeError:
+        raise UploadValidationError("File must be UTF-8 encoded")
+    except pd.errors.EmptyDataError:
+        raise UploadValidationError("Empty CSV file")
+    except pd.errors.ParserError:
+        raise UploadValidationError("Invalid CSV format")
+    except (ValueError, TypeError) as e:
+        if isinstance(e, UploadValidationError):
+            raise
+        raise UploadValidationError(f"Malformed transaction data: {str(e)}")
+
+    if len(state) == 0:
+        raise UploadValidationError("No valid customer data found")
+
+    customer_rows = state.to_features()
+    if not all_customers:
+        customer_rows = customer_rows[customer_rows["Phone Number"] == first_customer].iloc[:1]
+    if customer_rows.empty:
+        raise UploadValidationError("No valid customer data found")
+
+    # One vectorized model call for every customer being scored
+    assessments = predictor.predict_batch_assessment(customer_rows)
+    feature_values = customer_rows[predictor.features].to_dict("records")
+
+    return {
+        "transaction_count": transaction_count,
+        "model_version": predictor.model_version,
+        "customers": [
+            {
+                "customer_id": format_customer_id(phone),
+                "feature_values": features,
+                "assessment": assessment,
+            }
+            for phone, features, assessment in zip(
+                customer_rows["Phone Number"], feature_values, assessments
+            )
+        ],
+    }
+
+
+def _worker_model_version(_=None) -> Optional[str]:
+    """Version of the model loaded in this worker; mapped over a pool to check a swap."""
+    return _predictor.model_version if _predictor is not None else None
+
+
+def warm_up() -> None:
+    """Import the parsing and feature modules ahead of the first upload."""
+    import pandas
+    from src.features.feature_state import CustomerFeatureState
+    from src.features.ingest import to_canonical
+
+
+class ScoringExecutor:
+    """
+    Bounded pool for CPU-bound scoring work.
+
+    Configured with SCORING_EXECUTOR ("thread" or "process") and SCORING_WORKERS.
+    Tracks in-flight jobs so queue depth can be reported by the health check.
+    """
+
+    def __init__(self, mode: Optional[str] = None, max_workers: Optional[int] = None):
+        self.mode = (mode or os.getenv("SCORING_EXECUTOR", "thread")).lower()
+        if self.mode not in ("thread", "process"):
+            raise ValueError(f"Unknown scoring executor mode: {self.mode}")
+        self.max_workers = max_workers or int(
+            os.getenv("SCORING_WORKERS", str(min(4, os.cpu_count() or 1)))
+        )
+        self._pool: Optional[Executor] = None
+        self._in_flight = 0
+        self._completed = 0
+
+    def start(self, predictor: CreditScorePredictor) -> None:
+        """Create the worker pool and make the model available to it."""
+        global _predictor
+        if self.mode == "process":
+            self._pool = self._process_pool(predictor)
+        else:
+            _predictor = predictor
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="scoring"
+            )
+
+    def _process_pool(self, predictor: CreditScorePredictor) -> ProcessPoolExecutor:
+        # spawn avoids forking a parent that already holds gRPC/Firebase threads
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(
+                str(predictor.model_path),
+                str(predictor.scaler_path),
+                str(predictor.features_path),
+                str(predictor.artifact_dir) if predictor.artifact_dir else None,
+            ),
+        )
+
+    def swap(self, predictor: CreditScorePredictor) -> None:
+        """
+        Serve new jobs with another model while jobs already running finish on the old one.
+
+        Thread mode swaps the shared predictor reference. Process mode starts a new
+        pool, waits until every worker has loaded the new model, switches to it and
+        then drains the old pool. Blocking; call it from a worker thread.
+        """
+        global _predictor
+        if self._pool is None:
+            raise RuntimeError("Scoring executor is not running")
+        if self.mode != "process":
+            _predictor = predictor
+            return
+
+        pool = self._process_pool(predictor)
+        try:
+            # One job per worker makes the pool spawn and initialize all of them
+            versions = set(pool.map(_worker_model_version, range(self.max_workers)))
+        except Exception:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        if versions != {predictor.model_version}:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise RuntimeError(f"Scoring workers loaded {sorted(map(str, versions))}, "
+                               f"expected {predictor.model_version}")
+        old_pool, self._pool = self._pool, pool
+        old_pool.shutdown(wait=True)
+
+    @property
+    def shares_memory(self) -> bool:
+        """True when jobs run in this process and can read an open upload spool directly."""
+        return self.mode == "thread"
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, fn, *args):
+        """Run fn(*args) in the pool and await its result without blocking the loop."""
+        if self._pool is None:
+            raise RuntimeError("Scoring executor is not running")
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        try:
+            pool = self._pool
+            try:
+                future = loop.run_in_executor(pool, fn, *args)
+            except RuntimeError:
+                # The pool was swapped out and shut down between the read and the submit
+                if self._pool is pool or self._pool is None:
+                    raise
+                future = loop.run_in_executor(self._pool, fn, *args)
+            return await future
+        finally:
+            self._in_flight -= 1
+            self._completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "in_flight": self._in_flight,
+            "queue_depth": max(0, self._in_flight - self.max_workers),
+            "completed": self._completed,
+        }
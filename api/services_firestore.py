@@ -1,58 +1,262 @@
-from typing import Optional, List, Dict
-from datetime import datetime
-from firebase_admin import firestore
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple
+from datetime import datetime, timezone
+from firebase_admin import firestore, firestore_async
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.auth_middleware import init_firebase
+from api.storage import StorageBackend, decode_cursor, encode_cursor, first_retained_month
+from src.inference.cache import LRUTTLCache
+
+# Firestore rejects batches with more than 500 writes
+FIRESTORE_BATCH_LIMIT = 500
+
+# Users this process has already seen in Firestore, mapped to their stored email, so
+# repeat requests skip the user-document read
+_known_users = LRUTTLCache(
+    maxsize=int(os.getenv("KNOWN_USERS_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("KNOWN_USERS_TTL", "3600"))
+)
+
+# Last profile read or written per user, merged with new fields to answer profile
+# writes without reading the document back. Never used to serve profile reads.
+_profiles = LRUTTLCache(
+    maxsize=int(os.getenv("PROFILE_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PROFILE_CACHE_TTL", "300"))
+)
+
+# Points kept in the rolling score history on the user document, and months of
+# score aggregates kept counting the current one. Both are cut on every write, so
+# the user document stays far below Firestore's 1 MiB limit.
+SCORE_HISTORY_LENGTH = int(os.getenv("SCORE_HISTORY_LENGTH", "100"))
+SCORE_MONTHS_RETENTION = int(os.getenv("SCORE_MONTHS_RETENTION", "24"))
+
+# Marker written with the score summary. Users without it have predictions older
+# than the summary fields; their first save_prediction builds it from those
+SCORE_SUMMARY_VERSION = 1
+
+_UNKNOWN = object()
 
 def _get_db():
-    return firestore.client()
+    # The Firebase app is initialized lazily; the async client is created once per
+    # app and reused across requests
+    init_firebase()
+    return firestore_async.client()
 
-def get_or_create_user(uid: str, email: Optional[str] = None) -> dict:
-    db = _get_db()
-    ref = db.collection('users').document(uid)
-    snap = ref.get()
+
+async def _nothing():
+    return None
+
+
+async def _load_user(db, uid: str) -> Tuple[bool, Optional[str]]:
+    """(exists, stored email) for a user; only users unknown to this process cost a read"""
+    stored = _known_users.get(uid, _UNKNOWN)
+    if stored is not _UNKNOWN:
+        return True, stored
+    snap = await db.collection('users').document(uid).get()
     if not snap.exists:
-        ref.set({
+        return False, None
+    return True, (snap.to_dict() or {}).get('email')
+
+
+def _stage_user_upsert(db, batch, uid: str, email: Optional[str],
+                       user: Tuple[bool, Optional[str]],
+                       extra: Optional[dict] = None) -> Optional[str]:
+    """
+    Add whatever write the user document needs to a batch or transaction, as a
+    single merge of the fields it sets; map fields are replaced whole.
+
+    Known users with an unchanged email and no extra fields add nothing to the batch.
+
+    Args:
+        user: (exists, stored email) from _load_user
+        extra: Additional fields to merge into the user document
+
+    Returns:
+        The email stored for the user once the batch is committed
+    """
+    ref = db.collection('users').document(uid)
+    exists, stored = user
+    data = dict(extra or {})
+    if not exists:
+        data.update({
             'email': email,
             'created_at': firestore.SERVER_TIMESTAMP,
             'updated_at': firestore.SERVER_TIMESTAMP,
+                # A new user has no earlier predictions to summarize
+            'score_summary_version': SCORE_SUMMARY_VERSION,
         })
-    else:
-        if email and snap.get('email') != email:
-            ref.update({'email': email, 'updated_at': firestore.SERVER_TIMESTAMP})
+        stored = email
+    elif email and stored != email:
+        data.update({'email': email, 'updated_at': firestore.SERVER_TIMESTAMP})
+        stored = email
+    if data:
+        batch.set(ref, data, merge=list(data))
+    return stored
+
+
+def _history_point(prediction_id: str, assessment: Dict, date: datetime) -> dict:
+    return {
+        'id': prediction_id,
+        'score': assessment['credit_score'],
+        'date': date.isoformat(),
+        'category': assessment['risk_category'],
+        'risk_probability': assessment['risk_probability'],
+    }
+
+
+def _add_score_point(summary: dict, point: dict, now: datetime) -> dict:
+    """
+    Fold one point into a score summary: prepend it to the history, cut the
+    history to SCORE_HISTORY_LENGTH and drop months past SCORE_MONTHS_RETENTION.
+    """
+    history = [point] + [p for p in summary.get('score_history') or [] if p['id'] != point['id']]
+    history.sort(key=lambda p: datetime.fromisoformat(p['date']), reverse=True)
+
+    months = dict(summary.get('score_months') or {})
+    month = point['date'][:7]
+    agg = dict(months.get(month) or {
+        'count': 0, 'score_sum': 0, 'risk_sum': 0.0,
+        'min_score': point['score'], 'max_score': point['score'],
+    })
+    agg['count'] += 1
+    agg['score_sum'] += point['score']
+    agg['risk_sum'] += point['risk_probability']
+    agg['min_score'] = min(agg['min_score'], point['score'])
+    agg['max_score'] = max(agg['max_score'], point['score'])
+    months[month] = agg
+
+    first = first_retained_month(now, SCORE_MONTHS_RETENTION)
+    return {
+        'score_history': history[:SCORE_HISTORY_LENGTH],
+        'score_months': {m: a for m, a in months.items() if m >= first},
+    }
+
+
+def _summary_query(db, uid: str):
+    """Projected query over the fields a score summary needs from a user's predictions"""
+    return (
+        db.collection('predictions')
+        .where('uid', '==', uid)
+        .select(['credit_score', 'risk_probability', 'risk_category', 'created_at', 'customer_id'])
+    )
+
+
+async def _summarize_predictions(docs, now: datetime) -> dict:
+    """
+    Score summary of a user's own (non-batch) predictions, streamed from
+    _summary_query, bounded as on write.
+    """
+    summary: dict = {}
+    async for d in docs:
+        prediction = d.to_dict()
+        ts = prediction.get('created_at')
+        if prediction.get('customer_id') is not None or not hasattr(ts, 'isoformat'):
+            continue
+        point = _history_point(d.id, {
+            'credit_score': prediction.get('credit_score'),
+            'risk_category': prediction.get('risk_category'),
+            'risk_probability': prediction.get('risk_probability'),
+        }, ts)
+        summary = _add_score_point(summary, point, now)
+    return summary
+
+
+async def get_or_create_user(uid: str, email: Optional[str] = None) -> dict:
+    db = _get_db()
+    batch = db.batch()
+    stored_email = _stage_user_upsert(db, batch, uid, email, await _load_user(db, uid))
+    if len(batch):
+        await batch.commit()
+    _known_users.set(uid, stored_email)
     return {'uid': uid, 'email': email}
 
 
-def get_user_profile(uid: str) -> Optional[dict]:
+async def get_user_profile(uid: str) -> Optional[dict]:
     db = _get_db()
     ref = db.collection('users').document(uid).collection('profile').document('profile')
-    snap = ref.get()
-    return snap.to_dict() if snap.exists else None
+    snap = await ref.get()
+    if not snap.exists:
+        return None
+    profile = snap.to_dict()
+    _profiles.set(uid, dict(profile))
+    return profile
+
 
+async def create_or_update_user_profile(
+    uid: str,
+    payload: dict,
+    email: Optional[str] = None,
+    ensure_user: bool = False
+) -> dict:
+    """
+    Merge the given fields into the user's profile.
 
-def create_or_update_user_profile(uid: str, payload: dict) -> dict:
+    When ensure_user is set, the user document upsert goes into the same batch as
+    the profile write. The response is the last known profile merged with the new
+    fields and the write time; when this process holds no copy of the profile it is
+    read before the write, concurrently with the user lookup.
+    """
     db = _get_db()
     ref = db.collection('users').document(uid).collection('profile').document('profile')
     data = {k: v for k, v in payload.items() if v is not None}
-    if not data:
-        data = {}
     data['updated_at'] = firestore.SERVER_TIMESTAMP
-    ref.set(data, merge=True)
-    snap = ref.get()
-    out = snap.to_dict() or {}
+
+    cached = _profiles.get(uid)
+    user, snap = await asyncio.gather(
+        _load_user(db, uid) if ensure_user else _nothing(),
+        ref.get() if cached is None else _nothing(),
+    )
+    if cached is None:
+        cached = (snap.to_dict() or {}) if snap.exists else {}
+
+    batch = db.batch()
+    stored_email = _stage_user_upsert(db, batch, uid, email, user) if ensure_user else None
+    batch.set(ref, data, merge=True)
+    results = await batch.commit()
+    if ensure_user:
+        _known_users.set(uid, stored_email)
+
+    out = cached | data
+    out['updated_at'] = results[-1].update_time
+    _profiles.set(uid, dict(out))
     out['id'] = 'profile'
     out['user_id'] = uid
     return out
 
 
-def save_prediction(
+async def save_prediction(
     uid: str,
     assessment: Dict,
     feature_values: Optional[Dict] = None,
     transaction_count: Optional[int] = None,
-    file_name: Optional[str] = None
-) -> str:
+    file_name: Optional[str] = None,
+    upload_hash: Optional[str] = None,
+    model_version: Optional[str] = None,
+    email: Optional[str] = None
+) -> dict:
+    """
+    Persist an assessment together with the user upsert and the user's score
+    summary in one transaction on the user document.
+
+    The transaction reads the summary, adds the new point and writes it back cut
+    to SCORE_HISTORY_LENGTH points and SCORE_MONTHS_RETENTION months, so concurrent
+    saves for one user retry rather than overwrite each other. A user without the
+    SCORE_SUMMARY_VERSION marker has their summary built from their earlier
+    predictions first, once.
+
+    Returns:
+        The stored prediction with its id, user_id and created_at, where created_at
+        is the commit time the server timestamp resolved to
+    """
     db = _get_db()
+    user_ref = db.collection('users').document(uid)
     ref = db.collection('predictions').document()
-    ref.set({
+    data = {
         'uid': uid,
         'credit_score': assessment['credit_score'],
         'risk_probability': assessment['risk_probability'],
@@ -61,50 +265,225 @@ def save_prediction(
         'feature_values': feature_values,
         'transaction_count': transaction_count,
         'file_name': file_name,
+        'upload_hash': upload_hash,
+        'model_version': model_version,
+        # Stored explicitly so upload lookups can tell it from batch rows
+        'customer_id': None,
         'created_at': firestore.SERVER_TIMESTAMP,
-    })
-    return ref.id
+    }
 
+    @firestore.async_transactional
+    async def save(transaction) -> Optional[str]:
+        snap = await user_ref.get(transaction=transaction)
+        user = (snap.to_dict() or {}) if snap.exists else {}
+        # Sentinels are not allowed inside arrays, so the history point carries the
+        # client clock rather than the server timestamp
+        now = datetime.now(timezone.utc)
+        if snap.exists and user.get('score_summary_version') != SCORE_SUMMARY_VERSION:
+            summary = await _summarize_predictions(
+                _summary_query(db, uid).stream(transaction=transaction), now
+            )
+        else:
+            summary = user
+        summary = _add_score_point(summary, _history_point(ref.id, assessment, now), now)
+        summary['score_summary_version'] = SCORE_SUMMARY_VERSION
+        stored_email = _stage_user_upsert(
+            db, transaction, uid, email, (snap.exists, user.get('email')), extra=summary
+        )
+        transaction.set(ref, data)
+        return stored_email
 
-def get_user_predictions(uid: str, limit: int = 10, offset: int = 0) -> List[dict]:
-    db = _get_db()
+    transaction = db.transaction()
+    stored_email = await save(transaction)
+    _known_users.set(uid, stored_email)
+    return data | {'id': ref.id, 'user_id': uid, 'created_at': transaction.commit_time}
+
+
+async def _saved_customers(db, uid: str, upload_hash: str) -> Dict[Tuple[str, str], str]:
+    """(customer_id, model_version) -> prediction id for batch rows already stored for an upload"""
     q = (
         db.collection('predictions')
         .where('uid', '==', uid)
-        .order_by('created_at', direction=firestore.Query.DESCENDING)
-        .limit(limit + offset)
+        .where('upload_hash', '==', upload_hash)
+        .select(['customer_id', 'model_version'])
     )
-    docs = list(q.stream())
-    items = [d.to_dict() | {'id': d.id, 'user_id': uid} for d in docs]
-    return items[offset:]
+    saved = {}
+    async for d in q.stream():
+        prediction = d.to_dict()
+        if prediction.get('customer_id') is not None:
+            saved[(prediction['customer_id'], prediction.get('model_version'))] = d.id
+    return saved
 
 
-def get_user_score_history(uid: str, limit: int = 12) -> List[dict]:
+async def save_predictions(
+    uid: str,
+    records: List[Dict],
+    file_name: Optional[str] = None,
+    upload_hash: Optional[str] = None,
+    email: Optional[str] = None
+) -> List[str]:
+    """
+    Persist many customer assessments using batched writes. The first batch also
+    carries the user upsert, and the batches are committed concurrently.
+
+    Rows carry upload_hash. Batches are not atomic with each other, so when some
+    commit and others fail, a retry of the same upload finds the customers already
+    stored, writes only the rest and returns the stored ids for all of them.
+    """
     db = _get_db()
+    user, saved = await asyncio.gather(
+        _load_user(db, uid),
+        _saved_customers(db, uid, upload_hash) if upload_hash else _nothing(),
+    )
+    saved = saved or {}
+    ids: List[str] = []
+    pending = []
+    for record in records:
+        key = (record.get('customer_id'), record.get('model_version'))
+        if key in saved:
+            ids.append(saved[key])
+            continue
+        assessment = record['assessment']
+        ref = db.collection('predictions').document()
+        pending.append((ref, {
+            'uid': uid,
+            'customer_id': record.get('customer_id'),
+            'credit_score': assessment['credit_score'],
+            'risk_probability': assessment['risk_probability'],
+            'risk_category': assessment['risk_category'],
+            'interpretation': assessment.get('interpretation'),
+            'feature_values': record.get('feature_values'),
+            'transaction_count': record.get('transaction_count'),
+            'file_name': file_name,
+            'upload_hash': upload_hash,
+            'model_version': record.get('model_version'),
+            'created_at': firestore.SERVER_TIMESTAMP,
+        }))
+        ids.append(ref.id)
+
+    batches = []
+    stored_email = _UNKNOWN
+    # The first batch always exists to carry the user upsert, even on a retry with
+    # nothing left to write
+    for start in range(0, max(len(pending), 1), FIRESTORE_BATCH_LIMIT - 1):
+        batch = db.batch()
+        if stored_email is _UNKNOWN:
+            stored_email = _stage_user_upsert(db, batch, uid, email, user)
+        for ref, data in pending[start:start + FIRESTORE_BATCH_LIMIT - 1]:
+            batch.set(ref, data)
+        if len(batch):
+            batches.append(batch)
+    await asyncio.gather(*(batch.commit() for batch in batches))
+    _known_users.set(uid, stored_email)
+    return ids
+
+
+async def get_user_predictions(
+    uid: str,
+    limit: int = 10,
+    offset: int = 0,
+    cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of the user's predictions, newest first.
+
+    With a cursor the page starts right after the document it points to, so every
+    page costs limit + 1 reads however deep it is. offset is kept for older clients
+    and is applied by Firestore, which still bills the skipped documents.
+
+    Returns:
+        (predictions, next_cursor), where next_cursor is None on the last page
+    """
+    db = _get_db()
+    predictions = db.collection('predictions')
     q = (
-        db.collection('predictions')
+        predictions
         .where('uid', '==', uid)
         .order_by('created_at', direction=firestore.Query.DESCENDING)
-        .limit(limit)
+        .order_by('__name__', direction=firestore.Query.DESCENDING)
     )
-    docs = list(q.stream())
-    out: List[dict] = []
-    for d in docs:
-        data = d.to_dict()
-        ts = data.get('created_at')
-        iso = None
-        if hasattr(ts, 'isoformat'):
-            iso = ts.isoformat()
-        out.append({
-            'score': data.get('credit_score'),
-            'date': iso,
-            'category': data.get('risk_category'),
-            'risk_probability': data.get('risk_probability'),
+    if cursor:
+        created_at, doc_id = decode_cursor(cursor)
+        q = q.start_after({'created_at': created_at, '__name__': predictions.document(doc_id)})
+    elif offset:
+        q = q.offset(offset)
+    # One extra document tells whether another page exists
+    docs = await q.limit(limit + 1).get()
+    page = docs[:limit]
+    next_cursor = None
+    if len(docs) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(last.get('created_at'), last.id)
+    return [d.to_dict() | {'id': d.id, 'user_id': uid} for d in page], next_cursor
+
+
+async def count_user_predictions(uid: str) -> int:
+    """Total number of stored predictions for a user, from a server-side count aggregation"""
+    db = _get_db()
+    results = await db.collection('predictions').where('uid', '==', uid).count(alias='total').get()
+    return int(results[0][0].value)
+
+
+async def get_user_score_summary(uid: str) -> dict:
+    """
+    The user's rolling score history (newest first, at most SCORE_HISTORY_LENGTH
+    points) and per-month aggregates for the last SCORE_MONTHS_RETENTION months,
+    from a single user-document read. Never writes.
+
+    Users whose summary has not been built yet (see save_prediction) are answered
+    from a projected query over their predictions instead.
+
+    Returns:
+        dict with history (list of points) and monthly (list of month aggregates,
+        oldest first)
+    """
+    db = _get_db()
+    snap = await db.collection('users').document(uid).get()
+    data = (snap.to_dict() or {}) if snap.exists else {}
+    now = datetime.now(timezone.utc)
+    if snap.exists and data.get('score_summary_version') != SCORE_SUMMARY_VERSION:
+        data = await _summarize_predictions(_summary_query(db, uid).stream(), now)
+
+    # Histories stored before writes were bounded are in append order and may be
+    # longer than SCORE_HISTORY_LENGTH until the user's next save
+    points = sorted(data.get('score_history') or [],
+                    key=lambda p: datetime.fromisoformat(p['date']), reverse=True)[:SCORE_HISTORY_LENGTH]
+    months = data.get('score_months') or {}
+    # A summary last written in an earlier month may still hold months that have
+    # since left the window
+    first = first_retained_month(now, SCORE_MONTHS_RETENTION)
+
+    monthly = []
+    for month in sorted(m for m in months if m >= first):
+        agg = months[month]
+        count = agg.get('count') or 0
+        if not count:
+            continue
+        monthly.append({
+            'month': month,
+            'count': count,
+            'average_score': agg['score_sum'] / count,
+            'min_score': agg.get('min_score'),
+            'max_score': agg.get('max_score'),
+            'average_risk_probability': agg['risk_sum'] / count,
         })
-    return out
+    return {'history': points, 'monthly': monthly}
 
 
-def get_latest_prediction(uid: str) -> Optional[dict]:
+async def get_user_score_history(uid: str, limit: int = 12) -> List[dict]:
+    summary = await get_user_score_summary(uid)
+    return [
+        {
+            'score': point['score'],
+            'date': point['date'],
+            'category': point['category'],
+            'risk_probability': point['risk_probability'],
+        }
+        for point in summary['history'][:limit]
+    ]
+
+
+async def get_latest_prediction(uid: str) -> Optional[dict]:
     db = _get_db()
     q = (
         db.collection('predictions')
@@ -112,8 +491,43 @@ def get_latest_prediction(uid: str) -> Optional[dict]:
         .order_by('created_at', direction=firestore.Query.DESCENDING)
         .limit(1)
     )
-    docs = list(q.stream())
+    docs = await q.get()
+    if not docs:
+        return None
+    d = docs[0]
+    return d.to_dict() | {'id': d.id, 'user_id': uid}
+
+
+async def find_prediction_by_upload(uid: str, upload_hash: str, model_version: str) -> Optional[dict]:
+    """Return the user's stored prediction for an identical upload under the same model."""
+    db = _get_db()
+    q = (
+        db.collection('predictions')
+        .where('uid', '==', uid)
+        .where('upload_hash', '==', upload_hash)
+        .where('model_version', '==', model_version)
+        # Batch rows of the same file carry its hash too
+        .where('customer_id', '==', None)
+        .limit(1)
+    )
+    docs = await q.get()
     if not docs:
         return None
     d = docs[0]
-    return d.to_dict() | {'id': d.id, 'user_id': uid}
\ No newline at end of file
+    return d.to_dict() | {'id': d.id, 'user_id': uid}
+
+
+class FirestoreStorage(StorageBackend):
+    """StorageBackend over the module-level Firestore functions above"""
+
+    get_or_create_user = staticmethod(get_or_create_user)
+    get_user_profile = staticmethod(get_user_profile)
+    create_or_update_user_profile = staticmethod(create_or_update_user_profile)
+    save_prediction = staticmethod(save_prediction)
+    save_predictions = staticmethod(save_predictions)
+    get_user_predictions = staticmethod(get_user_predictions)
+    count_user_predictions = staticmethod(count_user_predictions)
+    get_user_score_summary = staticmethod(get_user_score_summary)
+    get_user_score_history = staticmethod(get_user_score_history)
+    get_latest_prediction = staticmethod(get_latest_prediction)
+    find_prediction_by_upload = staticmethod(find_prediction_by_upload)
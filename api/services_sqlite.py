@@ -0,0 +1,361 @@
+"""
+SQLite Storage Backend
+Embedded single-node implementation of the storage interface, for on-prem
+deployments and for load tests that must run without network access.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.storage import StorageBackend, decode_cursor, encode_cursor, first_retained_month
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    uid TEXT PRIMARY KEY,
+    email TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS profiles (
+    uid TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS predictions (
+    id TEXT PRIMARY KEY,
+    uid TEXT NOT NULL,
+    customer_id TEXT,
+    credit_score INTEGER NOT NULL,
+    risk_probability REAL NOT NULL,
+    risk_category TEXT NOT NULL,
+    interpretation TEXT,
+    feature_values TEXT,
+    transaction_count INTEGER,
+    file_name TEXT,
+    upload_hash TEXT,
+    model_version TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_uid_created
+    ON predictions (uid, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_predictions_upload
+    ON predictions (uid, upload_hash, model_version);
+"""
+
+# Points returned in a score summary's history and months of aggregates, counting
+# the current one, as on Firestore
+SCORE_HISTORY_LENGTH = int(os.getenv("SCORE_HISTORY_LENGTH", "100"))
+SCORE_MONTHS_RETENTION = int(os.getenv("SCORE_MONTHS_RETENTION", "24"))
+
+PREDICTION_COLUMNS = (
+    'id', 'uid', 'customer_id', 'credit_score', 'risk_probability', 'risk_category',
+    'interpretation', 'feature_values', 'transaction_count', 'file_name',
+    'upload_hash', 'model_version', 'created_at'
+)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _timestamp(value: datetime) -> str:
+    # Fixed-width UTC ISO strings sort lexically in time order
+    return value.astimezone(timezone.utc).isoformat(timespec='microseconds')
+
+
+def _prediction_from_row(row: sqlite3.Row) -> dict:
+    doc = dict(row)
+    doc['feature_values'] = json.loads(doc['feature_values']) if doc['feature_values'] else None
+    doc['created_at'] = datetime.fromisoformat(doc['created_at'])
+    doc['user_id'] = doc['uid']
+    return doc
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    StorageBackend on a local SQLite database in WAL mode.
+
+    Each worker thread gets its own connection, so reads run concurrently while
+    SQLite serializes writes. Blocking calls run in threads via asyncio.to_thread.
+    An in-memory database lives on a single connection, so calls on it run one at
+    a time.
+    """
+
+    def __init__(self, path: str = "data/credit_scores.db"):
+        """
+        Initialize the backend and create the schema if needed.
+
+        Args:
+            path: Database file, or ":memory:" for a private in-memory database
+        """
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        # Serializes calls sharing the single in-memory connection, so transactions
+        # from different threads never interleave on it
+        self._memory_lock = threading.Lock() if path == ":memory:" else None
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.path == ":memory:" and self._connections:
+                # An in-memory database exists only on the connection that made it
+                conn = self._connections[0]
+            else:
+                conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30.0)
+                conn.row_factory = sqlite3.Row
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                with self._lock:
+                    self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    async def _run(self, fn, *args):
+        if self._memory_lock is None:
+            return await asyncio.to_thread(fn, *args)
+        return await asyncio.to_thread(self._run_exclusive, fn, *args)
+
+    def _run_exclusive(self, fn, *args):
+        with self._memory_lock:
+            return fn(*args)
+
+    async def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    # -------------------------------------------------
+    # Users and profiles
+    # -------------------------------------------------
+
+    @staticmethod
+    def _upsert_user(conn: sqlite3.Connection, uid: str, email: Optional[str], now: str) -> None:
+        conn.execute(
+            "INSERT INTO users (uid, email, created_at, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(uid) DO UPDATE SET email = excluded.email, updated_at = excluded.updated_at "
+            "WHERE excluded.email IS NOT NULL AND users.email IS NOT excluded.email",
+            (uid, email, now, now)
+        )
+
+    async def get_or_create_user(self, uid: str, email: Optional[str] = None) -> dict:
+        def run():
+            with self._connection() as conn:
+                self._upsert_user(conn, uid, email, _timestamp(_now()))
+            return {'uid': uid, 'email': email}
+        return await self._run(run)
+
+    async def get_user_profile(self, uid: str) -> Optional[dict]:
+        def run():
+            row = self._connection().execute(
+                "SELECT data, updated_at FROM profiles WHERE uid = ?", (uid,)
+            ).fetchone()
+            if row is None:
+                return None
+            return json.loads(row['data']) | {'updated_at': datetime.fromisoformat(row['updated_at'])}
+        return await self._run(run)
+
+    async def create_or_update_user_profile(self, uid: str, payload: dict,
+                                            email: Optional[str] = None,
+                                            ensure_user: bool = False) -> dict:
+        data = {k: v for k, v in payload.items() if v is not None}
+
+        def run():
+            now = _now()
+            with self._connection() as conn:
+                if ensure_user:
+                    self._upsert_user(conn, uid, email, _timestamp(now))
+                # The merge happens in the upsert itself, so concurrent updates of
+                # different fields cannot overwrite each other
+                row = conn.execute(
+                    "INSERT INTO profiles (uid, data, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(uid) DO UPDATE SET data = json_patch(profiles.data, excluded.data), "
+                    "updated_at = excluded.updated_at RETURNING data",
+                    (uid, json.dumps(data, default=str), _timestamp(now))
+                ).fetchone()
+            return json.loads(row['data']) | {'updated_at': now, 'id': 'profile', 'user_id': uid}
+        return await self._run(run)
+
+    # -------------------------------------------------
+    # Predictions
+    # -------------------------------------------------
+
+    @staticmethod
+    def _prediction_row(uid: str, assessment: Dict, created_at: str, **fields) -> tuple:
+        feature_values = fields.get('feature_values')
+        return (
+            uuid.uuid4().hex, uid, fields.get('customer_id'),
+            int(assessment['credit_score']), float(assessment['risk_probability']),
+            assessment['risk_category'], assessment.get('interpretation'),
+            json.dumps(feature_values) if feature_values is not None else None,
+            fields.get('transaction_count'), fields.get('file_name'),
+            fields.get('upload_hash'), fields.get('model_version'), created_at,
+        )
+
+    def _insert_predictions(self, uid: str, email: Optional[str], rows: List[tuple]) -> None:
+        placeholders = ", ".join("?" * len(PREDICTION_COLUMNS))
+        with self._connection() as conn:
+            self._upsert_user(conn, uid, email, rows[0][-1] if rows else _timestamp(_now()))
+            conn.executemany(
+                f"INSERT INTO predictions ({', '.join(PREDICTION_COLUMNS)}) VALUES ({placeholders})",
+                rows
+            )
+
+    async def save_prediction(self, uid: str, assessment: Dict,
+                              feature_values: Optional[Dict] = None,
+                              transaction_count: Optional[int] = None,
+                              file_name: Optional[str] = None,
+                              upload_hash: Optional[str] = None,
+                              model_version: Optional[str] = None,
+                              email: Optional[str] = None) -> dict:
+        now = _now()
+        row = self._prediction_row(
+            uid, assessment, _timestamp(now),
+            feature_values=feature_values, transaction_count=transaction_count,
+            file_name=file_name, upload_hash=upload_hash, model_version=model_version
+        )
+        await self._run(self._insert_predictions, uid, email, [row])
+        doc = dict(zip(PREDICTION_COLUMNS, row))
+        return doc | {'feature_values': feature_values, 'created_at': now, 'user_id': uid}
+
+    async def save_predictions(self, uid: str, records: List[Dict],
+                               file_name: Optional[str] = None,
+                               upload_hash: Optional[str] = None,
+                               email: Optional[str] = None) -> List[str]:
+        created_at = _timestamp(_now())
+
+        def run():
+            # Customers a previous attempt at the same upload already stored
+            saved = {}
+            if upload_hash:
+                saved = {
+                    (row['customer_id'], row['model_version']): row['id']
+                    for row in self._connection().execute(
+                        "SELECT id, customer_id, model_version FROM predictions "
+                        "WHERE uid = ? AND upload_hash = ? AND customer_id IS NOT NULL",
+                        (uid, upload_hash)
+                    )
+                }
+            ids, rows = [], []
+            for record in records:
+                key = (record.get('customer_id'), record.get('model_version'))
+                if key in saved:
+                    ids.append(saved[key])
+                    continue
+                row = self._prediction_row(
+                    uid, record['assessment'], created_at,
+                    customer_id=record.get('customer_id'),
+                    feature_values=record.get('feature_values'),
+                    transaction_count=record.get('transaction_count'),
+                    file_name=file_name,
+                    upload_hash=upload_hash,
+                    model_version=record.get('model_version')
+                )
+                ids.append(row[0])
+                rows.append(row)
+            if rows:
+                self._insert_predictions(uid, email, rows)
+            return ids
+        return await self._run(run)
+
+    async def get_user_predictions(self, uid: str, limit: int = 10, offset: int = 0,
+                                   cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        # Keyset pagination over the (uid, created_at, id) index
+        where, params = "uid = ?", [uid]
+        if cursor:
+            created_at, doc_id = decode_cursor(cursor)
+            where += " AND (created_at, id) < (?, ?)"
+            params += [_timestamp(created_at), doc_id]
+            offset = 0
+
+        def run():
+            return self._connection().execute(
+                f"SELECT * FROM predictions WHERE {where} "
+                "ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit + 1, offset]
+            ).fetchall()
+
+        rows = await self._run(run)
+        page = [_prediction_from_row(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(page[-1]['created_at'], page[-1]['id'])
+        return page, next_cursor
+
+    async def count_user_predictions(self, uid: str) -> int:
+        def run():
+            return self._connection().execute(
+                "SELECT COUNT(*) FROM predictions WHERE uid = ?", (uid,)
+            ).fetchone()[0]
+        return await self._run(run)
+
+    async def get_user_score_summary(self, uid: str) -> dict:
+        return await self._score_summary(uid, SCORE_HISTORY_LENGTH)
+
+    async def _score_summary(self, uid: str, limit: int) -> dict:
+        # Batch (per-customer) predictions are not part of a user's own history
+        first = first_retained_month(datetime.now(timezone.utc), SCORE_MONTHS_RETENTION)
+
+        def run():
+            conn = self._connection()
+            points = conn.execute(
+                "SELECT id, credit_score AS score, created_at AS date, "
+                "risk_category AS category, risk_probability "
+                "FROM predictions WHERE uid = ? AND customer_id IS NULL "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (uid, limit)
+            ).fetchall()
+            months = conn.execute(
+                "SELECT substr(created_at, 1, 7) AS month, COUNT(*) AS count, "
+                "AVG(credit_score) AS average_score, MIN(credit_score) AS min_score, "
+                "MAX(credit_score) AS max_score, AVG(risk_probability) AS average_risk_probability "
+                "FROM predictions WHERE uid = ? AND customer_id IS NULL AND created_at >= ? "
+                "GROUP BY month ORDER BY month",
+                (uid, first)
+            ).fetchall()
+            return {'history': [dict(p) for p in points], 'monthly': [dict(m) for m in months]}
+        return await self._run(run)
+
+    async def get_user_score_history(self, uid: str, limit: int = 12) -> List[dict]:
+        summary = await self._score_summary(uid, limit)
+        return [
+            {key: point[key] for key in ('score', 'date', 'category', 'risk_probability')}
+            for point in summary['history']
+        ]
+
+    async def _first_prediction(self, where: str, params: tuple) -> Optional[dict]:
+        def run():
+            return self._connection().execute(
+                f"SELECT * FROM predictions WHERE {where} "
+                "ORDER BY created_at DESC, id DESC LIMIT 1",
+                params
+            ).fetchone()
+        row = await self._run(run)
+        return _prediction_from_row(row) if row is not None else None
+
+    async def get_latest_prediction(self, uid: str) -> Optional[dict]:
+        return await self._first_prediction("uid = ?", (uid,))
+
+    async def find_prediction_by_upload(self, uid: str, upload_hash: str,
+                                        model_version: str) -> Optional[dict]:
+        return await self._first_prediction(
+            "uid = ? AND upload_hash = ? AND model_version = ? AND customer_id IS NULL",
+            (uid, upload_hash, model_version)
+        )
@@ -0,0 +1,133 @@
+"""
+Storage Backends
+Persistence interface for users, profiles, predictions and score history, shared
+cursor helpers, and the factory that selects the configured backend.
+"""
+
+import base64
+import json
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+STORAGE_BACKENDS = ("firestore", "sqlite")
+
+
+def encode_cursor(created_at: datetime, doc_id: str) -> str:
+    """Opaque page token holding the sort key of the last prediction on a page"""
+    raw = json.dumps([created_at.isoformat(), doc_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError for tokens it did not produce"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, doc_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(doc_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid page cursor") from e
+
+
+def first_retained_month(now: datetime, retention: int) -> str:
+    """Oldest month ("YYYY-MM") of the last retention months up to and including now's"""
+    index = now.year * 12 + now.month - retention
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+class StorageBackend(ABC):
+    """
+    Async persistence used by the API handlers.
+
+    Documents are plain dicts. Predictions carry id, user_id and created_at (a
+    datetime) next to the stored fields; profiles carry id and user_id.
+    """
+
+    async def close(self) -> None:
+        """Release connections; called on application shutdown."""
+
+    @abstractmethod
+    async def get_or_create_user(self, uid: str, email: Optional[str] = None) -> dict:
+        ...
+
+    @abstractmethod
+    async def get_user_profile(self, uid: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def create_or_update_user_profile(self, uid: str, payload: dict,
+                                            email: Optional[str] = None,
+                                            ensure_user: bool = False) -> dict:
+        """Merge the non-None fields of payload into the profile and return it."""
+
+    @abstractmethod
+    async def save_prediction(self, uid: str, assessment: Dict,
+                              feature_values: Optional[Dict] = None,
+                              transaction_count: Optional[int] = None,
+                              file_name: Optional[str] = None,
+                              upload_hash: Optional[str] = None,
+                              model_version: Optional[str] = None,
+                              email: Optional[str] = None) -> dict:
+        """Store an assessment (creating the user if needed) and return the stored prediction."""
+
+    @abstractmethod
+    async def save_predictions(self, uid: str, records: List[Dict],
+                               file_name: Optional[str] = None,
+                               upload_hash: Optional[str] = None,
+                               email: Optional[str] = None) -> List[str]:
+        """
+        Store per-customer assessments and return their ids in order. Customers
+        already stored for the same upload_hash and model version are not stored
+        again; their existing ids are returned.
+        """
+
+    @abstractmethod
+    async def get_user_predictions(self, uid: str, limit: int = 10, offset: int = 0,
+                                   cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """One page of predictions, newest first, and the cursor for the next page."""
+
+    @abstractmethod
+    async def count_user_predictions(self, uid: str) -> int:
+        ...
+
+    @abstractmethod
+    async def get_user_score_summary(self, uid: str) -> dict:
+        """
+        Recent score points (newest first) and monthly aggregates (oldest first), for
+        the last SCORE_MONTHS_RETENTION months.
+        """
+
+    @abstractmethod
+    async def get_user_score_history(self, uid: str, limit: int = 12) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def get_latest_prediction(self, uid: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def find_prediction_by_upload(self, uid: str, upload_hash: str,
+                                        model_version: str) -> Optional[dict]:
+        """The user's stored prediction for an identical upload under the same model."""
+
+
+def create_storage(backend: Optional[str] = None) -> StorageBackend:
+    """
+    Build the storage backend named by STORAGE_BACKEND ("firestore" or "sqlite").
+
+    Args:
+        backend: Backend name, overriding the environment
+
+    Returns:
+        StorageBackend
+    """
+    backend = (backend or os.getenv("STORAGE_BACKEND", "firestore")).lower()
+    # Imported lazily so a SQLite deployment never loads the Firestore client
+    if backend == "firestore":
+        from api.services_firestore import FirestoreStorage
+        return FirestoreStorage()
+    if backend == "sqlite":
+        from api.services_sqlite import SQLiteStorage
+        return SQLiteStorage(os.getenv("SQLITE_DB_PATH", "data/credit_scores.db"))
+    raise ValueError(f"Unknown storage backend: {backend} (expected one of {STORAGE_BACKENDS})")
@@ -0,0 +1,386 @@
+"""
+Benchmark Suite
+Times the feature, inference and API hot paths on synthetic statements over a grid of
+input sizes (transactions x customers), writes the results as JSON, and compares a
+run against a saved baseline, failing when a case got slower than the tolerance.
+
+Cases:
+    engineer_features        src.features.build_features.engineer_features (per customer)
+    pipeline_transform       FeaturePipeline.transform
+    predict_full_assessment  CreditScorePredictor.predict_full_assessment, one call per customer
+    api_predict              POST /api/predict through the ASGI app in process
+
+Usage:
+    python scripts/benchmark.py --output baseline.json
+    python scripts/benchmark.py --preset full --output full.json
+    python scripts/benchmark.py --compare baseline.json
+    python scripts/benchmark.py --results current.json --compare baseline.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from scripts.synthetic_data import generate_statement
+
+RESULTS_FORMAT_VERSION = 1
+
+CASES = ['engineer_features', 'pipeline_transform', 'predict_full_assessment', 'api_predict']
+
+# Transactions x customers grids; combinations with more customers than
+# transactions are skipped
+PRESETS = {
+    'quick': {'rows': [100, 10_000, 100_000], 'customers': [1, 100, 10_000]},
+    'full': {'rows': [100, 10_000, 1_000_000, 10_000_000], 'customers': [1, 100, 10_000, 100_000]},
+}
+
+# Single-row assessments timed per repetition; larger customer counts cycle through
+# the first PREDICT_MAX_CALLS customers
+PREDICT_MAX_CALLS = 1_000
+
+# Differences below this are timer noise, never regressions
+MIN_REGRESSION_SECONDS = 0.001
+
+
+# -----------------------------------------------------
+# Timing
+# -----------------------------------------------------
+
+def measure(fn, min_time=1.0, min_repeats=3, max_repeats=20):
+    """
+    Time fn until at least min_repeats runs and min_time seconds, or max_repeats runs.
+    A first run shorter than a second is discarded as warm-up (imports, caches).
+
+    Returns:
+        list: Seconds per run
+    """
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+    timings = [first] if first >= 1.0 else []
+    while len(timings) < max_repeats and (len(timings) < min_repeats or sum(timings) < min_time):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(case, rows, customers, timings, throughput_items, unit):
+    median = statistics.median(timings)
+    return {
+        'case': case,
+        'rows': rows,
+        'customers': customers,
+        'repeats': len(timings),
+        'median_s': median,
+        'min_s': min(timings),
+        'max_s': max(timings),
+        'throughput': throughput_items / median if median > 0 else None,
+        'throughput_unit': unit,
+    }
+
+
+def quiet(fn, *args, **kwargs):
+    """Call fn with its progress output discarded, so it does not skew the timings."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+# -----------------------------------------------------
+# Cases
+# -----------------------------------------------------
+
+def bench_engineer_features(statement, args):
+    from src.features.build_features import engineer_features
+    return measure(lambda: quiet(engineer_features, statement, per_customer=True), args.min_time)
+
+
+def bench_pipeline_transform(statement, args):
+    from src.features.feature_pipeline import FeaturePipeline
+    pipeline = FeaturePipeline()
+    return measure(lambda: quiet(pipeline.transform, statement), args.min_time)
+
+
+def load_predictor():
+    from scripts.predict import CreditScorePredictor
+    # No prediction cache: repeated runs must pay for inference
+    return CreditScorePredictor(
+        model_path=ROOT / 'models/model.pkl',
+        scaler_path=ROOT / 'models/scaler.pkl',
+        features_path=ROOT / 'models/features.csv',
+        flat_model_path=ROOT / 'models/model_flat.npz',
+        cache_size=0,
+    )
+
+
+def bench_predict_full_assessment(statement, args, predictor):
+    from src.features.build_features import engineer_features
+    features = quiet(engineer_features, statement, per_customer=True)
+    rows = [features.iloc[[i]] for i in range(min(len(features), PREDICT_MAX_CALLS))]
+
+    def assess_all():
+        for row in rows:
+            predictor.predict_full_assessment(row)
+
+    return measure(assess_all, args.min_time), len(rows)
+
+
+def upload_payload(statement):
+    """The statement as CSV bytes, or None if it exceeds the API's upload limit."""
+    from api.scoring import MAX_UPLOAD_BYTES
+    # Estimated from a sample first, so oversized statements are never serialized
+    head = statement.head(1_000)
+    estimate = len(head.to_csv(index=False).encode()) / len(head) * len(statement)
+    if estimate > MAX_UPLOAD_BYTES * 1.1:
+        return None
+    payload = statement.to_csv(index=False).encode()
+    return payload if len(payload) <= MAX_UPLOAD_BYTES else None
+
+
+async def bench_api_predict(payloads, args):
+    """POST each statement to /api/predict in process; returns {(rows, customers): timings}."""
+    import httpx
+
+    import api.main as main
+    from api.auth_middleware import get_current_user
+
+    main.app.dependency_overrides[get_current_user] = lambda: {"uid": "benchmark", "email": None}
+    results = {}
+    try:
+        async with main.lifespan(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+                for size, payload in payloads.items():
+                    results[size] = await _time_uploads(client, payload, args)
+    finally:
+        main.app.dependency_overrides.pop(get_current_user, None)
+    return results
+
+
+async def _time_uploads(client, payload, args):
+    # Every request carries one extra transaction with a distinct amount, so no
+    # upload is answered from the deduplication or prediction caches
+    first_phone = payload.split(b'\n')[1].split(b',')[3]
+    counter = iter(range(1, 10**9))
+
+    async def post():
+        extra = b'01-Jan-25,12:00,MoMo Transaction,%s,Synthetic Customer,%.2f,0,0,0,Transfer\n' % (
+            first_phone, next(counter) / 100
+        )
+        response = await client.post("/api/predict", files={"file": ("statement.csv", payload + extra)})
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/predict returned {response.status_code}: {response.text[:200]}")
+
+    await post()
+    timings = []
+    while len(timings) < 20 and (len(timings) < 3 or sum(timings) < args.min_time):
+        start = time.perf_counter()
+        await post()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_suite(args):
+    """Run the selected cases over the size grid; returns the result records."""
+    sizes = [(rows, customers) for rows in args.rows for customers in args.customers if customers <= rows]
+    payloads = {}
+    results = []
+    predictor = load_predictor() if 'predict_full_assessment' in args.cases else None
+
+    for rows, customers in sizes:
+        statement = generate_statement(rows, customers, seed=args.seed)
+        if 'api_predict' in args.cases:
+            payload = upload_payload(statement)
+            if payload is None:
+                print(f"{'api_predict':<24} {rows:>10} {customers:>8}  skipped: upload exceeds MAX_UPLOAD_BYTES")
+            else:
+                payloads[(rows, customers)] = payload
+        if 'engineer_features' in args.cases:
+            results.append(report(summarize(
+                'engineer_features', rows, customers,
+                bench_engineer_features(statement, args), rows, 'rows/s'
+            )))
+        if 'pipeline_transform' in args.cases:
+            results.append(report(summarize(
+                'pipeline_transform', rows, customers,
+                bench_pipeline_transform(statement, args), rows, 'rows/s'
+            )))
+        if 'predict_full_assessment' in args.cases:
+            timings, calls = bench_predict_full_assessment(statement, args, predictor)
+            results.append(report(summarize(
+                'predict_full_assessment', rows, customers, timings, calls, 'calls/s'
+            )))
+
+    if payloads:
+        api_results = asyncio.run(bench_api_predict(payloads, args))
+        for (rows, customers), timings in api_results.items():
+            results.append(report(summarize('api_predict', rows, customers, timings, 1, 'requests/s')))
+    return results
+
+
+def report(result):
+    print(f"{result['case']:<24} {result['rows']:>10} {result['customers']:>8}  "
+          f"median {result['median_s'] * 1e3:>10.2f} ms  "
+          f"({result['throughput']:,.0f} {result['throughput_unit']}, {result['repeats']} runs)")
+    return result
+
+
+def environment():
+    """Versions and machine details stored with the results, so runs on different
+    machines or dependency sets are not mistaken for regressions."""
+    import sklearn
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        import pyarrow
+        pyarrow_version = pyarrow.__version__
+    except ImportError:
+        pyarrow_version = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'scikit-learn': sklearn.__version__,
+        'pyarrow': pyarrow_version,
+    }
+
+
+# -----------------------------------------------------
+# Comparison
+# -----------------------------------------------------
+
+def _key(result):
+    return result['case'], result['rows'], result['customers']
+
+
+def compare(baseline, current, tolerance):
+    """
+    Compare median times case by case.
+
+    Args:
+        baseline: Results document of the reference run
+        current: Results document of the run under test
+        tolerance: Allowed slowdown as a fraction (0.15 = 15%)
+
+    Returns:
+        list: Descriptions of the cases that regressed
+    """
+    for field in ('machine', 'cpu_count', 'python', 'pandas', 'numpy', 'pyarrow'):
+        before = baseline['environment'].get(field)
+        after = current['environment'].get(field)
+        if before != after:
+            print(f"Warning: {field} differs from the baseline ({before} -> {after}); "
+                  f"timings may not be comparable")
+
+    reference = {_key(r): r for r in baseline['results']}
+    regressions = []
+    print(f"\n{'case':<24} {'rows':>10} {'customers':>9} {'baseline':>12} {'current':>12} {'change':>8}")
+    for result in current['results']:
+        before = reference.get(_key(result))
+        if before is None:
+            continue
+        ratio = result['median_s'] / before['median_s'] if before['median_s'] > 0 else float('inf')
+        regressed = (
+            ratio > 1 + tolerance
+            and result['median_s'] - before['median_s'] > MIN_REGRESSION_SECONDS
+        )
+        print(f"{result['case']:<24} {result['rows']:>10} {result['customers']:>9} "
+              f"{before['median_s'] * 1e3:>10.2f}ms {result['median_s'] * 1e3:>10.2f}ms "
+              f"{(ratio - 1) * 100:>+7.1f}%{'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append(
+                f"{result['case']} at {result['rows']} rows / {result['customers']} customers: "
+                f"{before['median_s'] * 1e3:.2f} ms -> {result['median_s'] * 1e3:.2f} ms "
+                f"(+{(ratio - 1) * 100:.0f}%, tolerance {tolerance * 100:.0f}%)"
+            )
+    missing = sorted(set(reference) - {_key(r) for r in current['results']})
+    if missing:
+        print(f"Note: {len(missing)} baseline case(s) not in this run")
+    return regressions
+
+
+def load_results(path):
+    with open(path) as f:
+        document = json.load(f)
+    if document.get('format_version') != RESULTS_FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported benchmark results format {document.get('format_version')}")
+    return document
+
+
+def _int_list(value):
+    return [int(float(item)) for item in value.split(',') if item]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the feature, inference and API hot paths")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="quick",
+                        help="Size grid to run (default: quick)")
+    parser.add_argument("--rows", type=_int_list, help="Comma-separated transaction counts (overrides the preset)")
+    parser.add_argument("--customers", type=_int_list, help="Comma-separated customer counts (overrides the preset)")
+    parser.add_argument("--cases", type=lambda v: v.split(','), default=CASES,
+                        help=f"Comma-separated cases to run (default: all of {','.join(CASES)})")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Minimum seconds measured per case")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic statements")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--results", help="Compare an existing results file instead of running")
+    parser.add_argument("--compare", help="Baseline results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Allowed slowdown before a case counts as a regression (default: 0.15)")
+    args = parser.parse_args()
+
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {sorted(unknown)}")
+    args.rows = args.rows or PRESETS[args.preset]['rows']
+    args.customers = args.customers or PRESETS[args.preset]['customers']
+    # Local storage and no Firebase: the API case needs no credentials or network
+    os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+    os.environ.setdefault("SQLITE_DB_PATH", ":memory:")
+    # The API resolves its model files from the repository root
+    for name in ('output', 'results', 'compare'):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    os.chdir(ROOT)
+
+    if args.results:
+        current = load_results(args.results)
+    else:
+        current = {
+            'format_version': RESULTS_FORMAT_VERSION,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'environment': environment(),
+            'results': run_suite(args),
+        }
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(current, f, indent=2)
+            print(f"Results written to {args.output}")
+
+    if args.compare:
+        regressions = compare(load_results(args.compare), current, args.tolerance)
+        for regression in regressions:
+            print(f"FAIL: {regression}")
+        sys.exit(1 if regressions else 0)
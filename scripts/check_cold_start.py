@@ -0,0 +1,97 @@
+"""
+Cold Start Check
+Starts the API in fresh interpreters, reports the time spent in each start-up phase
+(interpreter, import, credentials, model load) and fails when the median time to
+ready exceeds the budget or when a deferred dependency is imported eagerly again.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Modules that must stay out of `import api.main`; they load lazily or in the
+# background warm-up after the app is ready
+DEFERRED_MODULES = ["pandas", "sklearn", "joblib", "firebase_admin", "google.cloud.firestore", "uvicorn"]
+
+CHILD = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import api.main as main
+imported = time.perf_counter()
+eager = [name for name in {deferred!r} if name in sys.modules]
+
+async def start_app():
+    async with main.lifespan(main.app):
+        ready = time.perf_counter()
+        # Let the background warm-up finish so its phases are reported too
+        for _ in range(600):
+            if "parser_ms" in main.startup_timings:
+                break
+            await asyncio.sleep(0.05)
+        return ready
+
+ready = asyncio.run(start_app())
+print(json.dumps({{
+    "import_ms": (imported - start) * 1e3,
+    "startup_ms": (ready - imported) * 1e3,
+    "ready_ms": (ready - start) * 1e3,
+    "eager_imports": eager,
+    "phases": main.startup_timings,
+}}))
+"""
+
+
+def measure_once(env):
+    launched = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD.format(deferred=DEFERRED_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    # Interpreter start-up is not visible from inside the child
+    report["process_ms"] = (time.perf_counter() - launched) * 1e3
+    return report
+
+
+def check_cold_start(budget_ms, runs=3):
+    env = dict(os.environ)
+    # No credentials or network needed: local storage and no Firebase app
+    env.setdefault("STORAGE_BACKEND", "sqlite")
+    env.setdefault("SQLITE_DB_PATH", ":memory:")
+    env.setdefault("AUTH_CERT_REFRESH_SECONDS", "3600")
+
+    reports = [measure_once(env) for _ in range(runs)]
+    ready = statistics.median(r["ready_ms"] for r in reports)
+    print(f"{'run':>4} {'process':>9} {'import':>9} {'startup':>9} {'ready':>9}  phases")
+    for i, r in enumerate(reports, 1):
+        print(f"{i:>4} {r['process_ms']:>7.0f}ms {r['import_ms']:>7.0f}ms {r['startup_ms']:>7.0f}ms "
+              f"{r['ready_ms']:>7.0f}ms  {r['phases']}")
+    print(f"Median time to ready: {ready:.0f} ms (budget {budget_ms:.0f} ms)")
+
+    failures = []
+    eager = sorted({name for r in reports for name in r["eager_imports"]})
+    if eager:
+        failures.append(f"importing api.main loaded deferred modules: {eager}")
+    if ready > budget_ms:
+        failures.append(f"median time to ready {ready:.0f} ms exceeds the {budget_ms:.0f} ms budget")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.getenv("COLD_START_BUDGET_MS", "3000")),
+                        help="Maximum median time from interpreter start to ready")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to measure")
+    args = parser.parse_args()
+
+    failures = check_cold_start(args.budget_ms, args.runs)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,63 @@
+"""
+Feature Parity Check
+Engineers customer features from synthetic statements in every layout with the
+whole-file pipeline, in chunked mode at several memory budgets and sharded across
+worker processes, and fails unless every run returns exactly the same table.
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+from pandas.testing import assert_frame_equal
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from scripts.synthetic_data import LAYOUTS, generate_statement
+from src.features.feature_pipeline import FeaturePipeline
+
+# Budgets small enough to split the statement into hundreds of chunks
+BUDGETS_MB = [1, 4, 16]
+
+
+def check_feature_parity(rows, customers, budgets_mb, workers=2, seed=0):
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for layout in sorted(LAYOUTS):
+            path = Path(tmp) / f"{layout}.csv"
+            generate_statement(rows, customers, layout, seed).to_csv(path, index=False)
+            pipeline = FeaturePipeline()
+            expected = pipeline._customer_features(pipeline.load_data(path))
+
+            runs = {}
+            for budget in budgets_mb:
+                pipeline.config['memory_budget_mb'] = budget
+                runs[f"chunked, {budget:g} MB"] = pipeline._customer_features_chunked(path)
+            sharded = FeaturePipeline(dict(FeaturePipeline().config, workers=workers))
+            runs[f"sharded, {workers} workers"] = sharded._engineer_sharded(
+                sharded.clean_data(sharded.load_data(path)), workers
+            )
+
+            for label, actual in runs.items():
+                try:
+                    assert_frame_equal(expected, actual, check_exact=True)
+                    print(f"OK   {layout} ({label})")
+                except AssertionError as e:
+                    failures.append(f"{layout} ({label}) differs from the whole-file features: {e}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000, help="Transactions per statement")
+    parser.add_argument("--customers", type=int, default=500, help="Customers per statement")
+    parser.add_argument("--budgets-mb", type=float, nargs="+", default=BUDGETS_MB,
+                        help="Chunked mode memory budgets to compare")
+    parser.add_argument("--workers", type=int, default=2, help="Processes for the sharded run")
+    args = parser.parse_args()
+
+    failures = check_feature_parity(args.rows, args.customers, args.budgets_mb, args.workers)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,144 @@
+"""
+Model Export Script
+Flattens the trained random forest into contiguous arrays for the flat inference
+engine, checks it against sklearn's probabilities and reports per-row latency.
+Optionally writes a memory-mappable artifact directory (forest, scaler statistics
+and feature list) that API workers can share, or publishes the whole model as a new
+version in the model registry.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.inference.artifacts import save_artifacts
+from src.inference.flat_forest import FlatForest, file_fingerprint
+from src.inference.registry import publish_version, set_current_version, version_dir
+
+
+def parity_inputs(model, n_samples, seed=42):
+    """
+    Scaled-space inputs for the parity check: random rows, rows with missing values,
+    and rows sitting exactly on and next to every split threshold.
+    """
+    rng = np.random.default_rng(seed)
+    n_features = model.n_features_in_
+    random_rows = rng.normal(0, 2, size=(n_samples, n_features))
+    missing_rows = random_rows[: max(1, n_samples // 10)].copy()
+    missing_rows[rng.random(missing_rows.shape) < 0.2] = np.nan
+
+    boundary_rows = []
+    base = rng.normal(0, 1, size=n_features)
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        for feature, threshold in zip(tree.feature, tree.threshold):
+            if feature < 0 or not np.isfinite(threshold):
+                continue
+            x32 = np.float32(threshold)
+            for value in (np.nextafter(x32, np.float32(-np.inf)), x32,
+                          np.nextafter(x32, np.float32(np.inf))):
+                row = base.copy()
+                row[feature] = value
+                boundary_rows.append(row)
+
+    return np.vstack([random_rows, missing_rows] + ([np.array(boundary_rows)] if boundary_rows else []))
+
+
+def time_per_row(predict, X, repeats):
+    predict(X)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        predict(X)
+    return (time.perf_counter() - start) / (repeats * len(X)) * 1e6
+
+
+def export_model(model_path, output_path, float32=False, n_samples=10000,
+                 scaler_path=None, features_path=None, artifact_dir=None):
+    model = joblib.load(model_path)
+    forest = FlatForest.from_sklearn(
+        model,
+        dtype=np.float32 if float32 else np.float64,
+        source_fingerprint=file_fingerprint(model_path)
+    )
+    print(f"Flattened {forest.n_trees} trees, {len(forest.feature)} nodes, max depth {forest.max_depth}")
+
+    # Parity: the flat forest must reproduce sklearn's probabilities exactly
+    X = parity_inputs(model, n_samples)
+    expected = model.predict_proba(X)[:, 1]
+    actual = forest.predict_proba(X)
+    max_diff = float(np.nanmax(np.abs(actual - expected)))
+    if not np.array_equal(actual, expected):
+        raise ValueError(f"Flat forest does not match sklearn (max abs diff {max_diff:.3g})")
+    print(f"Parity check passed on {len(X)} rows")
+
+    single = X[:1]
+    batch = X[:min(len(X), 1000)]
+    print(f"Single row: sklearn {time_per_row(lambda x: model.predict_proba(x), single, 200):.1f} us, "
+          f"flat {time_per_row(forest.predict_proba, single, 2000):.1f} us")
+    print(f"Batch of {len(batch)}: sklearn {time_per_row(lambda x: model.predict_proba(x), batch, 20):.2f} us/row, "
+          f"flat {time_per_row(forest.predict_proba, batch, 20):.2f} us/row")
+
+    forest.save(output_path)
+    print(f"Flat forest saved to {output_path}")
+
+    if artifact_dir:
+        scaler = joblib.load(scaler_path)
+        features = pd.read_csv(features_path, header=None).iloc[:, 0].tolist()
+        if len(features) != forest.n_features or len(scaler.mean_) != forest.n_features:
+            raise ValueError("Model, scaler and features list disagree on the number of features")
+        save_artifacts(
+            artifact_dir, forest, scaler.mean_, scaler.scale_, features,
+            fingerprints={
+                'model': forest.source_fingerprint,
+                'scaler': file_fingerprint(scaler_path),
+                'features': file_fingerprint(features_path),
+            }
+        )
+        print(f"Memory-mappable artifacts saved to {artifact_dir}")
+    return forest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="models/model.pkl", help="Path to the trained model")
+    parser.add_argument("--output", default="models/model_flat.npz", help="Output path for the flat forest")
+    parser.add_argument("--float32", action="store_true", help="Store thresholds as float32")
+    parser.add_argument("--samples", type=int, default=10000, help="Random rows for the parity check")
+    parser.add_argument("--scaler", default="models/scaler.pkl", help="Path to the fitted scaler")
+    parser.add_argument("--features", default="models/features.csv", help="Path to the features list")
+    parser.add_argument("--artifact-dir", default=None,
+                        help="Also write a memory-mappable artifact directory (e.g. models/artifacts)")
+    parser.add_argument("--registry", default="models/registry", help="Model registry root")
+    parser.add_argument("--registry-version", default=None,
+                        help="Publish the model, its flat forest and artifacts as this registry version")
+    parser.add_argument("--activate", action="store_true",
+                        help="Make the version the one running APIs load; an already published "
+                             "version is activated without exporting (rollback)")
+    args = parser.parse_args()
+
+    try:
+        output, artifact_dir = args.output, args.artifact_dir
+        published = args.registry_version and version_dir(args.registry, args.registry_version).exists()
+        if published and args.activate:
+            # Activating an already published version, e.g. to roll back
+            print(f"Model version {args.registry_version} is already published, not exporting")
+        else:
+            if args.registry_version:
+                version_path = publish_version(args.registry, args.registry_version,
+                                               args.model, args.scaler, args.features)
+                output, artifact_dir = version_path / "model_flat.npz", version_path
+                print(f"Published model version {args.registry_version} to {version_path}")
+            export_model(args.model, output, float32=args.float32, n_samples=args.samples,
+                         scaler_path=args.scaler, features_path=args.features,
+                         artifact_dir=artifact_dir)
+        if args.registry_version and args.activate:
+            set_current_version(args.registry, args.registry_version)
+            print(f"Model version {args.registry_version} is now active")
+    except Exception as e:
+        print(f"Export failed: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,326 @@
+"""
+Load Test
+Starts the API locally and drives each endpoint with synthetic statements at
+increasing concurrency, reporting throughput and latency percentiles per endpoint
+and concurrency level.
+
+The server runs in its own process under uvicorn with two stand-ins, so no
+credentials or network are needed:
+    - a stub token verifier that accepts bearer tokens "loadtest-<n>" as user
+      loadtest-<n> (the Firebase verification step is replaced; header parsing and
+      the rest of the auth dependency chain still run)
+    - SQLite storage in a temporary database file (WAL mode, as deployed on-prem)
+
+Each concurrency level is a closed loop: that many clients send requests back to
+back for --duration seconds. Users are seeded with a profile and a few predictions
+first, so the history endpoints read real rows. Every upload is made unique, so the
+upload and prediction caches never answer for the scoring pipeline.
+
+The client runs on the same machine as the server and shares its CPUs; compare runs
+made on the same host.
+
+Usage:
+    python scripts/load_test.py
+    python scripts/load_test.py --endpoints predict,predictions --concurrency 1,8,32 --duration 10
+    python scripts/load_test.py --rows 2000 --output load.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from scripts.benchmark import environment
+from scripts.synthetic_data import LAYOUTS, statement_csv
+
+RESULTS_FORMAT_VERSION = 1
+
+TOKEN_PREFIX = "loadtest-"
+
+# Read-only endpoints first, so they see the same seeded history at every level
+ENDPOINTS = ['health', 'profile', 'predictions', 'scores_history', 'scores_summary',
+             'predict', 'predict_batch']
+
+PERCENTILES = [50, 90, 99]
+
+SERVER = """
+import uvicorn
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+import api.main as main
+from api.auth_middleware import security, verify_firebase_token
+
+
+async def stub_verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    token = credentials.credentials
+    if not token.startswith({prefix!r}):
+        raise HTTPException(status_code=401, detail="Invalid authentication token")
+    return {{"uid": token, "email": token + "@loadtest.invalid"}}
+
+
+main.app.dependency_overrides[verify_firebase_token] = stub_verify_token
+uvicorn.run(main.app, host="127.0.0.1", port={port}, log_level="warning")
+"""
+
+
+# -----------------------------------------------------
+# Server
+# -----------------------------------------------------
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir, port):
+    """Launch the API in a child process; its output goes to workdir/server.log."""
+    env = dict(os.environ)
+    env["STORAGE_BACKEND"] = "sqlite"
+    env["SQLITE_DB_PATH"] = str(Path(workdir) / "loadtest.db")
+    log = open(Path(workdir) / "server.log", "w")
+    return subprocess.Popen(
+        [sys.executable, "-c", SERVER.format(prefix=TOKEN_PREFIX, port=port)],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+
+async def wait_until_ready(client, server, timeout=120.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"API server exited with code {server.returncode}")
+        try:
+            response = await client.get("/health")
+            if response.status_code == 200 and response.json()["model_loaded"]:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"API server not ready after {timeout:.0f}s")
+
+
+# -----------------------------------------------------
+# Workload
+# -----------------------------------------------------
+
+class Workload:
+    """
+    Requests for each endpoint. Statements are generated once, across every layout;
+    each upload then gets one extra transaction with a distinct amount.
+    """
+
+    def __init__(self, args):
+        layouts = itertools.cycle(sorted(LAYOUTS))
+        self.statements = [statement_csv(args.rows, 1, next(layouts), seed)
+                           for seed in range(args.statements)]
+        self.batches = [statement_csv(args.rows * args.batch_customers, args.batch_customers,
+                                      next(layouts), args.statements + seed)
+                        for seed in range(args.statements)]
+        self.users = [f"{TOKEN_PREFIX}{n}" for n in range(args.users)]
+        self.uploads = itertools.count(1)
+
+    def unique_upload(self, payload):
+        header, _, _ = payload.partition(b'\n')
+        amount = header.split(b',').index(b'Amount')
+        last = payload.rstrip(b'\n').rsplit(b'\n', 1)[1].split(b',')
+        last[amount] = b'%.2f' % (-next(self.uploads) / 100)
+        return payload + b','.join(last) + b'\n'
+
+    def request(self, endpoint, n):
+        """(method, path, httpx request options) for the n-th request of an endpoint."""
+        headers = {"Authorization": f"Bearer {self.users[n % len(self.users)]}"}
+        if endpoint == 'health':
+            return "GET", "/health", {}
+        if endpoint == 'profile':
+            return "GET", "/api/profile", {"headers": headers}
+        if endpoint == 'predictions':
+            return "GET", "/api/predictions", {"headers": headers, "params": {"limit": 10}}
+        if endpoint == 'scores_history':
+            return "GET", "/api/scores/history", {"headers": headers}
+        if endpoint == 'scores_summary':
+            return "GET", "/api/scores/summary", {"headers": headers}
+        if endpoint == 'predict':
+            payload = self.unique_upload(self.statements[n % len(self.statements)])
+            return "POST", "/api/predict", {"headers": headers, "files": {"file": ("statement.csv", payload)}}
+        if endpoint == 'predict_batch':
+            payload = self.batches[n % len(self.batches)]
+            return "POST", "/api/predict/batch", {"headers": headers, "files": {"file": ("batch.csv", payload)}}
+        raise ValueError(f"Unknown endpoint: {endpoint}")
+
+
+async def seed_users(client, workload, predictions):
+    """Give every user a profile and some prediction history."""
+    for n, user in enumerate(workload.users):
+        headers = {"Authorization": f"Bearer {user}"}
+        response = await client.post("/api/profile", headers=headers,
+                                      json={"first_name": "Load", "last_name": f"Test {n}"})
+        response.raise_for_status()
+        for i in range(predictions):
+            method, path, options = workload.request('predict', n + i * len(workload.users))
+            response = await client.request(method, path, **options)
+            response.raise_for_status()
+
+
+# -----------------------------------------------------
+# Measurement
+# -----------------------------------------------------
+
+async def run_level(client, workload, endpoint, concurrency, duration):
+    """Closed loop of concurrency clients for duration seconds; returns a result row."""
+    latencies = []
+    errors = {}
+    deadline = time.perf_counter() + duration
+
+    async def client_loop(first):
+        n = first
+        while time.perf_counter() < deadline:
+            method, path, options = workload.request(endpoint, n)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **options)
+                status = response.status_code
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            if status == 200:
+                latencies.append(elapsed)
+            else:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+            n += concurrency
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop(i) for i in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    failed = sum(errors.values())
+    row = {
+        'endpoint': endpoint,
+        'concurrency': concurrency,
+        'requests': len(latencies) + failed,
+        'errors': errors,
+        'seconds': wall,
+        'throughput': len(latencies) / wall,
+    }
+    if latencies:
+        values = np.array(latencies) * 1e3
+        row.update({f'p{p}_ms': float(np.percentile(values, p)) for p in PERCENTILES})
+        row.update({'mean_ms': float(values.mean()), 'max_ms': float(values.max())})
+    return row
+
+
+def report(row):
+    if 'p50_ms' not in row:
+        print(f"{row['endpoint']:<16}{row['concurrency']:>5}{row['requests']:>9}{sum(row['errors'].values()):>8}"
+              f"  no successful requests {row['errors']}")
+        return
+    percentiles = ''.join(f"{row[f'p{p}_ms']:>10.1f}" for p in PERCENTILES)
+    errors = f"  {row['errors']}" if row['errors'] else ""
+    print(f"{row['endpoint']:<16}{row['concurrency']:>5}{row['requests']:>9}{sum(row['errors'].values()):>8}"
+          f"{row['throughput']:>10.1f}{percentiles}{row['max_ms']:>10.1f}{errors}")
+
+
+async def run_load_test(args, workdir):
+    import httpx
+
+    port = free_port()
+    server = start_server(workdir, port)
+    timeout = httpx.Timeout(300.0)
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=timeout, limits=limits) as client:
+            await wait_until_ready(client, server)
+            workload = Workload(args)
+            await seed_users(client, workload, args.seed_predictions)
+            print(f"Seeded {len(workload.users)} users with {args.seed_predictions} predictions each; "
+                  f"statements of {args.rows} rows, batches of {args.batch_customers} customers\n")
+            header = ''.join(f"{f'p{p} ms':>10}" for p in PERCENTILES)
+            print(f"{'endpoint':<16}{'conc':>5}{'requests':>9}{'errors':>8}{'req/s':>10}{header}{'max ms':>10}")
+
+            results = []
+            for endpoint in args.endpoints:
+                for concurrency in args.concurrency:
+                    row = await run_level(client, workload, endpoint, concurrency, args.duration)
+                    report(row)
+                    results.append(row)
+            server_stats = (await client.get("/health")).json()
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return results, server_stats
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the API endpoints locally")
+    parser.add_argument("--endpoints", type=lambda v: v.split(','), default=ENDPOINTS,
+                        help=f"Comma-separated endpoints (default: {','.join(ENDPOINTS)})")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 2, 4, 8, 16, 32],
+                        help="Comma-separated concurrency levels (default: 1,2,4,8,16,32)")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per level (default: 5)")
+    parser.add_argument("--rows", type=int, default=300,
+                        help="Transactions per customer in uploaded statements (default: 300)")
+    parser.add_argument("--batch-customers", type=int, default=50,
+                        help="Customers per /api/predict/batch upload (default: 50)")
+    parser.add_argument("--statements", type=int, default=12,
+                        help="Distinct statements generated per upload endpoint (default: 12)")
+    parser.add_argument("--users", type=int, default=20, help="Distinct users (default: 20)")
+    parser.add_argument("--seed-predictions", type=int, default=3,
+                        help="Predictions stored per user before the run (default: 3)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="Fail when more than this share of an endpoint's requests fail (default: 0.01)")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {sorted(unknown)}")
+
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as workdir:
+        try:
+            results, server_stats = asyncio.run(run_load_test(args, workdir))
+        except Exception:
+            print((Path(workdir) / "server.log").read_text(), file=sys.stderr)
+            raise
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'format_version': RESULTS_FORMAT_VERSION,
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'environment': environment(),
+                'config': vars(args),
+                'results': results,
+                'server': server_stats,
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    failures = []
+    for endpoint in args.endpoints:
+        rows = [row for row in results if row['endpoint'] == endpoint]
+        total = sum(row['requests'] for row in rows)
+        failed = sum(sum(row['errors'].values()) for row in rows)
+        if total and failed / total > args.max_error_rate:
+            failures.append(f"{endpoint}: {failed} of {total} requests failed")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
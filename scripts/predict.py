@@ -2,14 +2,37 @@
 Credit Score Prediction Module
 This module provides inference functionality for the trained credit scoring model.
 """
-import pandas as pd
 import numpy as np
-import joblib
+import hashlib
 import os
+import sys
+import time
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.inference.artifacts import artifact_version, has_artifacts, load_artifacts, read_manifest
+from src.inference.cache import LRUTTLCache
+from src.inference.flat_forest import FlatForest, file_fingerprint
+
+# Credit score scale and the lower bound of each risk category on it
+SCORE_MIN = 300
+SCORE_MAX = 850
+CATEGORY_THRESHOLDS = np.array([600, 650, 700, 750])
+RISK_CATEGORIES = np.array(["Very Poor", "Poor", "Fair", "Good", "Excellent"], dtype=object)
+
+# In "auto" mode the flat forest serves batches up to this size; larger batches go to
+# sklearn's compiled tree code, which has better throughput once per-call costs amortize
+FLAT_ENGINE_MAX_ROWS = 1024
+
+# Only small requests go through the prediction cache, so scoring a large batch
+# upload does not flush entries that interactive users keep hitting
+CACHE_MAX_BATCH_ROWS = 64
+
 class CreditScorePredictor:
-    def __init__(self, model_path='models/model.pkl', scaler_path='models/scaler.pkl', features_path='models/features.csv'):
+    def __init__(self, model_path='models/model.pkl', scaler_path='models/scaler.pkl', features_path='models/features.csv',
+                 engine='auto', flat_model_path='models/model_flat.npz',
+                 cache_size=1024, cache_ttl=3600.0, artifact_dir=None):
         """
         Initialize the predictor with trained model artifacts.
         
@@ -17,67 +40,257 @@ class CreditScorePredictor:
             model_path: Path to the trained model pickle file
             scaler_path: Path to the fitted scaler pickle file
             features_path: Path to the features CSV file
+            engine: "flat" (compiled flat-array forest), "sklearn", or "auto" to use the
+                flat forest for small batches and sklearn for large ones
+            flat_model_path: Optional forest exported by scripts/export_model.py; used when
+                it was built from the same model file, otherwise the forest is flattened
+                at load time
+            cache_size: Maximum number of cached predictions (0 disables the cache)
+            cache_ttl: Seconds a cached prediction stays valid
+            artifact_dir: Optional directory written by scripts/export_model.py
+                --artifact-dir. When present and exported from the current pickles, the
+                forest and scaler are memory-mapped from it, so every worker process
+                shares one page-cache copy, and the pickles are not loaded at all
         """
+        if engine not in ('auto', 'flat', 'sklearn'):
+            raise ValueError(f"Unknown inference engine: {engine}")
         self.model_path = Path(model_path)
         self.scaler_path = Path(scaler_path)
         self.features_path = Path(features_path)
+        self.flat_model_path = Path(flat_model_path) if flat_model_path else None
+        self.artifact_dir = Path(artifact_dir) if artifact_dir else None
+        self.engine = engine
+        self.cache = LRUTTLCache(maxsize=cache_size, ttl=cache_ttl)
         
         self._load_artifacts()
     
     def _load_artifacts(self):
         try:
-            if not self.model_path.exists():
-                raise FileNotFoundError(f"Model file not found at {self.model_path}")
-            if not self.scaler_path.exists():
-                raise FileNotFoundError(f"Scaler file not found at {self.scaler_path}")
-            if not self.features_path.exists():
-                raise FileNotFoundError(f"Features file not found at {self.features_path}")
-            
-            self.model = joblib.load(self.model_path)
-            self.scaler = joblib.load(self.scaler_path)
+            start = time.perf_counter()
+            if self.engine != 'sklearn' and self._artifacts_current():
+                self._load_mapped_artifacts()
+                source = "memory-mapped"
+            else:
+                self._load_pickled_artifacts()
+                source = "pickle"
             
-            features_df = pd.read_csv(self.features_path, header=None)
-            self.features = features_df.iloc[:, 0].tolist()
+            self._cache_salt = self.model_version.encode()
+            self.cache.clear()
             
+            self.load_info = {
+                "source": source,
+                "load_ms": round((time.perf_counter() - start) * 1e3, 1),
+                "rss_mb": resident_memory_mb(),
+            }
             print(f"Model artifacts loaded successfully")
+            print(f"Loaded {source} artifacts in {self.load_info['load_ms']} ms, "
+                  f"resident memory {self.load_info['rss_mb']} MB")
             print(f"Using {len(self.features)} features: {self.features}")
             
         except Exception as e:
             raise ValueError(f"Failed to load model artifacts: {str(e)}")
     
-    def predict_risk_score(self, transaction_data):
+    def _artifacts_current(self):
+        """True if artifact_dir exists and was exported from the pickles on disk."""
+        if not has_artifacts(self.artifact_dir):
+            return False
+        fingerprints = read_manifest(self.artifact_dir)['fingerprints']
+        for name, path in (("model", self.model_path), ("scaler", self.scaler_path),
+                           ("features", self.features_path)):
+            # Deployments may ship the artifact directory without the pickles
+            if path.exists() and file_fingerprint(path) != fingerprints.get(name):
+                print(f"Ignoring {self.artifact_dir}: it was exported from a different {name} file")
+                return False
+        return True
+    
+    def _load_mapped_artifacts(self):
+        artifacts = load_artifacts(self.artifact_dir, mmap_mode='r')
+        self.model = None
+        self.scaler = None
+        self.features = artifacts['features']
+        self.forest = artifacts['forest']
+        self._scaler_mean = artifacts['scaler_mean']
+        self._scaler_scale = artifacts['scaler_scale']
+        n_features = len(self.features)
+        if self.forest.n_features != n_features or len(self._scaler_mean) != n_features:
+            raise ValueError(f"{self.artifact_dir} is inconsistent with its feature list")
+        self.model_fingerprint = artifacts['fingerprints']['model']
+        self.model_version = artifacts['model_version']
+    
+    def _load_pickled_artifacts(self):
+        if not self.model_path.exists():
+            raise FileNotFoundError(f"Model file not found at {self.model_path}")
+        if not self.scaler_path.exists():
+            raise FileNotFoundError(f"Scaler file not found at {self.scaler_path}")
+        if not self.features_path.exists():
+            raise FileNotFoundError(f"Features file not found at {self.features_path}")
+        
+        # Imported here so memory-mapped loads never pay for joblib/sklearn/pandas
+        import joblib
+        import pandas as pd
+        
+        self.model = joblib.load(self.model_path)
+        self.scaler = joblib.load(self.scaler_path)
+        
+        features_df = pd.read_csv(self.features_path, header=None)
+        self.features = features_df.iloc[:, 0].tolist()
+        
+        self._validate_feature_order()
+        
+        self.model_fingerprint = file_fingerprint(self.model_path)
+        # Identifies the full artifact set; part of every prediction cache key
+        self.model_version = artifact_version(
+            self.model_fingerprint,
+            file_fingerprint(self.scaler_path),
+            file_fingerprint(self.features_path)
+        )
+        self.forest = self._load_flat_forest() if self.engine != 'sklearn' else None
+        
+        # Plain arrays so scaling is a NumPy expression rather than a sklearn call
+        self._scaler_mean = np.asarray(self.scaler.mean_, dtype=np.float64)
+        self._scaler_scale = np.asarray(self.scaler.scale_, dtype=np.float64)
+    
+    def reload(self):
+        """Reload the model artifacts from disk. Cached predictions are invalidated."""
+        self._load_artifacts()
+    
+    def cache_stats(self):
+        """Hit/miss counters and occupancy of the prediction cache."""
+        return self.cache.stats() | {"model_version": self.model_version}
+    
+    def _load_flat_forest(self):
+        """Use the exported flat forest if it matches model.pkl, otherwise flatten now."""
+        if self.flat_model_path is not None and self.flat_model_path.exists():
+            forest = FlatForest.load(self.flat_model_path)
+            if forest.source_fingerprint == self.model_fingerprint:
+                return forest
+            print(f"Ignoring {self.flat_model_path}: it was exported from a different model")
+        try:
+            return FlatForest.from_sklearn(self.model, source_fingerprint=self.model_fingerprint)
+        except ValueError as e:
+            if self.engine == 'flat':
+                raise
+            print(f"Flat forest engine unavailable, using sklearn: {str(e)}")
+            return None
+    
+    def _validate_feature_order(self):
+        """Check once at load time that the scaler and model agree with features.csv."""
+        n_features = len(self.features)
+        for name, estimator in (("scaler", self.scaler), ("model", self.model)):
+            if getattr(estimator, 'n_features_in_', n_features) != n_features:
+                raise ValueError(
+                    f"The {name} expects {estimator.n_features_in_} features "
+                    f"but features.csv lists {n_features}"
+                )
+            fitted_names = getattr(estimator, 'feature_names_in_', None)
+            if fitted_names is not None and list(fitted_names) != self.features:
+                raise ValueError(
+                    f"The {name} was fitted on features {list(fitted_names)}, "
+                    f"which do not match features.csv order {self.features}"
+                )
+    
+    def _to_matrix(self, data):
         """
-        Predict credit risk score for given transaction data.
+        Convert a dict, DataFrame or array of feature values into an (n, k) float matrix
+        ordered like self.features.
+        """
+        if isinstance(data, dict):
+            missing_features = set(self.features) - set(data)
+            if missing_features:
+                raise ValueError(f"Missing required features: {missing_features}")
+            return np.array([[data[f] for f in self.features]], dtype=np.float64)
+        
+        # A DataFrame can only exist if pandas was imported, so avoid importing it here.
+        # pandas may still be mid-import in another thread, hence the getattr
+        pd = sys.modules.get('pandas')
+        if pd is not None and isinstance(data, getattr(pd, 'DataFrame', ())):
+            missing_features = set(self.features) - set(data.columns)
+            if missing_features:
+                raise ValueError(f"Missing required features: {missing_features}")
+            return data[self.features].to_numpy(dtype=np.float64)
+        
+        # Arrays are trusted to already be in feature order
+        X = np.asarray(data, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != len(self.features):
+            raise ValueError(
+                f"Expected an array of shape (n, {len(self.features)}), got {X.shape}"
+            )
+        return X
+    
+    def predict_proba_many(self, data):
+        """
+        Predict risk probabilities for many rows at once.
         
         Args:
-            transaction_data: DataFrame with transaction features or dict with feature values
+            data: (n, k) NumPy array in feature order, DataFrame or dict of feature values
             
         Returns:
-            float: Risk probability score (0-1)
+            np.ndarray: Risk probabilities (0-1), one per row
         """
         try:
-            if isinstance(transaction_data, dict):
-                transaction_data = pd.DataFrame([transaction_data])
-            
-            # Ensure all required features are present
-            missing_features = set(self.features) - set(transaction_data.columns)
-            if missing_features:
-                raise ValueError(f"Missing required features: {missing_features}")
-            
-            # Select and order features
-            X = transaction_data[self.features]
-            
-            # Scale features
-            X_scaled = self.scaler.transform(X)
-            
-            # Predict probability
-            risk_prob = self.model.predict_proba(X_scaled)[:, 1]
-            
-            return float(risk_prob[0])
+            X = self._to_matrix(data)
+            if self.cache.maxsize <= 0 or len(X) > CACHE_MAX_BATCH_ROWS:
+                return self._predict_proba_uncached(X)
             
+            keys = [self._cache_key(row) for row in X]
+            risk_probs = np.array([self.cache.get(key, np.nan) for key in keys])
+            misses = np.flatnonzero(np.isnan(risk_probs))
+            if len(misses) > 0:
+                risk_probs[misses] = self._predict_proba_uncached(X[misses])
+                for i in misses:
+                    self.cache.set(keys[i], float(risk_probs[i]))
+            return risk_probs
         except Exception as e:
             raise ValueError(f"Prediction failed: {str(e)}")
     
+    def _predict_proba_uncached(self, X):
+        X_scaled = (X - self._scaler_mean) / self._scaler_scale
+        if self.forest is not None and (
+            self.engine == 'flat' or len(X_scaled) <= FLAT_ENGINE_MAX_ROWS or self.model is None
+        ):
+            return self.forest.predict_proba(X_scaled)
+        return self.model.predict_proba(X_scaled)[:, 1]
+    
+    def _cache_key(self, row):
+        """
+        Canonical digest of one ordered feature vector plus the model version.
+        -0.0 and every NaN payload are normalized so equal vectors hash equally.
+        """
+        canonical = np.where(np.isnan(row), np.nan, row + 0.0)
+        return hashlib.blake2b(canonical.tobytes(), digest_size=16, key=self._cache_salt).digest()
+    
+    def predict_many(self, data):
+        """
+        Score many rows at once.
+        
+        Args:
+            data: (n, k) NumPy array in feature order, DataFrame or dict of feature values
+            
+        Returns:
+            dict: Arrays of risk_probability, credit_score and risk_category, one entry per row
+        """
+        risk_probs = self.predict_proba_many(data)
+        credit_scores = credit_scores_from_risk(risk_probs)
+        return {
+            'risk_probability': risk_probs,
+            'credit_score': credit_scores,
+            'risk_category': risk_categories_from_scores(credit_scores),
+        }
+    
+    def predict_risk_score(self, transaction_data):
+        """
+        Predict credit risk score for given transaction data.
+        
+        Args:
+            transaction_data: DataFrame with transaction features or dict with feature values
+            
+        Returns:
+            float: Risk probability score (0-1)
+        """
+        return float(self.predict_proba_many(transaction_data)[0])
+    
     def predict_credit_score(self, risk_probability):
         """
         Convert risk probability to a credit score (300-850 scale).
@@ -88,13 +301,7 @@ class CreditScorePredictor:
         Returns:
             int: Credit score on 300-850 scale
         """
-        # Invert probability (lower risk = higher score)
-        creditworthiness = 1 - risk_probability
-        
-        # Scale to 300-850 range
-        score = 300 + (creditworthiness * 550)
-        
-        return int(round(score))
+        return int(credit_scores_from_risk(risk_probability))
     
     def get_risk_category(self, score):
         """
@@ -106,16 +313,7 @@ class CreditScorePredictor:
         Returns:
             str: Risk category
         """
-        if score >= 750:
-            return "Excellent"
-        elif score >= 700:
-            return "Good"
-        elif score >= 650:
-            return "Fair"
-        elif score >= 600:
-            return "Poor"
-        else:
-            return "Very Poor"
+        return str(risk_categories_from_scores(score))
     
     def predict_full_assessment(self, transaction_data):
         """
@@ -128,15 +326,82 @@ class CreditScorePredictor:
             dict: Complete assessment with risk_probability, credit_score, and category
         """
         risk_prob = self.predict_risk_score(transaction_data)
+        return self._build_assessment(risk_prob)
+    
+    def predict_batch_assessment(self, features_df):
+        """
+        Generate credit assessments for many customers with a single model call.
+        
+        Args:
+            features_df: DataFrame with one row of engineered features per customer
+            
+        Returns:
+            list: One assessment dict per input row, in input order
+        """
+        results = self.predict_many(features_df)
+        return [
+            _assessment_dict(float(risk_prob), int(score), str(category))
+            for risk_prob, score, category in zip(
+                results['risk_probability'], results['credit_score'], results['risk_category']
+            )
+        ]
+    
+    def _build_assessment(self, risk_prob):
         credit_score = self.predict_credit_score(risk_prob)
         category = self.get_risk_category(credit_score)
+        return _assessment_dict(risk_prob, credit_score, category)
+
+
+def resident_memory_mb():
+    """Current resident set size of this process in MB (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return round(resident_pages * os.sysconf('SC_PAGE_SIZE') / 2**20, 1)
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        return round(peak / (2**20 if sys.platform == 'darwin' else 2**10), 1)
+
+
+def credit_scores_from_risk(risk_probabilities):
+    """
+    Map risk probabilities onto the 300-850 credit score scale.
+    
+    Args:
+        risk_probabilities: Scalar or array of risk probabilities (0-1)
         
-        return {
-            'risk_probability': risk_prob,
-            'credit_score': credit_score,
-            'risk_category': category,
-            'interpretation': f"Credit score of {credit_score} indicates {category} creditworthiness"
-        }
+    Returns:
+        np.ndarray: Integer credit scores with the same shape as the input
+    """
+    # Invert probability (lower risk = higher score) and scale to 300-850
+    creditworthiness = 1 - np.asarray(risk_probabilities, dtype=np.float64)
+    scores = SCORE_MIN + creditworthiness * (SCORE_MAX - SCORE_MIN)
+    # np.rint rounds half to even, like the built-in round()
+    return np.rint(scores).astype(np.int64)
+
+
+def risk_categories_from_scores(scores):
+    """
+    Bin credit scores into risk categories.
+    
+    Args:
+        scores: Scalar or array of credit scores (300-850)
+        
+    Returns:
+        np.ndarray: Risk category labels with the same shape as the input
+    """
+    return RISK_CATEGORIES[np.searchsorted(CATEGORY_THRESHOLDS, scores, side='right')]
+
+
+def _assessment_dict(risk_prob, credit_score, category):
+    return {
+        'risk_probability': risk_prob,
+        'credit_score': credit_score,
+        'risk_category': category,
+        'interpretation': f"Credit score of {credit_score} indicates {category} creditworthiness"
+    }
 
 
 def main():
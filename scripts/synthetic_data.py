@@ -0,0 +1,235 @@
+"""
+Synthetic MoMo Statements
+Generates realistic mobile money statements at any scale in every layout the
+ingestion code reads, for capacity planning, benchmarks and load tests. Data/raw
+holds only about a hundred real rows.
+
+The generated data follows the shapes seen in the real statements:
+    - customer activity is skewed: a few customers make most transactions
+      (Zipf-distributed weights), and every customer appears at least once
+    - transactions cluster in the morning, at lunch and in the evening, are rare
+      at night and slightly less frequent at weekends
+    - each customer has their own typical amount and share of incoming money, and
+      Balance is that customer's running balance in time order
+    - rows are in time order, as in an exported statement
+
+Usage:
+    python scripts/synthetic_data.py --rows 1000000 --customers 10000 --output data/synthetic.csv
+    python scripts/synthetic_data.py --rows 500 --customers 1 --layout combined_date_time --output one.csv
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Column layouts of the real statements, keyed by the ingest schema they map onto
+LAYOUTS = {
+    # dataset1.csv
+    'separate_date_time': ['Date', 'Time', 'Transaction Type', 'Phone Number', 'Account Name',
+                           'Amount', 'Fees', 'Tax', 'Balance', 'Reference'],
+    # dataset 2.csv
+    'combined_date_time': ['Date & Time', 'Payment Type', 'To/From Account', 'Account Name', 'Amount',
+                           'Transaction ID', 'Fees', 'Tax', 'Balance', 'Reference'],
+    # dataset 3.csv and dataset 4.csv: the combined layout without Fees and Tax
+    'combined_date_time_no_fees': ['Date & Time', 'Payment Type', 'To/From Account', 'Account Name',
+                                   'Amount', 'Transaction ID', 'Balance', 'Reference'],
+}
+
+# Relative transaction volume per hour of day (00:00-23:00)
+HOUR_WEIGHTS = np.array([
+    0.2, 0.1, 0.1, 0.1, 0.2, 0.5, 1.2, 2.2, 3.0, 2.8, 2.5, 2.6,
+    3.2, 3.3, 2.7, 2.5, 2.6, 3.1, 3.4, 3.0, 2.4, 1.8, 1.1, 0.5,
+])
+# Relative volume per weekday, Monday first
+WEEKDAY_WEIGHTS = np.array([1.0, 1.0, 1.0, 1.0, 1.1, 0.8, 0.6])
+
+FIRST_NAMES = ['Kwame', 'Kofi', 'Kojo', 'Kwesi', 'Yaw', 'Kwaku', 'Ama', 'Akosua', 'Adwoa', 'Abena',
+               'Esi', 'Efua', 'Afia', 'Naana', 'Nana', 'Prince', 'Abigail', 'Emmanuel', 'Grace', 'Samuel']
+LAST_NAMES = ['Mensah', 'Asare', 'Osei', 'Annan', 'Ofori', 'Boadu', 'Nyarko', 'Forson', 'Kwarteng',
+              'Owusu', 'Ampofo', 'Sarpong', 'Essel', 'Baah', 'Boateng', 'Kusi', 'Addo', 'Appiah']
+
+# Debit and credit categories: (Transaction Type, Reference) for the separate
+# layout; References for the combined layouts, whose Payment Type is "MOMO USER"
+SEPARATE_DEBITS = [('Cash Withdrawal', 'Withdrawal'), ('Airtime Purchase', 'Payment'),
+                   ('MoMo Transaction', 'Transfer'), ('MoMo Transaction', 'Payment')]
+SEPARATE_CREDITS = [('MoMo Transaction', 'Deposit'), ('MoMo Transaction', 'Requested')]
+COMBINED_DEBITS = ['Transport', 'Airtime', 'Groceries', 'Food', 'Rent', 'Electricity',
+                   'Medicine', 'Hospital', 'Plumbing']
+COMBINED_CREDITS = ['Transfer', 'Salary']
+
+
+def _choice(rng, values, size, weights=None):
+    values = np.asarray(values, dtype=object)
+    p = None if weights is None else np.asarray(weights, dtype=np.float64) / np.sum(weights)
+    return values[rng.choice(len(values), size=size, p=p)]
+
+
+def _customer_ids(rng, customers, layout):
+    # dataset1 carries full international numbers (233...), the combined
+    # layouts local 9-digit account numbers (2........)
+    if layout == 'separate_date_time':
+        base, span = 233_200_000_000, 100_000_000
+    else:
+        base, span = 200_000_000, 100_000_000
+    return (base + rng.choice(span, size=customers, replace=False)).astype(str).astype(object)
+
+
+def _timestamps(rng, rows, start, days):
+    """Minute offsets from start, following the hour-of-day and weekday weights."""
+    weekdays = (pd.Timestamp(start).dayofweek + np.arange(days)) % 7
+    day = rng.choice(days, size=rows, p=WEEKDAY_WEIGHTS[weekdays] / WEEKDAY_WEIGHTS[weekdays].sum())
+    hour = rng.choice(24, size=rows, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    return day * 1440 + hour * 60 + rng.integers(0, 60, size=rows)
+
+
+def _format_minutes(minutes, start, fmt):
+    """Format minute offsets once per distinct value."""
+    codes, uniques = pd.factorize(minutes)
+    stamps = pd.Timestamp(start) + pd.to_timedelta(uniques, unit='min')
+    return np.asarray(stamps.strftime(fmt), dtype=object)[codes]
+
+
+def generate_statement(rows, customers=1, layout='separate_date_time', seed=0,
+                       skew=1.1, days=90, start='2025-01-01'):
+    """
+    Generate a synthetic statement.
+
+    Args:
+        rows: Number of transactions
+        customers: Number of distinct customers (at most rows)
+        layout: One of LAYOUTS
+        seed: Random seed; equal arguments give identical statements
+        skew: Zipf exponent of customer activity; 0 spreads rows evenly
+        days: Days covered, starting at start
+        start: First day of the statement
+
+    Returns:
+        DataFrame with the layout's columns, as read_csv returns them for the real
+        files, in time order
+
+    Raises:
+        ValueError: For an unknown layout or more customers than rows
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout} (expected one of {sorted(LAYOUTS)})")
+    if not 1 <= customers <= rows:
+        raise ValueError(f"customers must be between 1 and rows ({rows}), got {customers}")
+    rng = np.random.default_rng(seed)
+
+    # Customer profiles: activity weight, typical amount, share of incoming money
+    activity = 1.0 / rng.permutation(np.arange(1, customers + 1)) ** skew
+    typical_amount = rng.lognormal(3.3, 0.8, size=customers)
+    credit_share = rng.beta(2, 6, size=customers)
+    opening_balance = rng.lognormal(6.0, 1.0, size=customers)
+    ids = _customer_ids(rng, customers, layout)
+    names = (_choice(rng, FIRST_NAMES, customers) + ' ' + _choice(rng, LAST_NAMES, customers)).astype(object)
+
+    owner = np.empty(rows, dtype=np.int64)
+    owner[:customers] = np.arange(customers)
+    owner[customers:] = rng.choice(customers, size=rows - customers, p=activity / activity.sum())
+    minutes = _timestamps(rng, rows, start, days)
+
+    # Time order within each customer for running balances, then overall
+    order = np.lexsort((minutes, owner))
+    owner, minutes = owner[order], minutes[order]
+
+    credit = rng.random(rows) < credit_share[owner]
+    # Incoming payments are rarer but larger than spending
+    size = typical_amount[owner] * rng.lognormal(0.0, 0.7, size=rows) * np.where(credit, 3.0, 1.0)
+    amount = np.round(np.where(credit, size, -size), 2)
+
+    # Running totals per customer; customers are sorted and all present, so group
+    # i is customer i
+    totals = np.cumsum(amount)
+    group_start = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+    lengths = np.diff(np.r_[group_start, rows])
+    running = totals - np.repeat(totals[group_start] - amount[group_start], lengths)
+    # Customers never go below zero: top up the opening balance by the deficit
+    lowest = np.minimum.reduceat(running, group_start)
+    opening = opening_balance + np.maximum(-(opening_balance + lowest), 0.0)
+    balance = np.round(opening[owner] + running, 2)
+
+    chronological = np.argsort(minutes, kind='stable')
+    owner, minutes, amount, credit, balance = (
+        owner[chronological], minutes[chronological], amount[chronological],
+        credit[chronological], balance[chronological]
+    )
+    magnitude = np.abs(amount)
+
+    if layout == 'separate_date_time':
+        debit_kind = rng.integers(0, len(SEPARATE_DEBITS), size=rows)
+        credit_kind = rng.integers(0, len(SEPARATE_CREDITS), size=rows)
+        kinds = np.where(credit, np.array(SEPARATE_CREDITS, dtype=object)[credit_kind, 0],
+                         np.array(SEPARATE_DEBITS, dtype=object)[debit_kind, 0])
+        references = np.where(credit, np.array(SEPARATE_CREDITS, dtype=object)[credit_kind, 1],
+                              np.array(SEPARATE_DEBITS, dtype=object)[debit_kind, 1])
+        fees = np.round(np.minimum(magnitude * 0.01, 5.0), 2)
+        frame = {
+            'Date': _format_minutes(minutes, start, '%d-%b-%y'),
+            'Time': _format_minutes(minutes, start, '%H:%M'),
+            'Transaction Type': kinds,
+            'Phone Number': ids[owner],
+            'Account Name': names[owner],
+            'Amount': amount,
+            'Fees': fees,
+            'Tax': np.round(fees * 0.2, 2),
+            'Balance': balance,
+            'Reference': references,
+        }
+    else:
+        references = np.where(credit, _choice(rng, COMBINED_CREDITS, rows),
+                              _choice(rng, COMBINED_DEBITS, rows))
+        frame = {
+            'Date & Time': _format_minutes(minutes, start, '%d/%m/%Y %H:%M'),
+            'Payment Type': 'MOMO USER',
+            'To/From Account': ids[owner],
+            'Account Name': names[owner],
+            'Amount': amount,
+            # Sequential, like a ledger, from a random 11-digit base
+            'Transaction ID': 50_000_000_000 + rng.integers(0, 10**9)
+                              + np.cumsum(rng.integers(1, 500, size=rows)),
+            'Fees': np.select([magnitude < 10, magnitude < 50], [0.0, 0.5], 1.0),
+            'Tax': 0.0,
+            'Balance': balance,
+            'Reference': references,
+        }
+
+    df = pd.DataFrame(frame)[LAYOUTS[layout]]
+    # Column ids are plain digits; keep them numeric, as read_csv would
+    id_column = 'Phone Number' if layout == 'separate_date_time' else 'To/From Account'
+    df[id_column] = df[id_column].astype(np.int64)
+    return df
+
+
+def statement_csv(rows, customers=1, layout='separate_date_time', seed=0, **options) -> bytes:
+    """generate_statement as CSV bytes, as a client would upload it."""
+    return generate_statement(rows, customers, layout, seed, **options).to_csv(index=False).encode()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic MoMo statement CSV")
+    parser.add_argument("--rows", type=lambda v: int(float(v)), required=True, help="Number of transactions")
+    parser.add_argument("--customers", type=lambda v: int(float(v)), default=1,
+                        help="Number of distinct customers (default: 1)")
+    parser.add_argument("--layout", choices=sorted(LAYOUTS), default="separate_date_time",
+                        help="Statement layout (default: separate_date_time, as dataset1.csv)")
+    parser.add_argument("--skew", type=float, default=1.1,
+                        help="Zipf exponent of customer activity; 0 for uniform (default: 1.1)")
+    parser.add_argument("--days", type=int, default=90, help="Days covered (default: 90)")
+    parser.add_argument("--start", default="2025-01-01", help="First day (default: 2025-01-01)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--output", required=True, help="CSV file to write")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        statement = generate_statement(args.rows, args.customers, args.layout, args.seed,
+                                       skew=args.skew, days=args.days, start=args.start)
+    except ValueError as e:
+        parser.error(str(e))
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    statement.to_csv(args.output, index=False)
+    print(f"Wrote {len(statement):,} transactions for {args.customers:,} customers "
+          f"({args.layout}) to {args.output} in {time.perf_counter() - started:.1f}s")
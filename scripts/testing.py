@@ -1,4 +1,10 @@
-import pandas as pd
+import sys
+from pathlib import Path
 
-df = pd.read_csv("data/raw/dataset1.csv")
-print("Columns in dataset:", df.columns.tolist())
\ No newline at end of file
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.features.ingest import read_transactions
+
+df = read_transactions("data/raw/dataset1.csv")
+print("Columns in dataset:", df.columns.tolist())
+print(df.dtypes)
+print(f"Memory: {df.memory_usage(deep=True).sum() / 1024:.1f} KB")
@@ -13,6 +13,7 @@ import argparse
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from src.features.build_features import engineer_features
+from src.features.feature_store import FEATURE_STORE_DIR, FeatureStore, build_customer_features
 
 class CreditScorer:
     def __init__(self, model_path='models/model.pkl', scaler_path='models/scaler.pkl'):
@@ -26,7 +27,7 @@ class CreditScorer:
     
     def predict(self, raw_data):
         try:
-            processed_data = engineer_features(raw_data)
+            processed_data = engineer_features(raw_data, per_customer=True)
             
             missing = set(self.features) - set(processed_data.columns)
             if missing:
@@ -53,12 +54,23 @@ def plot_feature_importance(model, features, output_dir):
     plt.savefig(f'{output_dir}/feature_importance.png')
     plt.close()
 
-def train_model(data_path, output_dir="models"):
+def train_model(data_paths, output_dir="models", feature_store=None):
+    """
+    Train, evaluate and save the credit risk model.
+    
+    Args:
+        data_paths: Transaction CSV path, or a list of paths whose customers are combined
+        output_dir: Directory for the model, scaler, features list and plots
+        feature_store: Optional FeatureStore; unchanged files reuse stored aggregates
+            instead of being re-parsed and re-engineered
+    """
+    if isinstance(data_paths, (str, Path)):
+        data_paths = [data_paths]
     try:
         # 1. Load and preprocess data
         print("🛠️ Engineering features...")
-        raw_data = pd.read_csv(data_path)
-        processed_data = engineer_features(raw_data)
+        # One row per customer, so customers with many transactions are not over-weighted
+        processed_data = build_customer_features(data_paths, store=feature_store)
         
         # 2. Define features and target
         features = [
@@ -131,12 +143,18 @@ def train_model(data_path, output_dir="models"):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--data", default="data/raw/dataset1.csv", help="Path to input CSV")
+    parser.add_argument("--data", nargs="+", default=["data/raw/dataset1.csv"],
+                        help="Path(s) to input CSV; customers across files are combined")
     parser.add_argument("--output", default="models", help="Output directory for models")
+    parser.add_argument("--feature-store", default=FEATURE_STORE_DIR,
+                        help="Directory of stored per-file features reused across runs")
+    parser.add_argument("--no-feature-store", action="store_true",
+                        help="Recompute all features and do not store them")
     args = parser.parse_args()
     
     try:
-        scorer = train_model(args.data, args.output)
+        store = None if args.no_feature_store else FeatureStore(args.feature_store)
+        scorer = train_model(args.data, args.output, feature_store=store)
         
         # Test inference
         test_sample = pd.DataFrame([{
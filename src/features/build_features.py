@@ -1,69 +1,116 @@
 import pandas as pd
 import numpy as np
+import sys
+from pathlib import Path
 
-def engineer_features(raw_df):
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.features.feature_state import CustomerFeatureState
+from src.features.ingest import parse_dates, parse_hours, to_canonical
+
+def engineer_features(raw_df, per_customer=False):
     """
     Transforms raw transaction data into credit score features
     Args:
         raw_df: DataFrame containing transaction data with columns:
                 ['Date', 'Time', 'Transaction Type', 'Amount', ...]
+                or any statement layout known to src.features.ingest.
+                The frame is not modified.
+        per_customer: Return one row per customer (a compact feature matrix with a
+                'Phone Number' column) instead of copying the customer features
+                onto every transaction row
     Returns:
         DataFrame with engineered features
     """
+    raw_df = to_canonical(raw_df, strict=False)
+    transactions = _prepare_transactions(raw_df, keep_all_columns=not per_customer)
+    features_df = _aggregate_customer_features(transactions)
+    if per_customer:
+        return features_df.reset_index()
+    return transactions.merge(features_df, on='Phone Number', how='left')
+
+
+def _prepare_transactions(raw_df, keep_all_columns=True):
+    # Work on a copy (or only the needed columns) so the caller's frame is untouched
+    if keep_all_columns:
+        transactions = raw_df.copy()
+    else:
+        columns = ['Phone Number', 'Amount', 'Date'] + (['Time'] if 'Time' in raw_df.columns else [])
+        transactions = raw_df[columns].copy()
+    
     # Convert Amount to numeric
-    raw_df['Amount'] = pd.to_numeric(raw_df['Amount'])
+    transactions['Amount'] = pd.to_numeric(transactions['Amount'])
     
     # 1. Create deposit/withdrawal flags
-    raw_df['is_deposit'] = np.where(raw_df['Amount'] > 0, 1, 0)
-    raw_df['is_withdrawal'] = np.where(raw_df['Amount'] < 0, 1, 0)
+    transactions['is_deposit'] = np.where(transactions['Amount'] > 0, 1, 0)
+    transactions['is_withdrawal'] = np.where(transactions['Amount'] < 0, 1, 0)
     
-    # 2. Group by customer to calculate metrics
-    customer_features = raw_df.groupby('Phone Number').agg({
-        'Amount': ['count', 'sum', 'mean', 'std'],
-        'is_deposit': 'sum',
-        'is_withdrawal': 'sum'
-    })
-    
-    # Flatten multi-index columns
-    customer_features.columns = [
-        'txn_count', 'net_amount', 'avg_amount', 'amount_std',
-        'total_deposits', 'total_withdrawals'
-    ]
-    
-    # 3. Calculate financial ratios
-    customer_features['dwr'] = (
-        customer_features['total_deposits'] / 
-        (customer_features['total_withdrawals'] + 1e-6)
-    )
-    
-    # 4. Time-based features
-    raw_df['Date'] = pd.to_datetime(raw_df['Date'])
+    # 2. Time-based columns
+    transactions['Date'] = parse_dates(transactions['Date'])
     
     # Parse Time column to extract hour
-    if 'Time' in raw_df.columns:
+    if 'Time' in transactions.columns:
         try:
-            # Handle both HH:MM format and full datetime strings
-            raw_df['Hour'] = pd.to_datetime(raw_df['Time'], format='%H:%M', errors='coerce').dt.hour
-            # Fallback for any remaining NaN values
-            raw_df['Hour'] = raw_df['Hour'].fillna(12.0)
+            # HH:MM values; anything else falls back to the default hour
+            transactions['Hour'] = parse_hours(transactions['Time']).fillna(12.0)
         except (ValueError, TypeError):
             # If parsing fails, set default hour
-            raw_df['Hour'] = 12.0
+            transactions['Hour'] = 12.0
     else:
-        raw_df['Hour'] = 12.0
+        transactions['Hour'] = 12.0
     
-    time_features = raw_df.groupby('Phone Number').agg({
-        'Date': lambda x: (x.max() - x.min()).days,
-        'Hour': ['mean', 'std']
-    })
-    time_features.columns = ['customer_duration_days', 'hour_mean', 'hour_std']
+    return transactions
+
+
+def _aggregate_customer_features(transactions):
+    # 3. Single grouped pass with named aggregations (no per-group Python lambdas)
+    customer_features = transactions.groupby('Phone Number', observed=True).agg(
+        txn_count=('Amount', 'count'),
+        net_amount=('Amount', 'sum'),
+        avg_amount=('Amount', 'mean'),
+        amount_std=('Amount', 'std'),
+        total_deposits=('is_deposit', 'sum'),
+        total_withdrawals=('is_withdrawal', 'sum'),
+        first_date=('Date', 'min'),
+        last_date=('Date', 'max'),
+        hour_mean=('Hour', 'mean'),
+        hour_std=('Hour', 'std'),
+    )
+    
+    # 4. Calculate financial ratios
+    customer_features['dwr'] = (
+        customer_features['total_deposits'] / 
+        (customer_features['total_withdrawals'] + 1e-6)
+    )
+    customer_features['customer_duration_days'] = (
+        customer_features.pop('last_date') - customer_features.pop('first_date')
+    ).dt.days
     
     # Fill NaN std values for customers with single transaction
-    time_features['hour_std'] = time_features['hour_std'].fillna(0.0)
+    customer_features['hour_std'] = customer_features['hour_std'].fillna(0.0)
     
-    # Combine all features
-    features_df = customer_features.join(time_features)
-    return raw_df.merge(features_df, on='Phone Number', how='left')
+    return customer_features[[
+        'txn_count', 'net_amount', 'avg_amount', 'amount_std',
+        'total_deposits', 'total_withdrawals', 'dwr',
+        'customer_duration_days', 'hour_mean', 'hour_std'
+    ]]
+
+
+def engineer_features_chunked(chunks):
+    """
+    Compute customer features from an iterable of transaction chunks in bounded memory.
+    Only one chunk and the running per-customer aggregates are held at a time.
+    Args:
+        chunks: Iterable of DataFrames, e.g. pd.read_csv(..., chunksize=n)
+    Returns:
+        DataFrame with one row of features per customer
+    """
+    state = CustomerFeatureState()
+    for chunk in chunks:
+        state.update(to_canonical(chunk, strict=False))
+    if len(state) == 0:
+        raise ValueError("No transactions to aggregate")
+    return state.to_features()
 
 # Test case
 if __name__ == "__main__":
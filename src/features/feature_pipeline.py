@@ -4,25 +4,87 @@ This module provides a complete pipeline for processing transaction data
 and extracting features for credit scoring.
 """
 
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Union
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.features.feature_state import aggregate_statistics, aggregate_values, combine_aggregates
+from src.features.ingest import detect_schema, parse_dates, parse_hours, read_header, read_transactions, to_canonical
+
+# Memory budget for chunked mode (fit_transform(..., chunked=True))
+FEATURE_MEMORY_BUDGET_MB = float(os.getenv("FEATURE_MEMORY_BUDGET_MB", "512"))
+
+# Rows read to estimate the in-memory size of a transaction
+SAMPLE_ROWS = 10_000
+MIN_CHUNK_ROWS = 1_000
+# Peak working memory of a chunk relative to its loaded size: the cleaned and
+# feature copies plus the grouping temporaries
+CHUNK_WORKING_SET_FACTOR = 4
+# Share of the budget for the chunk in flight; the rest buffers partial aggregates
+CHUNK_BUDGET_SHARE = 0.5
+# Merging buffered partials briefly needs about twice their size
+COMBINE_WORKING_SET_FACTOR = 2
+
+# Worker processes for sharded feature engineering; 1 runs in process
+FEATURE_WORKERS = int(os.getenv("FEATURE_WORKERS", "1"))
+# Shards per worker, so a shard holding a few very active customers does not
+# leave the other workers idle
+SHARDS_PER_WORKER = 4
+# Smaller frames are engineered in process; starting workers costs more than it saves
+PARALLEL_MIN_ROWS = 100_000
+
+# Config keys that change how features are computed but not the features: chunked
+# and sharded runs give the same table bit for bit whatever the budget or workers
+_RUNTIME_CONFIG_KEYS = ('memory_budget_mb', 'workers')
+
+
+def _engineer_shard(config: Dict, shm_name: str, layout: List[Tuple[str, str, int]],
+                    total_rows: int, start: int, stop: int) -> pd.DataFrame:
+    """
+    Process-pool task: customer features of one shard. The cleaned columns live in a
+    shared memory block laid out by FeaturePipeline._engineer_sharded; only rows
+    [start, stop) are copied out, and only the per-customer result is sent back.
+    """
+    # Spawned workers share the parent's resource tracker, so attaching here does
+    # not hand the block's cleanup to this process; the parent unlinks it
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        df = pd.DataFrame({
+            name: np.ndarray(total_rows, dtype=dtype, buffer=shm.buf, offset=offset)[start:stop].copy()
+            for name, dtype, offset in layout
+        })
+    finally:
+        shm.close()
+    pipeline = FeaturePipeline(config)
+    return pipeline.engineer_customer_features(pipeline.engineer_basic_features(df))
+
 
 class FeaturePipeline:
     """
     A comprehensive feature engineering pipeline for credit scoring.
     """
     
-    def __init__(self, config: Optional[Dict] = None):
+    def __init__(self, config: Optional[Dict] = None, feature_store=None):
         """
         Initialize the feature pipeline.
         
         Args:
             config: Optional configuration dictionary for pipeline parameters
+            feature_store: Optional FeatureStore (src.features.feature_store); when set,
+                fit_transform reuses customer features stored for an unchanged file
         """
         self.config = config or self._default_config()
+        self.feature_store = feature_store
         self.feature_names = []
     
     def _default_config(self) -> Dict:
@@ -35,11 +97,15 @@ class FeaturePipeline:
             'transaction_type_column': 'Transaction Type',
             'min_transactions': 5,  # Minimum transactions per customer
             'quantile_thresholds': [0.25, 0.5, 0.75],  # For risk categorization
+            'memory_budget_mb': FEATURE_MEMORY_BUDGET_MB,  # Chunked mode only
+            'workers': FEATURE_WORKERS,  # Processes for sharded feature engineering
         }
     
     def load_data(self, data_path: Union[str, Path]) -> pd.DataFrame:
         """
-        Load transaction data from CSV file.
+        Load transaction data from CSV file. Statements in a known layout are read
+        with typed columns and mapped onto the canonical columns; malformed amounts
+        and dates are kept as NaN/NaT for clean_data to drop.
         
         Args:
             data_path: Path to the CSV file
@@ -48,7 +114,10 @@ class FeaturePipeline:
             DataFrame with loaded data
         """
         try:
-            df = pd.read_csv(data_path)
+            if detect_schema(read_header(data_path)) is not None:
+                df = read_transactions(data_path, errors='coerce')
+            else:
+                df = pd.read_csv(data_path)
             print(f"Loaded {len(df)} transactions from {data_path}")
             return df
         except Exception as e:
@@ -86,6 +155,11 @@ class FeaturePipeline:
         Returns:
             Cleaned DataFrame
         """
+        df_clean = self._clean_rows(df)
+        print(f"Cleaned data: {len(df_clean)} valid transactions")
+        return df_clean
+    
+    def _clean_rows(self, df: pd.DataFrame) -> pd.DataFrame:
         df_clean = df.copy()
         
         # Convert Amount to numeric
@@ -100,25 +174,18 @@ class FeaturePipeline:
             self.config['phone_column']
         ])
         
-        # Parse dates
-        df_clean[self.config['date_column']] = pd.to_datetime(
+        # Parse dates (explicit formats, once per distinct value)
+        df_clean[self.config['date_column']] = parse_dates(
             df_clean[self.config['date_column']], 
             errors='coerce'
         )
         
         # Parse time if available
         if self.config['time_column'] in df_clean.columns:
-            df_clean['Hour'] = pd.to_datetime(
-                df_clean[self.config['time_column']], 
-                format='%H:%M',
-                errors='coerce'
-            ).dt.hour
+            df_clean['Hour'] = parse_hours(df_clean[self.config['time_column']])
         
         # Remove invalid dates
-        df_clean = df_clean.dropna(subset=[self.config['date_column']])
-        
-        print(f"Cleaned data: {len(df_clean)} valid transactions")
-        return df_clean
+        return df_clean.dropna(subset=[self.config['date_column']])
     
     def engineer_basic_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -149,60 +216,11 @@ class FeaturePipeline:
         Returns:
             DataFrame with customer-level features
         """
-        phone_col = self.config['phone_column']
-        amount_col = self.config['amount_column']
-        date_col = self.config['date_column']
-        
-        # Aggregate by customer
-        customer_features = df.groupby(phone_col).agg({
-            amount_col: ['count', 'sum', 'mean', 'std', 'min', 'max'],
-            'is_deposit': 'sum',
-            'is_withdrawal': 'sum',
-            'amount_abs': ['mean', 'sum']
-        })
-        
-        # Flatten column names
-        customer_features.columns = [
-            'txn_count', 'net_amount', 'avg_amount', 'amount_std',
-            'amount_min', 'amount_max', 'total_deposits', 'total_withdrawals',
-            'avg_abs_amount', 'total_abs_amount'
-        ]
-        
-        # Fill NaN std with 0 (for customers with single transaction)
-        customer_features['amount_std'] = customer_features['amount_std'].fillna(0)
-        
-        # Calculate derived features
-        customer_features['dwr'] = (
-            customer_features['total_deposits'] / 
-            (customer_features['total_withdrawals'] + 1e-6)
-        )
-        
-        # Time-based features
-        time_features = df.groupby(phone_col).agg({
-            date_col: lambda x: (x.max() - x.min()).days
-        })
-        time_features.columns = ['customer_duration_days']
-        
-        # Hour features if available
-        if 'Hour' in df.columns:
-            hour_features = df.groupby(phone_col)['Hour'].agg(['mean', 'std'])
-            hour_features.columns = ['hour_mean', 'hour_std']
-            hour_features['hour_std'] = hour_features['hour_std'].fillna(0)
-            customer_features = customer_features.join(hour_features)
-        else:
-            customer_features['hour_mean'] = 12.0
-            customer_features['hour_std'] = 0.0
-        
-        # Join time features
-        customer_features = customer_features.join(time_features)
-        
-        # Calculate transaction frequency (txns per day)
-        customer_features['txn_frequency'] = (
-            customer_features['txn_count'] / 
-            (customer_features['customer_duration_days'] + 1)
-        )
-        
-        return customer_features
+        # The same exact aggregates as chunked mode, so both give identical features
+        hours = df['Hour'] if 'Hour' in df.columns else None
+        aggregates = aggregate_values(df[self.config['phone_column']], df[self.config['amount_column']],
+                                      df[self.config['date_column']], hours)
+        return self._features_from_aggregates(aggregates.sort_index(), hours is not None)
     
     def select_features(self, df: pd.DataFrame, feature_list: Optional[List[str]] = None) -> pd.DataFrame:
         """
@@ -244,15 +262,7 @@ class FeaturePipeline:
         """
         print("Starting feature engineering pipeline...")
         
-        # Validate data
-        self.validate_data(df)
-        
-        # Clean data
-        df_clean = self.clean_data(df)
-        
-        # Engineer features
-        df_basic = self.engineer_basic_features(df_clean)
-        df_customer = self.engineer_customer_features(df_basic)
+        df_customer = self._customer_features(df)
         
         # Select features
         df_final = self.select_features(df_customer, feature_list)
@@ -262,20 +272,224 @@ class FeaturePipeline:
         
         return df_final
     
+    def _customer_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Validate, clean and aggregate raw transactions into customer features."""
+        # Statements in any known layout are mapped onto the canonical columns
+        df = to_canonical(df, strict=False, errors='coerce')
+        self.validate_data(df)
+        df_clean = self.clean_data(df)
+        workers = self.config.get('workers', 1)
+        if workers > 1 and len(df_clean) >= PARALLEL_MIN_ROWS:
+            return self._engineer_sharded(df_clean, workers)
+        df_basic = self.engineer_basic_features(df_clean)
+        return self.engineer_customer_features(df_basic)
+    
+    def _engineer_sharded(self, df_clean: pd.DataFrame, workers: int) -> pd.DataFrame:
+        """
+        Customer features computed by a process pool, one customer shard per task.
+        
+        Customers are hash-partitioned on their key, so each shard holds every
+        transaction of its customers and the shard results are simply concatenated.
+        The columns features need are written once to shared memory, grouped by
+        shard; workers copy out their own rows instead of receiving a pickled frame.
+        The output is identical to engineer_customer_features.
+        """
+        phone_col = self.config['phone_column']
+        amount_col = self.config['amount_column']
+        date_col = self.config['date_column']
+        
+        codes, labels = pd.factorize(df_clean[phone_col])
+        n_shards = workers * SHARDS_PER_WORKER
+        key_shards = pd.util.hash_pandas_object(pd.Index(labels), index=False).to_numpy() % n_shards
+        row_shards = key_shards[codes]
+        order = np.argsort(row_shards, kind='stable')
+        bounds = np.searchsorted(row_shards[order], np.arange(n_shards + 1))
+        
+        # Customer codes stand in for the keys; labels are restored from them below
+        columns = {
+            phone_col: codes.astype(np.int64),
+            amount_col: df_clean[amount_col].to_numpy(dtype=np.float64),
+            date_col: df_clean[date_col].to_numpy(),
+        }
+        if 'Hour' in df_clean.columns:
+            columns['Hour'] = df_clean['Hour'].to_numpy(dtype=np.float64)
+        layout = []
+        offset = 0
+        for name, values in columns.items():
+            layout.append((name, values.dtype.str, offset))
+            offset += values.nbytes
+        
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        try:
+            for (name, dtype, start), values in zip(layout, columns.values()):
+                np.ndarray(len(order), dtype=dtype, buffer=shm.buf, offset=start)[:] = values[order]
+            del columns
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                tasks = [
+                    pool.submit(_engineer_shard, self.config, shm.name, layout, len(order), lo, hi)
+                    for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo
+                ]
+                shards = [task.result() for task in tasks]
+        finally:
+            shm.close()
+            shm.unlink()
+        
+        customer_features = pd.concat(shards)
+        keys = labels.take(customer_features.index.to_numpy())
+        if isinstance(keys, pd.CategoricalIndex):
+            # Plain labels, as engineer_customer_features returns them
+            keys = pd.Index(np.asarray(keys))
+        customer_features.index = keys.rename(phone_col)
+        # Same customer order as engineer_customer_features over the whole frame
+        return customer_features.sort_index()
+    
+    def _read_chunks(self, data_path: Union[str, Path], chunk_rows: int) -> Iterator[pd.DataFrame]:
+        """Stream a CSV in chunks, mapped onto the canonical columns when the layout is known."""
+        if detect_schema(read_header(data_path)) is not None:
+            return read_transactions(data_path, chunksize=chunk_rows, errors='coerce')
+        return pd.read_csv(data_path, chunksize=chunk_rows)
+    
+    def _chunk_rows(self, data_path: Union[str, Path]) -> int:
+        """Rows per chunk that keep a chunk's working set within its share of the budget."""
+        sample = next(iter(self._read_chunks(data_path, SAMPLE_ROWS)), None)
+        if sample is None or len(sample) == 0:
+            return MIN_CHUNK_ROWS
+        row_bytes = sample.memory_usage(deep=True).sum() / len(sample)
+        chunk_bytes = self.config['memory_budget_mb'] * 2**20 * CHUNK_BUDGET_SHARE
+        return max(MIN_CHUNK_ROWS, int(chunk_bytes / (row_bytes * CHUNK_WORKING_SET_FACTOR)))
+    
+    def _aggregate_chunk(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Partial customer aggregates of one chunk, after the same cleaning as transform."""
+        df_clean = self._clean_rows(chunk)
+        # Unparsable times stay missing, as in engineer_customer_features
+        hours = df_clean['Hour'] if 'Hour' in df_clean.columns else None
+        return aggregate_values(df_clean[self.config['phone_column']], df_clean[self.config['amount_column']],
+                                df_clean[self.config['date_column']], hours)
+    
+    def _customer_features_chunked(self, data_path: Union[str, Path]) -> pd.DataFrame:
+        """
+        Customer features of a CSV streamed in chunks sized from the memory budget.
+        
+        Each chunk is cleaned and reduced to mergeable per-customer aggregates (see
+        src.features.feature_state); buffered partials are combined whenever they
+        outgrow their share of the budget, and the features are derived once at the
+        end. Sums are kept exactly, so the output is identical to
+        engineer_customer_features whatever the chunk size.
+        
+        Memory stays within the budget plus the merged aggregates and the output, which
+        grow with the number of customers (a few hundred bytes each), not with rows.
+        """
+        chunk_rows = self._chunk_rows(data_path)
+        buffer_bytes = (
+            self.config['memory_budget_mb'] * 2**20 * (1 - CHUNK_BUDGET_SHARE) / COMBINE_WORKING_SET_FACTOR
+        )
+        # Partials merged so far, plus those buffered since the last merge
+        merged: List[pd.DataFrame] = []
+        partials: List[pd.DataFrame] = []
+        buffered = 0
+        rows = chunks = 0
+        has_time = False
+        for chunk in self._read_chunks(data_path, chunk_rows):
+            if chunks == 0:
+                self.validate_data(chunk)
+                has_time = self.config['time_column'] in chunk.columns
+            rows += len(chunk)
+            chunks += 1
+            partial = self._aggregate_chunk(chunk)
+            del chunk
+            partials.append(partial)
+            buffered += partial.memory_usage(deep=True).sum()
+            if buffered > buffer_bytes:
+                merged = [combine_aggregates(merged + partials)]
+                partials = []
+                buffered = 0
+        partials = [p for p in merged + partials if len(p) > 0]
+        if not partials:
+            raise ValueError(f"No valid transactions in {data_path}")
+        
+        aggregates = combine_aggregates(partials).sort_index()
+        print(f"Streamed {rows} transactions in {chunks} chunk(s) of {chunk_rows} rows "
+              f"(budget {self.config['memory_budget_mb']:g} MB): {len(aggregates)} customers")
+        return self._features_from_aggregates(aggregates, has_time)
+    
+    def _features_from_aggregates(self, agg: pd.DataFrame, has_time: bool) -> pd.DataFrame:
+        """Customer features from (merged) aggregates, see src.features.feature_state."""
+        statistics = aggregate_statistics(agg)
+        n = agg['txn_count']
+        customer_features = pd.DataFrame({
+            'txn_count': n,
+            'net_amount': statistics['amount_sum'],
+            'avg_amount': statistics['amount_mean'],
+            'amount_std': np.sqrt(statistics['amount_m2'] / (n - 1)).where(n > 1).fillna(0),
+            'amount_min': agg['amount_min'],
+            'amount_max': agg['amount_max'],
+            'total_deposits': agg['total_deposits'],
+            'total_withdrawals': agg['total_withdrawals'],
+            'avg_abs_amount': statistics['amount_abs_sum'] / n,
+            'total_abs_amount': statistics['amount_abs_sum'],
+        }, index=agg.index.rename(self.config['phone_column']))
+        customer_features['dwr'] = (
+            customer_features['total_deposits'] / 
+            (customer_features['total_withdrawals'] + 1e-6)
+        )
+        if has_time:
+            hour_n = agg['hour_count']
+            customer_features['hour_mean'] = statistics['hour_mean'].to_numpy()
+            customer_features['hour_std'] = (
+                np.sqrt(statistics['hour_m2'] / (hour_n - 1)).where(hour_n > 1).fillna(0).to_numpy()
+            )
+        else:
+            customer_features['hour_mean'] = 12.0
+            customer_features['hour_std'] = 0.0
+        customer_features['customer_duration_days'] = (
+            (agg['last_date'] - agg['first_date']).dt.days.to_numpy()
+        )
+        customer_features['txn_frequency'] = (
+            customer_features['txn_count'] / 
+            (customer_features['customer_duration_days'] + 1)
+        )
+        return customer_features
+    
+    def _store_table(self) -> str:
+        """Feature store table name; the configuration changes the output, so it is part of the key."""
+        output_config = {k: v for k, v in self.config.items() if k not in _RUNTIME_CONFIG_KEYS}
+        config_hash = hashlib.sha256(
+            json.dumps(output_config, sort_keys=True, default=str).encode()
+        ).hexdigest()[:12]
+        return f"pipeline_customer_features_{config_hash}"
+    
     def fit_transform(self, data_path: Union[str, Path], 
-                     feature_list: Optional[List[str]] = None) -> pd.DataFrame:
+                     feature_list: Optional[List[str]] = None,
+                     chunked: bool = False) -> pd.DataFrame:
         """
         Load data and apply complete feature engineering pipeline.
         
         Args:
             data_path: Path to the CSV file
             feature_list: Optional list of features to extract
+            chunked: Stream the file in chunks sized from config['memory_budget_mb']
+                instead of loading it whole, for files larger than memory
             
         Returns:
             DataFrame with engineered features
         """
-        df = self.load_data(data_path)
-        return self.transform(df, feature_list)
+        if chunked:
+            compute = self._customer_features_chunked
+        else:
+            compute = lambda path: self._customer_features(self.load_data(path))
+        
+        if self.feature_store is None:
+            if not chunked:
+                return self.transform(self.load_data(data_path), feature_list)
+            df_final = self.select_features(compute(data_path), feature_list)
+            print(f"Feature engineering complete: {df_final.shape}")
+            return df_final
+        
+        df_customer = self.feature_store.get_or_compute(self._store_table(), data_path, compute)
+        df_final = self.select_features(df_customer, feature_list)
+        print(f"Feature engineering complete: {df_final.shape} (feature store {self.feature_store.stats()})")
+        return df_final
 
 
 def main():
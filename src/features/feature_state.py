@@ -0,0 +1,532 @@
+"""
+Customer Feature State Module
+Mergeable per-customer aggregates so customer features can be updated incrementally
+as new transactions arrive instead of being recomputed from the full history.
+
+Sums are kept exactly, so aggregates do not depend on how transactions are split
+into batches or in which order batches are merged: features derived from merged
+partial aggregates are bit for bit those of a single pass over all transactions.
+"""
+
+import io
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.features.ingest import parse_dates, parse_hours
+
+# Bump when the stored aggregate layout changes
+STATE_FORMAT_VERSION = 3
+
+# Each value is cut into pieces on fixed power-of-two grids SUM_PART_BITS apart. A
+# piece is a small integer multiple of its grid, so pieces add in float64 without
+# rounding, in any order, for up to 2**27 rows per customer. Bits below the finest
+# grid are rounded off per row, the same way however rows are batched.
+SUM_PART_BITS = 26
+# Values below 2**52, down to 2**-78
+VALUE_GRIDS = 2.0 ** np.arange(26, -79, -SUM_PART_BITS)
+# Squares of values below 2**39, down to 2**-130 so that squares of amounts in
+# cents are exact and a constant amount has a variance of exactly zero
+SQUARE_GRIDS = 2.0 ** np.arange(52, -131, -SUM_PART_BITS)
+# Dekker's splitter for float64: 2**27 + 1
+_SPLITTER = 134217729.0
+# Rows reduced at a time; exact sums add up alike in any order, so blocking only
+# bounds the row-length temporaries
+AGGREGATE_BLOCK_ROWS = 65_536
+
+
+def _parts(name: str, grids: np.ndarray) -> List[str]:
+    return [f'{name}_{i}' for i in range(len(grids))]
+
+
+EXACT_SUMS = {
+    'amount_sum': VALUE_GRIDS,
+    'amount_abs_sum': VALUE_GRIDS,
+    'amount_sq_sum': SQUARE_GRIDS,
+    'hour_sum': VALUE_GRIDS,
+    'hour_sq_sum': SQUARE_GRIDS,
+}
+SUM_COLUMNS = [col for name, grids in EXACT_SUMS.items() for col in _parts(name, grids)]
+INTEGER_COLUMNS = ['txn_count', 'total_deposits', 'total_withdrawals', 'hour_count']
+# Columns merged by addition
+COUNT_COLUMNS = INTEGER_COLUMNS + SUM_COLUMNS
+AGGREGATE_COLUMNS = COUNT_COLUMNS + ['amount_min', 'amount_max', 'first_date', 'last_date']
+
+# Columns that identify a transaction when an overlapping statement repeats it
+# (with the customer key)
+IDENTITY_COLUMNS = ['Date', 'Time', 'Transaction Type', 'Amount']
+
+
+def _two_sum(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Knuth's sum: a + b == total + error exactly
+    total = a + b
+    back = total - a
+    return total, (a - (total - back)) + (b - back)
+
+
+def _split_halves(a: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Dekker's split: a == high + low, each half fitting in 26 bits
+    scaled = a * _SPLITTER
+    high = scaled - (scaled - a)
+    return high, a - high
+
+
+def _two_product(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Dekker's product: a * b == product + error exactly
+    product = a * b
+    a_high, a_low = _split_halves(a)
+    b_high, b_low = (a_high, a_low) if b is a else _split_halves(b)
+    error = ((a_high * b_high - product) + a_high * b_low + a_low * b_high) + a_low * b_low
+    return product, error
+
+
+def _pieces(values: np.ndarray, grids: np.ndarray) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Pieces of values on each grid, coarsest first, as (grid index, piece); they add
+    up to values rounded to the finest grid. Pieces that are all zero are skipped.
+    """
+    rest = values
+    for i, grid in enumerate(grids):
+        largest = np.abs(rest).max(initial=0.0)
+        if largest == 0.0:
+            return
+        if largest < grid / 2:
+            continue
+        piece = np.rint(rest * (1.0 / grid))
+        piece *= grid
+        yield i, piece
+        rest = rest - piece
+
+
+def _exact_total(aggregates: pd.DataFrame, name: str) -> Tuple[np.ndarray, np.ndarray]:
+    """An exact sum as high and low float64 parts, high being the sum rounded to float64."""
+    high = np.zeros(len(aggregates))
+    low = np.zeros(len(aggregates))
+    # Finest pieces first; the rounding error of every addition is carried in low
+    for col in reversed(_parts(name, EXACT_SUMS[name])):
+        high, error = _two_sum(high, aggregates[col].to_numpy(dtype=np.float64))
+        low += error
+    return _two_sum(high, low)
+
+
+def _moments(aggregates: pd.DataFrame, count_col: str, sum_name: str,
+             sq_name: str) -> Tuple[np.ndarray, np.ndarray]:
+    # Mean and sum of squared deviations, M2 = (n sum(x**2) - sum(x)**2) / n. The
+    # products of the exact pieces are split error free and added coarsest first,
+    # so the large terms cancel exactly instead of cancelling digits
+    n = aggregates[count_col].to_numpy(dtype=np.float64)
+    safe_n = np.where(n > 0, n, 1.0)
+    sums = [aggregates[col].to_numpy(dtype=np.float64) for col in _parts(sum_name, EXACT_SUMS[sum_name])]
+    squares = [aggregates[col].to_numpy(dtype=np.float64) for col in _parts(sq_name, EXACT_SUMS[sq_name])]
+    total = np.zeros(len(aggregates))
+    error = np.zeros(len(aggregates))
+    # Piece i of a sum times piece j is on the grid of piece i + j of a sum of squares
+    for level in range(max(len(squares), 2 * len(sums) - 1)):
+        terms = list(_two_product(n, squares[level])) if level < len(squares) else []
+        for i in range(max(0, level - len(sums) + 1), min(level, len(sums) - 1) + 1):
+            terms.extend(-term for term in _two_product(sums[i], sums[level - i]))
+        for term in terms:
+            total, term_error = _two_sum(total, term)
+            error += term_error
+    m2 = (total + error) / safe_n
+
+    s_high, s_low = _exact_total(aggregates, sum_name)
+    mean = s_high / safe_n
+    product, product_error = _two_product(safe_n, mean)
+    # sum(x) / n == mean + residual / n
+    mean = mean + (((s_high - product) - product_error) + s_low) / safe_n
+    return np.where(n > 0, mean, np.nan), np.maximum(np.where(n > 0, m2, 0.0), 0.0)
+
+
+def aggregate_statistics(aggregates: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sums and moments of aggregate frames, in float64.
+
+    Args:
+        aggregates: Frame from aggregate_transactions, merge_aggregates or combine_aggregates
+
+    Returns:
+        DataFrame with the same index and amount_sum, amount_abs_sum, amount_mean,
+        amount_m2, hour_mean and hour_m2 (M2 being the sum of squared deviations)
+    """
+    statistics = pd.DataFrame({
+        'amount_sum': _exact_total(aggregates, 'amount_sum')[0],
+        'amount_abs_sum': _exact_total(aggregates, 'amount_abs_sum')[0],
+    }, index=aggregates.index)
+    statistics['amount_mean'], statistics['amount_m2'] = _moments(
+        aggregates, 'txn_count', 'amount_sum', 'amount_sq_sum'
+    )
+    statistics['hour_mean'], statistics['hour_m2'] = _moments(
+        aggregates, 'hour_count', 'hour_sum', 'hour_sq_sum'
+    )
+    return statistics
+
+
+def _accumulate_sums(sums: Dict[str, np.ndarray], codes: np.ndarray,
+                     amount: np.ndarray, hours: np.ndarray) -> None:
+    """Add a block of rows to the exact sums; missing values add nothing."""
+    size = len(sums['amount_sum_0'])
+    amount = np.nan_to_num(amount)
+    hours = np.nan_to_num(hours)
+    for name, values in (('amount_sum', amount), ('amount_abs_sum', np.abs(amount)), ('hour_sum', hours)):
+        columns = _parts(name, VALUE_GRIDS)
+        for i, piece in _pieces(values, VALUE_GRIDS):
+            sums[columns[i]] += np.bincount(codes, weights=piece, minlength=size)
+    for name, values in (('amount_sq_sum', amount), ('hour_sq_sum', hours)):
+        columns = _parts(name, SQUARE_GRIDS)
+        # Both halves of an exact square go to the same grids, where they add exactly
+        for half in _two_product(values, values):
+            for i, piece in _pieces(half, SQUARE_GRIDS):
+                sums[columns[i]] += np.bincount(codes, weights=piece, minlength=size)
+
+
+def aggregate_values(keys: pd.Series, amount: pd.Series, dates: pd.Series,
+                     hours: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Per-customer partial aggregates of parsed transaction columns.
+
+    Args:
+        keys: Customer key per transaction
+        amount: Amount per transaction (float); missing amounts are not counted
+        dates: Transaction dates (datetime64)
+        hours: Optional hour of day per transaction; missing hours are skipped by
+            the hour moments
+
+    Returns:
+        DataFrame indexed by Phone Number, in order of first appearance
+    """
+    codes, keys = pd.factorize(keys)
+    amount = amount.to_numpy(dtype=np.float64, na_value=np.nan)
+    if hours is None:
+        hours = np.full(len(amount), np.nan)
+    else:
+        hours = hours.to_numpy(dtype=np.float64, na_value=np.nan)
+    dates = dates.to_numpy(dtype='datetime64[ns]')
+    if (codes < 0).any():
+        keep = codes >= 0
+        codes, amount, hours, dates = codes[keep], amount[keep], hours[keep], dates[keep]
+    size = len(keys)
+
+    columns = {
+        'txn_count': np.bincount(codes[~np.isnan(amount)], minlength=size),
+        'total_deposits': np.bincount(codes[amount > 0], minlength=size),
+        'total_withdrawals': np.bincount(codes[amount < 0], minlength=size),
+        'hour_count': np.bincount(codes[~np.isnan(hours)], minlength=size),
+    }
+    sums = {col: np.zeros(size) for col in SUM_COLUMNS}
+    for start in range(0, len(codes), AGGREGATE_BLOCK_ROWS):
+        block = slice(start, start + AGGREGATE_BLOCK_ROWS)
+        _accumulate_sums(sums, codes[block], amount[block], hours[block])
+    columns.update(sums)
+
+    grouped = pd.DataFrame({'amount': amount, 'date': dates}).groupby(codes)
+    columns['amount_min'] = grouped['amount'].min().to_numpy()
+    columns['amount_max'] = grouped['amount'].max().to_numpy()
+    columns['first_date'] = grouped['date'].min().to_numpy()
+    columns['last_date'] = grouped['date'].max().to_numpy()
+    if isinstance(keys, pd.CategoricalIndex):
+        # Categorical keys (see ingest.customer_keys) differ per chunk; plain labels merge
+        keys = pd.Index(np.asarray(keys))
+    return pd.DataFrame(columns, index=keys.rename('Phone Number'))[AGGREGATE_COLUMNS]
+
+
+def aggregate_transactions(chunk: pd.DataFrame, fill_missing_hour: Optional[float] = 12.0) -> pd.DataFrame:
+    """
+    Compute per-customer partial aggregates for a batch of raw transactions.
+
+    Args:
+        chunk: DataFrame with Phone Number, Amount, Date and optionally Time columns
+            (canonical columns, see src.features.ingest)
+        fill_missing_hour: Hour used when Time is absent or unparsable; None leaves it
+            missing so it is skipped by the hour moments
+
+    Returns:
+        DataFrame indexed by Phone Number, in order of first appearance
+    """
+    amount = pd.to_numeric(chunk['Amount'])
+    if 'Time' in chunk.columns:
+        hour = parse_hours(chunk['Time'])
+    else:
+        hour = pd.Series(np.nan, index=chunk.index)
+    if fill_missing_hour is not None:
+        hour = hour.fillna(fill_missing_hour)
+    return aggregate_values(chunk['Phone Number'], amount, parse_dates(chunk['Date']), hour)
+
+
+def merge_aggregates(left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
+    """
+    Merge two partial aggregate frames. Customers keep the order in which they were
+    first seen.
+    """
+    index = left.index.union(right.index, sort=False)
+    a = left.reindex(index)
+    b = right.reindex(index)
+
+    merged = a[COUNT_COLUMNS].fillna(0).add(b[COUNT_COLUMNS].fillna(0))
+    merged['amount_min'] = pd.concat([a['amount_min'], b['amount_min']], axis=1).min(axis=1)
+    merged['amount_max'] = pd.concat([a['amount_max'], b['amount_max']], axis=1).max(axis=1)
+    merged['first_date'] = pd.concat([a['first_date'], b['first_date']], axis=1).min(axis=1)
+    merged['last_date'] = pd.concat([a['last_date'], b['last_date']], axis=1).max(axis=1)
+    # Reindexing introduces NaN, which turns the integer counters into floats
+    merged[INTEGER_COLUMNS] = merged[INTEGER_COLUMNS].astype(np.int64)
+    return merged[AGGREGATE_COLUMNS]
+
+
+def combine_aggregates(partials: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Merge any number of partial aggregate frames in one grouped pass. Equivalent to
+    folding them with merge_aggregates, without rebuilding the merged frame per part.
+    Customers keep the order in which they were first seen.
+    """
+    if len(partials) == 1:
+        return partials[0]
+    frame = pd.concat(partials)
+    # Keys are hashed once; every column is then reduced over the integer codes
+    codes, keys = pd.factorize(frame.index)
+    grouped = frame.groupby(codes, sort=False)
+    combined = grouped[COUNT_COLUMNS].sum()
+    combined['amount_min'] = grouped['amount_min'].min()
+    combined['amount_max'] = grouped['amount_max'].max()
+    combined['first_date'] = grouped['first_date'].min()
+    combined['last_date'] = grouped['last_date'].max()
+    combined = combined.sort_index()
+    combined.index = pd.Index(keys, name=frame.index.name)
+    combined[INTEGER_COLUMNS] = combined[INTEGER_COLUMNS].astype(np.int64)
+    return combined[AGGREGATE_COLUMNS]
+
+
+def transaction_identities(transactions: pd.DataFrame) -> np.ndarray:
+    """
+    64-bit hash per row of the customer key and the identity columns present. Values
+    are hashed by their text, so the same transaction hashes alike whether its
+    columns are categorical, string or object.
+    """
+    columns = ['Phone Number'] + [col for col in IDENTITY_COLUMNS if col in transactions.columns]
+    frame = pd.DataFrame({col: np.asarray(transactions[col], dtype=object) for col in columns})
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def _empty_boundary() -> pd.DataFrame:
+    return pd.DataFrame({
+        'Phone Number': pd.Series(dtype=object),
+        'date': pd.Series(dtype='datetime64[ns]'),
+        'identity': pd.Series(dtype=np.uint64),
+    })
+
+
+def _on_last_date(keys: pd.Series, dates: pd.Series, aggregates: pd.DataFrame) -> np.ndarray:
+    # Categorical keys map once per category rather than per row
+    last_seen = keys.map(aggregates['last_date']).to_numpy(dtype='datetime64[ns]')
+    return dates.to_numpy(dtype='datetime64[ns]') == last_seen
+
+
+class CustomerFeatureState:
+    """
+    Mergeable per-customer aggregate state.
+
+    Holds, for every customer, transaction counts, exact sums of amounts, absolute
+    amounts and squared amounts (for the mean and variance), min/max, deposit and
+    withdrawal counts, first and last transaction dates, and hour-of-day sums. Updates cost O(new rows), states built on separate
+    partitions can be merged, and the state serializes to a compact byte string.
+
+    Alongside the aggregates it keeps the identities of each customer's transactions
+    on their last date (the boundary), so an overlapping statement can be folded in
+    without double counting the days both statements cover.
+    """
+
+    def __init__(self, aggregates: Optional[pd.DataFrame] = None,
+                 fill_missing_hour: Optional[float] = 12.0,
+                 boundary: Optional[pd.DataFrame] = None):
+        """
+        Initialize the state.
+
+        Args:
+            aggregates: Optional existing aggregate frame (see aggregate_transactions)
+            fill_missing_hour: Hour used for rows without a parsable Time, or None to
+                skip them in the hour moments
+            boundary: Identities of the transactions on each customer's last date
+                (Phone Number, date, identity). Unknown for aggregates passed without
+                it; update(skip_seen=True) then drops whole boundary days
+        """
+        if aggregates is None:
+            aggregates = pd.DataFrame(columns=AGGREGATE_COLUMNS)
+            boundary = _empty_boundary() if boundary is None else boundary
+        self.aggregates = aggregates
+        self.fill_missing_hour = fill_missing_hour
+        self.boundary = boundary
+
+    def __len__(self) -> int:
+        return len(self.aggregates)
+
+    @classmethod
+    def from_transactions(cls, transactions: pd.DataFrame,
+                          fill_missing_hour: Optional[float] = 12.0) -> 'CustomerFeatureState':
+        """Build a state from a batch of raw transactions."""
+        return cls(fill_missing_hour=fill_missing_hour).update(transactions)
+
+    def update(self, transactions: pd.DataFrame, skip_seen: bool = False) -> 'CustomerFeatureState':
+        """
+        Fold new transactions into the state in place.
+
+        Args:
+            transactions: Raw transactions with Phone Number, Amount, Date and Time
+            skip_seen: Drop rows already in the state, so overlapping statements are
+                not double counted: rows dated before the customer's last known
+                transaction date, and rows on that date whose identity (date, time,
+                type, amount) the state already holds. Repeated identical
+                transactions are matched copy for copy
+
+        Returns:
+            self, to allow chaining
+        """
+        if len(transactions) == 0:
+            return self
+        transactions = transactions.assign(Date=parse_dates(transactions['Date']))
+        if skip_seen and len(self.aggregates) > 0:
+            transactions = self._drop_seen(transactions)
+            if len(transactions) == 0:
+                return self
+
+        partial = aggregate_transactions(transactions, self.fill_missing_hour)
+        if len(self.aggregates) == 0:
+            self.aggregates = partial
+        else:
+            self.aggregates = merge_aggregates(self.aggregates, partial)
+        if self.boundary is not None:
+            self.boundary = self._advance_boundary([self.boundary, self._boundary_rows(transactions)])
+        return self
+
+    def _drop_seen(self, transactions: pd.DataFrame) -> pd.DataFrame:
+        last_seen = transactions['Phone Number'].map(self.aggregates['last_date']).to_numpy(dtype='datetime64[ns]')
+        dates = transactions['Date'].to_numpy(dtype='datetime64[ns]')
+        keep = np.isnat(last_seen) | (dates > last_seen)
+        on_boundary = np.flatnonzero(dates == last_seen)
+        if len(on_boundary) and self.boundary is not None:
+            identity = pd.Series(transaction_identities(transactions.iloc[on_boundary]))
+            # The k-th copy of a transaction is new when the state holds fewer than k
+            occurrence = identity.groupby(identity).cumcount().to_numpy()
+            held = identity.map(self.boundary['identity'].value_counts()).fillna(0).to_numpy()
+            keep[on_boundary] = occurrence >= held
+        return transactions[keep]
+
+    def _boundary_rows(self, transactions: pd.DataFrame) -> pd.DataFrame:
+        # Only rows on their customer's (new) last date are hashed
+        candidates = transactions[_on_last_date(transactions['Phone Number'], transactions['Date'],
+                                                self.aggregates)]
+        return pd.DataFrame({
+            'Phone Number': np.asarray(candidates['Phone Number'], dtype=object),
+            'date': candidates['Date'].to_numpy(dtype='datetime64[ns]'),
+            'identity': transaction_identities(candidates),
+        })
+
+    def _advance_boundary(self, parts: List[pd.DataFrame]) -> pd.DataFrame:
+        """Boundary rows still on their customer's last date after an update or merge."""
+        boundary = pd.concat([part for part in parts if len(part)] or [_empty_boundary()],
+                             ignore_index=True)
+        current = _on_last_date(boundary['Phone Number'], boundary['date'], self.aggregates)
+        return boundary[current].reset_index(drop=True)
+
+    def merge(self, other: 'CustomerFeatureState') -> 'CustomerFeatureState':
+        """Merge another state (e.g. from a different partition) into this one in place."""
+        if len(other.aggregates) == 0:
+            return self
+        if len(self.aggregates) == 0:
+            self.aggregates = other.aggregates.copy()
+            self.boundary = None if other.boundary is None else other.boundary.copy()
+            return self
+        self.aggregates = merge_aggregates(self.aggregates, other.aggregates)
+        if self.boundary is None or other.boundary is None:
+            self.boundary = None
+        else:
+            self.boundary = self._advance_boundary([self.boundary, other.boundary])
+        return self
+
+    def to_features(self) -> pd.DataFrame:
+        """
+        Derive the customer features produced by engineer_features.
+
+        Returns:
+            DataFrame with one row per customer and a Phone Number column
+        """
+        agg = self.aggregates
+        statistics = aggregate_statistics(agg)
+        n = agg['txn_count'].astype(np.int64)
+        hour_n = agg['hour_count']
+        features = pd.DataFrame({
+            'txn_count': n,
+            'net_amount': statistics['amount_sum'],
+            'avg_amount': statistics['amount_mean'],
+            # Sample std, undefined for a single transaction (matches pandas' std)
+            'amount_std': np.sqrt(statistics['amount_m2'] / (n - 1)).where(n > 1),
+            'total_deposits': agg['total_deposits'].astype(np.int64),
+            'total_withdrawals': agg['total_withdrawals'].astype(np.int64),
+        }, index=agg.index)
+        features['dwr'] = (
+            features['total_deposits'] /
+            (features['total_withdrawals'] + 1e-6)
+        )
+        features['customer_duration_days'] = (agg['last_date'] - agg['first_date']).dt.days
+        features['hour_mean'] = statistics['hour_mean']
+        features['hour_std'] = (
+            np.sqrt(statistics['hour_m2'] / (hour_n - 1)).where(hour_n > 1).fillna(0.0)
+        )
+        return features.rename_axis('Phone Number').reset_index()
+
+    def to_bytes(self) -> bytes:
+        """Serialize the state as a compressed NumPy archive of its columns."""
+        agg = self.aggregates
+        keys = agg.index.to_numpy()
+        if keys.dtype == object:
+            keys = keys.astype(str)
+        arrays = {
+            'format_version': np.array(STATE_FORMAT_VERSION),
+            'fill_missing_hour': np.array(
+                np.nan if self.fill_missing_hour is None else self.fill_missing_hour
+            ),
+            'keys': keys,
+        }
+        for col in AGGREGATE_COLUMNS:
+            if col in ('first_date', 'last_date'):
+                arrays[col] = agg[col].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+            elif col in INTEGER_COLUMNS:
+                arrays[col] = agg[col].to_numpy(dtype=np.int64)
+            else:
+                arrays[col] = agg[col].to_numpy(dtype=np.float64)
+        if self.boundary is not None:
+            boundary_keys = self.boundary['Phone Number'].to_numpy()
+            arrays['boundary_keys'] = boundary_keys.astype(str) if boundary_keys.dtype == object else boundary_keys
+            arrays['boundary_dates'] = self.boundary['date'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+            arrays['boundary_identities'] = self.boundary['identity'].to_numpy(dtype=np.uint64)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> 'CustomerFeatureState':
+        """Restore a state serialized with to_bytes."""
+        with np.load(io.BytesIO(payload), allow_pickle=False) as data:
+            version = int(data['format_version'])
+            if version != STATE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported feature state format version: {version}")
+            fill_missing_hour = float(data['fill_missing_hour'])
+            columns = {}
+            for col in AGGREGATE_COLUMNS:
+                values = data[col]
+                if col in ('first_date', 'last_date'):
+                    values = values.astype('datetime64[ns]')
+                columns[col] = values
+            index = pd.Index(data['keys'], name='Phone Number')
+            boundary = None
+            if 'boundary_identities' in data:
+                boundary = pd.DataFrame({
+                    'Phone Number': data['boundary_keys'].astype(object),
+                    'date': data['boundary_dates'].astype('datetime64[ns]'),
+                    'identity': data['boundary_identities'],
+                })
+        aggregates = pd.DataFrame(columns, index=index)
+        return cls(
+            aggregates,
+            fill_missing_hour=None if np.isnan(fill_missing_hour) else fill_missing_hour,
+            boundary=boundary
+        )
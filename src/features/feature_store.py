@@ -0,0 +1,213 @@
+"""
+Feature Store Module
+Persists engineered per-customer tables for training and evaluation runs, one
+partition per source file, keyed by the file's content hash and the version of the
+feature code. Unchanged inputs are read back instead of being re-parsed and
+re-engineered; a partition is recomputed only when its file or the feature code
+changes.
+
+Partitions are Parquet files when a Parquet engine (pyarrow) is installed, and
+compressed NumPy column archives otherwise.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.features.feature_state import CustomerFeatureState, merge_aggregates
+from src.features.ingest import read_transactions
+from src.inference.flat_forest import file_fingerprint
+
+FEATURE_STORE_DIR = os.getenv("FEATURE_STORE_DIR", "data/features")
+
+# Rows read at a time when a source file is aggregated
+READ_CHUNK_ROWS = 100_000
+
+_INDEX_COLUMN = '__index__'
+
+
+@lru_cache(maxsize=1)
+def feature_code_version() -> str:
+    """
+    Short hash of the feature engineering source files. Any change to them starts a
+    new store version, so stale features are never read back.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(Path(__file__).parent.glob('*.py')):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+@lru_cache(maxsize=1)
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _write_npz(frame: pd.DataFrame, path: Path) -> None:
+    arrays = {}
+    for name, column in [(_INDEX_COLUMN, frame.index.to_series())] + list(frame.items()):
+        values = column.to_numpy()
+        # Object columns (string keys) are stored as fixed-width unicode so the
+        # archive loads without pickle
+        arrays[name] = values.astype(str) if values.dtype == object else values
+    meta = {'columns': list(frame.columns), 'index_name': frame.index.name}
+    arrays['__meta__'] = np.array(json.dumps(meta))
+    with open(path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+
+
+def _read_npz(path: Path) -> pd.DataFrame:
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data['__meta__']))
+        index = pd.Index(data[_INDEX_COLUMN], name=meta['index_name'])
+        return pd.DataFrame({name: data[name] for name in meta['columns']}, index=index)
+
+
+class FeatureStore:
+    """
+    Content-addressed cache of per-file feature tables.
+
+    Layout: <root>/<table>/<feature code version>/<source sha256>.<parquet|npz>
+    """
+
+    def __init__(self, root: Union[str, Path] = FEATURE_STORE_DIR, version: Optional[str] = None):
+        """
+        Initialize the store.
+
+        Args:
+            root: Store directory
+            version: Feature code version; defaults to a hash of src/features
+        """
+        self.root = Path(root)
+        self.version = version or feature_code_version()
+        self.suffix = '.parquet' if parquet_available() else '.npz'
+        self.hits = 0
+        self.misses = 0
+
+    def partition_path(self, table: str, content_hash: str) -> Path:
+        return self.root / table / self.version / f"{content_hash}{self.suffix}"
+
+    def read(self, path: Path) -> pd.DataFrame:
+        if path.suffix == '.parquet':
+            return pd.read_parquet(path)
+        return _read_npz(path)
+
+    def write(self, frame: pd.DataFrame, path: Path) -> None:
+        """Write a partition atomically, so a crashed run never leaves a partial file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        if path.suffix == '.parquet':
+            frame.to_parquet(tmp)
+        else:
+            _write_npz(frame, tmp)
+        os.replace(tmp, path)
+
+    def get_or_compute(self, table: str, source: Union[str, Path],
+                       compute: Callable[[Path], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Return the stored table for a source file, computing and storing it on a miss.
+
+        Args:
+            table: Table name (one namespace per kind of derived table)
+            source: Source data file
+            compute: Builds the table from the source path
+
+        Returns:
+            DataFrame
+        """
+        source = Path(source)
+        path = self.partition_path(table, file_fingerprint(source))
+        if path.exists():
+            try:
+                frame = self.read(path)
+                self.hits += 1
+                return frame
+            except Exception as e:
+                print(f"Warning: recomputing unreadable feature partition {path}: {str(e)}")
+        self.misses += 1
+        frame = compute(source)
+        self.write(frame, path)
+        return frame
+
+    def prune(self) -> int:
+        """Delete partitions written by other feature code versions; returns the count."""
+        removed = 0
+        if not self.root.is_dir():
+            return removed
+        for table in self.root.iterdir():
+            if not table.is_dir():
+                continue
+            for version in table.iterdir():
+                if version.is_dir() and version.name != self.version:
+                    for partition in version.iterdir():
+                        partition.unlink()
+                        removed += 1
+                    version.rmdir()
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+def aggregate_file(path: Union[str, Path]) -> pd.DataFrame:
+    """Per-customer partial aggregates of one transaction CSV in any known layout."""
+    state = CustomerFeatureState()
+    for chunk in read_transactions(path, chunksize=READ_CHUNK_ROWS):
+        state.update(chunk)
+    return state.aggregates
+
+
+def build_customer_features(data_paths: Iterable[Union[str, Path]],
+                            store: Optional[FeatureStore] = None) -> pd.DataFrame:
+    """
+    Customer features over one or more transaction files.
+
+    Each file is reduced to mergeable per-customer aggregates (read from the store
+    when the file is unchanged), the aggregates are merged, so customers appearing in
+    several files are combined exactly, and the features are derived once.
+
+    Args:
+        data_paths: Transaction CSV files
+        store: Optional FeatureStore; None recomputes everything
+
+    Returns:
+        DataFrame with one row per customer and a Phone Number column, sorted by
+        Phone Number
+    """
+    start = time.perf_counter()
+    partitions: List[pd.DataFrame] = []
+    for path in data_paths:
+        if store is not None:
+            partitions.append(store.get_or_compute('customer_aggregates', path, aggregate_file))
+        else:
+            partitions.append(aggregate_file(path))
+    if not partitions:
+        raise ValueError("No data files given")
+
+    aggregates = partitions[0]
+    for partition in partitions[1:]:
+        aggregates = merge_aggregates(aggregates, partition)
+    if len(aggregates) == 0:
+        raise ValueError("No transactions to aggregate")
+
+    features = CustomerFeatureState(aggregates).to_features()
+    features = features.sort_values('Phone Number', kind='stable').reset_index(drop=True)
+    cached = f", feature store {store.stats()}" if store is not None else ""
+    print(f"Built features for {len(features)} customers from {len(partitions)} file(s) "
+          f"in {time.perf_counter() - start:.2f}s{cached}")
+    return features
@@ -0,0 +1,291 @@
+"""
+Transaction Ingestion Module
+Detects which MoMo statement layout a file uses and maps it onto the canonical
+transaction columns used by feature engineering and scoring:
+
+    Date (datetime64), Time ("HH:MM" string), Transaction Type, Phone Number, Amount
+
+Dates are parsed with explicit formats. Statements repeat the same date strings
+many times, so each distinct string is parsed once and the results are mapped back
+to the rows; parsing cost grows with the number of unique values, not rows.
+
+read_transactions reads statements with a per-layout dtype map (Arrow-backed
+parser when pyarrow is installed). Customer keys are kept as text and stored as
+categorical codes, as are low-cardinality text columns such as Transaction Type.
+"""
+
+import io
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+CANONICAL_COLUMNS = ['Date', 'Time', 'Transaction Type', 'Phone Number', 'Amount']
+
+# Known statement layouts: the columns that identify each one and how its columns
+# map onto the canonical names
+SCHEMAS: Dict[str, dict] = {
+    # dataset1.csv: Date, Time, Transaction Type, Phone Number, ...
+    'separate_date_time': {
+        'required': ['Date', 'Time', 'Transaction Type', 'Phone Number', 'Amount'],
+        'rename': {},
+        'dtypes': {
+            'Date': 'str', 'Time': 'str', 'Transaction Type': 'category',
+            'Phone Number': 'str', 'Account Name': 'str', 'Amount': 'float64',
+            'Fees': 'float64', 'Tax': 'float64', 'Balance': 'float64', 'Reference': 'category',
+        },
+    },
+    # dataset 2-4.csv: Date & Time (day first), Payment Type, To/From Account, ...
+    'combined_date_time': {
+        'required': ['Date & Time', 'Payment Type', 'To/From Account', 'Amount'],
+        'rename': {'Payment Type': 'Transaction Type', 'To/From Account': 'Phone Number'},
+        'dtypes': {
+            'Date & Time': 'str', 'Payment Type': 'category', 'To/From Account': 'str',
+            'Account Name': 'str', 'Amount': 'float64', 'Transaction ID': 'str',
+            'Fees': 'float64', 'Tax': 'float64', 'Balance': 'float64', 'Reference': 'category',
+        },
+    },
+}
+
+# Formats tried, in order, for Date columns ("17-Mar-25", ISO dates, day-first dates)
+DATE_FORMATS = ['%d-%b-%y', '%Y-%m-%d', '%d/%m/%Y', '%d-%b-%Y', '%d/%m/%y', '%d-%m-%Y']
+DATE_TIME_FORMATS = ['%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M']
+TIME_FORMAT = '%H:%M'
+
+
+def detect_schema(columns: Iterable[str]) -> Optional[str]:
+    """Name of the known layout whose required columns are all present, or None."""
+    present = set(columns)
+    for name, schema in SCHEMAS.items():
+        if all(col in present for col in schema['required']):
+            return name
+    return None
+
+
+def missing_columns(columns: Iterable[str]) -> List[str]:
+    """Columns missing from the closest known layout, for error messages."""
+    present = set(columns)
+    missing = [
+        ([col for col in schema['required'] if col not in present], len(schema['required']))
+        for schema in SCHEMAS.values()
+    ]
+    # Closest = smallest share of its columns missing; ties go to the first layout
+    return min(missing, key=lambda item: len(item[0]) / item[1])[0]
+
+
+def _take(parsed: np.ndarray, codes: np.ndarray, missing) -> np.ndarray:
+    """Map per-unique results back to rows; factorize codes missing values as -1."""
+    # -1 indexes the appended slot, so missing rows get the missing marker
+    return np.append(parsed, np.array([missing], dtype=parsed.dtype))[codes]
+
+
+def _parse_unique(uniques: pd.Index, formats: Sequence[str], errors: str) -> pd.DatetimeIndex:
+    """Parse distinct strings, trying each explicit format on what is still unparsed."""
+    parsed = pd.Series(pd.NaT, index=range(len(uniques)), dtype='datetime64[ns]')
+    remaining = np.ones(len(uniques), dtype=bool)
+    values = pd.Series(uniques.astype(str), index=parsed.index)
+    for fmt in formats:
+        if not remaining.any():
+            break
+        attempt = pd.to_datetime(values[remaining], format=fmt, errors='coerce')
+        ok = attempt.notna().to_numpy()
+        parsed[attempt.index[ok]] = attempt[ok]
+        remaining[attempt.index[ok]] = False
+    if remaining.any():
+        # Unknown formats fall back to inference on the leftover distinct values only
+        # (errors='raise' reports the first value no format can read)
+        parsed[remaining] = pd.to_datetime(values[remaining], errors=errors, dayfirst=True)
+    return pd.DatetimeIndex(parsed)
+
+
+def parse_dates(values: pd.Series, formats: Sequence[str] = DATE_FORMATS,
+                errors: str = 'raise') -> pd.Series:
+    """
+    Parse a column of date strings through its distinct values.
+
+    Args:
+        values: Strings (or already parsed datetimes, returned unchanged)
+        formats: Explicit formats, tried in order
+        errors: 'raise' for unparsable values, or 'coerce' to turn them into NaT
+
+    Returns:
+        datetime64 Series aligned with values
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    codes, uniques = pd.factorize(values)
+    parsed = _parse_unique(uniques, formats, errors)
+    return pd.Series(_take(parsed.to_numpy(), codes, np.datetime64('NaT')),
+                     index=values.index, name=values.name)
+
+
+def parse_hours(values: pd.Series) -> pd.Series:
+    """Hour of day from "HH:MM" strings, parsed once per distinct value; NaN if unparsable."""
+    codes, uniques = pd.factorize(values)
+    hours = pd.to_datetime(pd.Series(uniques.astype(str)), format=TIME_FORMAT, errors='coerce').dt.hour
+    return pd.Series(_take(hours.to_numpy(dtype=np.float64, na_value=np.nan), codes, np.nan),
+                     index=values.index, name=values.name)
+
+
+def _normalize_key(value) -> str:
+    # Spreadsheet exports write long numbers as "2.33203E+11"; read as text or as
+    # floats they name the same customer as "233203000000"
+    if isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            return value.strip()
+    else:
+        number = value
+    if isinstance(number, float) and number.is_integer():
+        return str(int(number))
+    return str(value)
+
+
+def customer_keys(values: pd.Series) -> pd.Series:
+    """
+    Customer keys as a categorical of normalized key strings: one integer code per
+    row and each distinct key stored once. Normalization runs per distinct value.
+    """
+    codes, uniques = pd.factorize(values)
+    # Sorted categories keep grouped output in key order
+    normalized_codes, labels = pd.factorize(
+        pd.Index([_normalize_key(u) for u in uniques], dtype=object), sort=True
+    )
+    row_codes = _take(normalized_codes, codes, -1)
+    return pd.Series(pd.Categorical.from_codes(row_codes, categories=labels),
+                     index=values.index, name=values.name)
+
+
+def to_canonical(df: pd.DataFrame, schema: Optional[str] = None, strict: bool = True,
+                 errors: str = 'raise') -> pd.DataFrame:
+    """
+    Map a statement in any known layout onto the canonical columns.
+
+    Columns outside the layout's mapping are kept. Date becomes datetime64; for the
+    combined layout, Time is derived from the same parse as "HH:MM". Phone Number
+    becomes a categorical of normalized key strings (see customer_keys).
+
+    Args:
+        df: Raw statement rows
+        schema: Layout name; detected from the columns when omitted
+        strict: Raise for frames matching no known layout; when False they are
+            returned as they are (e.g. already reduced to the columns features need)
+        errors: 'raise' for unparsable dates, or 'coerce' to turn them into NaT
+
+    Returns:
+        New DataFrame (the input is not modified)
+
+    Raises:
+        ValueError: If strict and the columns match no known layout, or a date is
+            unparsable and errors is 'raise'
+    """
+    schema = schema or detect_schema(df.columns)
+    if schema is None:
+        if not strict:
+            return df
+        raise ValueError(f"Missing columns: {missing_columns(df.columns)}")
+
+    out = df.rename(columns=SCHEMAS[schema]['rename'])
+    if schema == 'combined_date_time':
+        codes, uniques = pd.factorize(out.pop('Date & Time'))
+        stamps = _parse_unique(uniques, DATE_TIME_FORMATS, errors)
+        out['Date'] = _take(stamps.normalize().to_numpy(), codes, np.datetime64('NaT'))
+        out['Time'] = _take(np.asarray(stamps.strftime(TIME_FORMAT), dtype=object), codes, None)
+    else:
+        out['Date'] = parse_dates(out['Date'], errors=errors)
+    if not isinstance(out['Phone Number'].dtype, pd.CategoricalDtype):
+        out['Phone Number'] = customer_keys(out['Phone Number'])
+    return out
+
+
+@lru_cache(maxsize=1)
+def arrow_csv_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def read_header(source) -> List[str]:
+    """Column names of a CSV path or binary file object; file objects are rewound."""
+    columns = list(pd.read_csv(source, nrows=0, encoding='utf-8').columns)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return columns
+
+
+def _read_arrow(source, dtypes: Dict[str, str]) -> pd.DataFrame:
+    # pyarrow.csv applies the column types while parsing; read_csv(engine="pyarrow")
+    # would convert them afterwards, at several times the cost
+    import pyarrow as pa
+    from pyarrow import csv
+
+    types = {'str': pa.string(), 'float64': pa.float64(),
+             'category': pa.dictionary(pa.int32(), pa.string())}
+    options = csv.ConvertOptions(
+        column_types={name: types[dtype] for name, dtype in dtypes.items()},
+        # Empty fields are missing values, as with the C parser
+        strings_can_be_null=True,
+    )
+    return csv.read_csv(source, convert_options=options).to_pandas()
+
+
+def _coerce_numbers(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    for col in columns:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def _canonical_chunks(reader, schema: str, coerce: List[str], errors: str) -> Iterator[pd.DataFrame]:
+    with reader:
+        for chunk in reader:
+            yield to_canonical(_coerce_numbers(chunk, coerce), schema, errors=errors)
+
+
+def read_transactions(source, schema: Optional[str] = None, chunksize: Optional[int] = None,
+                      engine: Optional[str] = None,
+                      errors: str = 'raise') -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """
+    Read a statement CSV with typed columns and map it onto the canonical columns.
+
+    Args:
+        source: Path, raw bytes or binary file object positioned at the start
+        schema: Layout name; detected from the header when omitted
+        chunksize: Rows per chunk; when set, an iterator of canonical chunks is returned
+        engine: "pyarrow" or a read_csv engine; defaults to "pyarrow" when installed
+            for whole-file reads (the Arrow parser cannot stream chunks) and "c" otherwise
+
+    Returns:
+        Canonical DataFrame, or an iterator of them when chunksize is set
+
+    Raises:
+        ValueError: If the header matches no known layout
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    if schema is None:
+        columns = read_header(source)
+        schema = detect_schema(columns)
+        if schema is None:
+            raise ValueError(f"Missing columns: {missing_columns(columns)}")
+    if engine is None:
+        engine = 'pyarrow' if chunksize is None and arrow_csv_available() else 'c'
+
+    dtypes = dict(SCHEMAS[schema]['dtypes'])
+    coerce = []
+    if errors == 'coerce':
+        # Numbers are read as text and converted afterwards, with bad values as NaN
+        coerce = [col for col, dtype in dtypes.items() if dtype == 'float64']
+        dtypes.update({col: 'str' for col in coerce})
+    if engine == 'pyarrow' and chunksize is None:
+        return to_canonical(_coerce_numbers(_read_arrow(source, dtypes), coerce), schema, errors=errors)
+
+    # Columns absent from the file are ignored by read_csv's dtype mapping
+    options = {'dtype': dtypes, 'encoding': 'utf-8', 'engine': engine}
+    if chunksize is not None:
+        return _canonical_chunks(pd.read_csv(source, chunksize=chunksize, **options), schema, coerce, errors)
+    return to_canonical(_coerce_numbers(pd.read_csv(source, **options), coerce), schema, errors=errors)
@@ -0,0 +1,98 @@
+"""
+Model Artifact Directory Module
+Stores the flattened forest, the scaler statistics and the feature list as plain
+.npy files plus a JSON manifest, so inference workers can memory-map them and share
+one page-cache copy instead of unpickling private copies.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from src.inference.flat_forest import FlatForest
+
+# Bump when the directory layout changes
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+
+def artifact_version(model_fingerprint: str, scaler_fingerprint: str, features_fingerprint: str) -> str:
+    """Short identifier of a model/scaler/features set, shared by all loaders."""
+    return hashlib.sha256(
+        (model_fingerprint + scaler_fingerprint + features_fingerprint).encode()
+    ).hexdigest()[:12]
+
+
+def save_artifacts(directory: Union[str, Path], forest: FlatForest, scaler_mean: np.ndarray,
+                   scaler_scale: np.ndarray, features: List[str],
+                   fingerprints: Dict[str, str]) -> Path:
+    """
+    Write a memory-mappable artifact directory.
+
+    Args:
+        directory: Output directory (created if needed)
+        forest: Flattened model
+        scaler_mean: StandardScaler mean_
+        scaler_scale: StandardScaler scale_
+        features: Feature names in model order
+        fingerprints: SHA-256 of the source model, scaler and features files
+
+    Returns:
+        Path of the written directory
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    forest.save_dir(directory)
+    np.save(directory / 'scaler_mean.npy', np.asarray(scaler_mean, dtype=np.float64))
+    np.save(directory / 'scaler_scale.npy', np.asarray(scaler_scale, dtype=np.float64))
+    manifest = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'features': list(features),
+        'fingerprints': fingerprints,
+        'model_version': artifact_version(
+            fingerprints['model'], fingerprints['scaler'], fingerprints['features']
+        ),
+    }
+    # Written last, so a directory with a manifest is complete
+    (directory / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+    return directory
+
+
+def read_manifest(directory: Union[str, Path]) -> dict:
+    """Read an artifact directory's manifest without touching its arrays."""
+    manifest = json.loads((Path(directory) / MANIFEST_NAME).read_text())
+    version = manifest.get('format_version')
+    if version != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version: {version}")
+    return manifest
+
+
+def load_artifacts(directory: Union[str, Path], mmap_mode: Optional[str] = 'r') -> dict:
+    """
+    Load an artifact directory written by save_artifacts.
+
+    Args:
+        directory: Artifact directory
+        mmap_mode: np.load memory-map mode; None reads the arrays into private memory
+
+    Returns:
+        dict with forest, scaler_mean, scaler_scale, features, fingerprints and
+        model_version
+    """
+    directory = Path(directory)
+    manifest = read_manifest(directory)
+    return {
+        'forest': FlatForest.load_dir(directory, mmap_mode=mmap_mode),
+        'scaler_mean': np.load(directory / 'scaler_mean.npy', mmap_mode=mmap_mode),
+        'scaler_scale': np.load(directory / 'scaler_scale.npy', mmap_mode=mmap_mode),
+        'features': manifest['features'],
+        'fingerprints': manifest['fingerprints'],
+        'model_version': manifest['model_version'],
+    }
+
+
+def has_artifacts(directory: Union[str, Path, None]) -> bool:
+    return directory is not None and (Path(directory) / MANIFEST_NAME).exists()
@@ -0,0 +1,286 @@
+"""
+Flat Forest Module
+Compiles a fitted scikit-learn random forest into contiguous NumPy arrays and
+evaluates it with vectorized traversal, avoiding sklearn's per-call validation and
+per-estimator dispatch.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+# Feature index stored for leaf nodes (matches sklearn's TREE_UNDEFINED)
+LEAF = -2
+
+# Rows traversed together; keeps the (trees x rows) node arrays cache-sized
+ROW_BLOCK = 256
+
+# Arrays written by save_dir. Index arrays are stored at native width so a
+# memory-mapped load needs no private conversion copies.
+NODE_ARRAYS = ('feature', 'threshold', 'left', 'right', 'missing_left', 'value', 'roots', 'split_feature')
+
+
+def file_fingerprint(path: Union[str, Path]) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FlatForest:
+    """
+    A random forest classifier flattened into node arrays.
+
+    All trees are concatenated into one set of arrays (feature, threshold, left and
+    right children, missing-value direction and positive-class probability). Leaves
+    point to themselves, so every row can be advanced one level per step for a fixed
+    number of steps without branching.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, missing_left: np.ndarray, value: np.ndarray,
+                 roots: np.ndarray, max_depth: int, n_features: int,
+                 source_fingerprint: Optional[str] = None,
+                 split_feature: Optional[np.ndarray] = None):
+        """
+        Initialize from already-flattened arrays (see from_sklearn and load).
+
+        Args:
+            feature: Split feature per node, LEAF for leaves
+            threshold: Split threshold per node; float32 thresholds are pre-rounded
+                down so comparisons stay exact
+            left: Absolute index of the left child (self for leaves)
+            right: Absolute index of the right child (self for leaves)
+            missing_left: Whether missing values go to the left child
+            value: Positive-class probability per node
+            roots: Index of each tree's root node
+            max_depth: Depth of the deepest tree
+            n_features: Number of input features
+            source_fingerprint: Optional fingerprint of the model file this was built from
+            split_feature: Precomputed split feature per node with leaves mapped to 0
+                (as stored by save_dir); derived from feature when omitted
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.source_fingerprint = source_fingerprint
+        # Native-width index arrays; no copy is made when they already are (e.g. when
+        # memory-mapped from save_dir). Leaves index feature 0; their self-loops make
+        # the comparison irrelevant
+        if split_feature is None:
+            split_feature = np.where(feature == LEAF, 0, feature)
+        self._split_feature = np.asarray(split_feature, dtype=np.intp)
+        self._left = np.asarray(left, dtype=np.intp)
+        self._right = np.asarray(right, dtype=np.intp)
+        self._roots = np.asarray(roots, dtype=np.intp)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.threshold.dtype
+
+    @classmethod
+    def from_sklearn(cls, model, dtype=np.float64,
+                     source_fingerprint: Optional[str] = None) -> 'FlatForest':
+        """
+        Flatten a fitted binary RandomForestClassifier.
+
+        Args:
+            model: Fitted sklearn forest classifier with two classes
+            dtype: np.float64 or np.float32 for the threshold array
+            source_fingerprint: Optional fingerprint of the model file
+
+        Returns:
+            FlatForest
+        """
+        if not hasattr(model, 'estimators_'):
+            raise ValueError("Model is not a fitted tree ensemble")
+        if len(model.classes_) != 2:
+            raise ValueError("Only binary classifiers can be flattened")
+        dtype = np.dtype(dtype)
+        if dtype not in (np.float32, np.float64):
+            raise ValueError(f"Unsupported threshold dtype: {dtype}")
+
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            node_ids = np.arange(n)
+            is_leaf = tree.children_left == -1
+
+            features.append(tree.feature.astype(np.int32))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+            if hasattr(tree, 'missing_go_to_left'):
+                missing.append(tree.missing_go_to_left.astype(bool))
+            else:
+                missing.append(np.zeros(n, dtype=bool))
+            counts = tree.value[:, 0, :]
+            values.append(counts[:, 1] / counts.sum(axis=1))
+            roots.append(offset)
+
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        threshold = np.concatenate(thresholds)
+        if dtype == np.float32:
+            threshold = _round_down_to_float32(threshold)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=threshold,
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            missing_left=np.concatenate(missing),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            n_features=model.n_features_in_,
+            source_fingerprint=source_fingerprint,
+        )
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Positive-class probabilities for every row of X.
+
+        Args:
+            X: (n, k) array of model inputs (already scaled)
+
+        Returns:
+            np.ndarray of shape (n,)
+        """
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        # sklearn evaluates trees on float32 inputs; do the same for identical splits
+        X = X.astype(np.float32).astype(self.threshold.dtype)
+        check_missing = bool(np.isnan(X).any())
+
+        proba = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], ROW_BLOCK):
+            block = X[start:start + ROW_BLOCK]
+            proba[start:start + len(block)] = self._predict_block(block, check_missing)
+        return proba
+
+    def _predict_block(self, X: np.ndarray, check_missing: bool) -> np.ndarray:
+        n_rows, n_features = X.shape
+        flat_x = X.ravel()
+        row_offsets = np.arange(n_rows) * n_features
+        # One column per row, one row per tree; all trees advance one level per step
+        nodes = np.repeat(self._roots[:, None], n_rows, axis=1)
+        for _ in range(self.max_depth):
+            x = flat_x[row_offsets + self._split_feature[nodes]]
+            go_left = x <= self.threshold[nodes]
+            if check_missing:
+                go_left |= np.isnan(x) & self.missing_left[nodes]
+            nodes = np.where(go_left, self._left[nodes], self._right[nodes])
+
+        # Sequential sum over trees, then divide, like sklearn's averaging
+        return self.value[nodes].sum(axis=0) / self.n_trees
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Write the flattened arrays to an uncompressed .npz archive."""
+        np.savez(
+            path,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            missing_left=self.missing_left,
+            value=self.value,
+            roots=self.roots,
+            max_depth=np.array(self.max_depth),
+            n_features=np.array(self.n_features),
+            source_fingerprint=np.array(self.source_fingerprint or ''),
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'FlatForest':
+        """Load arrays written by save."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                feature=data['feature'],
+                threshold=data['threshold'],
+                left=data['left'],
+                right=data['right'],
+                missing_left=data['missing_left'],
+                value=data['value'],
+                roots=data['roots'],
+                max_depth=int(data['max_depth']),
+                n_features=int(data['n_features']),
+                source_fingerprint=str(data['source_fingerprint']) or None,
+            )
+
+    def save_dir(self, directory: Union[str, Path]) -> None:
+        """Write one .npy file per array plus forest.json, for memory-mapped loading."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        arrays = {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'left': self._left,
+            'right': self._right,
+            'missing_left': self.missing_left,
+            'value': self.value,
+            'roots': self._roots,
+            'split_feature': self._split_feature,
+        }
+        for name in NODE_ARRAYS:
+            np.save(directory / f'{name}.npy', np.ascontiguousarray(arrays[name]))
+        (directory / 'forest.json').write_text(json.dumps({
+            'max_depth': self.max_depth,
+            'n_features': self.n_features,
+            'source_fingerprint': self.source_fingerprint,
+        }))
+
+    @classmethod
+    def load_dir(cls, directory: Union[str, Path], mmap_mode: Optional[str] = 'r') -> 'FlatForest':
+        """
+        Load arrays written by save_dir.
+
+        Args:
+            directory: Directory passed to save_dir
+            mmap_mode: np.load memory-map mode; None reads the arrays into memory
+        """
+        directory = Path(directory)
+        meta = json.loads((directory / 'forest.json').read_text())
+        arrays = {
+            name: np.load(directory / f'{name}.npy', mmap_mode=mmap_mode, allow_pickle=False)
+            for name in NODE_ARRAYS
+        }
+        return cls(
+            max_depth=meta['max_depth'],
+            n_features=meta['n_features'],
+            source_fingerprint=meta.get('source_fingerprint'),
+            **arrays,
+        )
+
+
+def _round_down_to_float32(threshold: np.ndarray) -> np.ndarray:
+    """
+    Largest float32 not above each float64 threshold. For float32 inputs x,
+    x <= result holds exactly when x <= threshold, so float32 storage is lossless.
+    """
+    rounded = threshold.astype(np.float32)
+    too_high = rounded.astype(np.float64) > threshold
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
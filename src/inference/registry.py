@@ -0,0 +1,119 @@
+"""
+Model Registry Module
+Keeps every published model in its own directory under one registry root, next to
+a CURRENT file naming the active version. Publishing a model never touches the
+running one; activating it rewrites CURRENT atomically, and the API's background
+loader picks the change up.
+
+Layout:
+    models/registry/
+        CURRENT                 -> "2025-06-01"
+        2025-06-01/
+            model.pkl, scaler.pkl, features.csv
+            manifest.json, *.npy  (optional artifact directory, see artifacts.py)
+"""
+
+import os
+import shutil
+from pathlib import Path
+from typing import List, Optional, Union
+
+from src.inference.artifacts import has_artifacts
+
+CURRENT_POINTER = 'CURRENT'
+PICKLE_FILES = ('model.pkl', 'scaler.pkl', 'features.csv')
+
+
+def version_dir(root: Union[str, Path], version: str) -> Path:
+    """Directory of a version, rejecting names that would escape the registry."""
+    if not version or version.startswith('.') or os.sep in version or (os.altsep and os.altsep in version):
+        raise ValueError(f"Invalid model version name: {version!r}")
+    return Path(root) / version
+
+
+def is_complete(directory: Union[str, Path]) -> bool:
+    """True if a version directory holds a loadable model (pickles or artifacts)."""
+    directory = Path(directory)
+    return has_artifacts(directory) or all((directory / name).exists() for name in PICKLE_FILES)
+
+
+def list_versions(root: Union[str, Path]) -> List[str]:
+    """Names of the complete versions in the registry, sorted."""
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    return sorted(
+        path.name for path in root.iterdir()
+        if path.is_dir() and not path.name.startswith('.') and is_complete(path)
+    )
+
+
+def current_version(root: Union[str, Path]) -> Optional[str]:
+    """The version named by CURRENT, or None if the registry has no active version."""
+    try:
+        version = (Path(root) / CURRENT_POINTER).read_text().strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+
+def set_current_version(root: Union[str, Path], version: str) -> None:
+    """
+    Make a published version the active one.
+
+    The pointer is written to a temporary file and renamed over CURRENT, so readers
+    see either the old or the new version name, never a partial write.
+
+    Args:
+        root: Registry root directory
+        version: Name of a complete version directory under root
+    """
+    directory = version_dir(root, version)
+    if not is_complete(directory):
+        raise FileNotFoundError(f"{directory} does not contain a complete model")
+    pointer = Path(root) / CURRENT_POINTER
+    tmp = pointer.with_name(f".{CURRENT_POINTER}.{os.getpid()}.tmp")
+    tmp.write_text(version + '\n')
+    os.replace(tmp, pointer)
+
+
+def publish_version(root: Union[str, Path], version: str, model_path: Union[str, Path],
+                    scaler_path: Union[str, Path], features_path: Union[str, Path]) -> Path:
+    """
+    Copy a trained model, scaler and feature list into a new version directory.
+
+    Files are staged in a hidden directory and renamed into place, so a version
+    directory that exists is always complete. Existing versions are never overwritten.
+
+    Args:
+        root: Registry root directory
+        version: Name of the new version
+        model_path: Trained model pickle
+        scaler_path: Fitted scaler pickle
+        features_path: Features CSV
+
+    Returns:
+        Path of the new version directory
+    """
+    directory = version_dir(root, version)
+    if directory.exists():
+        raise FileExistsError(f"Model version {version} is already published")
+    staging = directory.with_name(f".{version}.staging")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    for source, name in zip((model_path, scaler_path, features_path), PICKLE_FILES):
+        shutil.copy2(source, staging / name)
+    os.replace(staging, directory)
+    return directory
+
+
+def predictor_paths(root: Union[str, Path], version: str) -> dict:
+    """CreditScorePredictor keyword arguments for loading a registry version."""
+    directory = version_dir(root, version)
+    return {
+        'model_path': directory / 'model.pkl',
+        'scaler_path': directory / 'scaler.pkl',
+        'features_path': directory / 'features.csv',
+        'flat_model_path': directory / 'model_flat.npz',
+        'artifact_dir': directory,
+    }
@@ -6,6 +6,7 @@ import type {
   UserProfileUpdate,
   PredictionListResponse,
   ScoreHistoryItem,
+  ScoreSummaryResponse,
 } from '@/types/credit';
 import { auth } from '@/lib/firebase';
 import { logger } from '@/lib/logger';
@@ -177,12 +178,14 @@ export const updateUserProfile = async (
  */
 export const getUserPredictions = async (
   limit = 10,
-  offset = 0
+  offset = 0,
+  cursor?: string | null
 ): Promise<PredictionListResponse> => {
   const params = new URLSearchParams({
     limit: limit.toString(),
     offset: offset.toString(),
   });
+  if (cursor) params.set('cursor', cursor);
 
   const response = await authenticatedFetch(
     `${API_BASE_URL}/api/predictions?${params.toString()}`
@@ -207,3 +210,13 @@ export const getScoreHistory = async (limit = 12): Promise<ScoreHistoryItem[]> =
   if (!response.ok) await handleApiError(response);
   return response.json();
 };
+
+/**
+ * Get user's recent credit scores and monthly aggregates in one request
+ */
+export const getScoreSummary = async (): Promise<ScoreSummaryResponse> => {
+  const response = await authenticatedFetch(`${API_BASE_URL}/api/scores/summary`);
+
+  if (!response.ok) await handleApiError(response);
+  return response.json();
+};
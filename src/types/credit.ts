@@ -54,6 +54,7 @@ export interface PredictionResponse {
   feature_values?: Record<string, unknown>;
   transaction_count?: number;
   file_name?: string;
+  model_version?: string;
   created_at: string;
 }
 
@@ -63,6 +64,7 @@ export interface PredictionListResponse {
   limit: number;
   offset: number;
   count: number;
+  next_cursor?: string | null;
 }
 
 export interface ScoreHistoryItem {
@@ -71,3 +73,17 @@ export interface ScoreHistoryItem {
   category: RiskCategory;
   risk_probability: number;
 }
+
+export interface MonthlyScoreSummary {
+  month: string;
+  count: number;
+  average_score: number;
+  min_score: number;
+  max_score: number;
+  average_risk_probability: number;
+}
+
+export interface ScoreSummaryResponse {
+  history: ScoreHistoryItem[];
+  monthly: MonthlyScoreSummary[];
+}